@@ -0,0 +1,207 @@
+# background_worker.py - 背景工作執行元件
+# 功能：讓讀取、比對、儲存等耗時工作在背景執行緒執行，介面保持回應
+# 工作進度顯示在進度條上，按下「取消」後在下一個進度回報點中止工作
+# 每個工作依進度階段記錄耗時與記憶體，完成後在進度列顯示各階段的耗時
+
+import html
+import threading
+import traceback
+from typing import Callable, Iterable, Optional
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QHBoxLayout, QLabel, QProgressBar, QPushButton, QWidget
+
+from dptools.profiling import StageProfiler, format_report, summarize_report
+from dptools.progress import JobCancelled
+
+
+class JobWorker(QObject):
+    """
+    在背景執行緒執行一個工作函數
+    工作函數只接受一個參數 progress(階段, 已完成, 總數)，取消後呼叫 progress 會拋出 JobCancelled；
+    每次回報的階段同時交給 profiler 記錄各階段的耗時
+
+    參數：
+        func: 工作函數，返回值會經由 finished 訊號傳回主執行緒
+    """
+
+    progress = pyqtSignal(str, int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object, str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, func: Callable):
+        super().__init__()
+        self.func = func
+        self.profiler = StageProfiler()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """要求取消工作（在下一個進度回報點生效）"""
+        self._cancel.set()
+
+    def report(self, stage: str, done: int = 0, total: int = 0):
+        """進度回呼：已要求取消時拋出 JobCancelled，否則將進度送回主執行緒"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.profiler(stage, done, total)
+        self.progress.emit(stage, done, total)
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.func(self.report)
+        except JobCancelled:
+            self.profiler.finish()
+            self.cancelled.emit()
+        except Exception as e:
+            self.profiler.finish()
+            self.failed.emit(e, traceback.format_exc())
+        else:
+            self.profiler.finish()
+            self.finished.emit(result)
+
+
+class JobProgress(QWidget):
+    """
+    背景工作的進度列：進度條、目前階段與取消按鈕
+    同一時間只執行一個工作；執行期間停用指定的按鈕，避免重複送出。
+    工作完成後改為顯示總耗時與最耗時的階段，滑鼠停在上面可看到完整的階段報告（last_report）
+
+    參數：
+        buttons: 工作執行期間要停用的按鈕
+    """
+
+    def __init__(self, buttons: Iterable[QWidget] = (), parent=None):
+        super().__init__(parent)
+        self.buttons = list(buttons)
+        self._thread: Optional[QThread] = None
+        self._worker: Optional[JobWorker] = None
+        self._on_finished = None
+        self._on_failed = None
+        self._on_cancelled = None
+        self._enabled = []
+        # 上一個完成的工作的階段效能報告（見 dptools.profiling.StageProfiler.report）
+        self.last_report = None
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar)
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.setToolTip("中止目前的工作（讀取或寫出單一檔案的過程無法中斷，會在該步驟完成後停止）")
+        self.cancel_button.clicked.connect(self.cancel)
+        layout.addWidget(self.cancel_button)
+        self.setLayout(layout)
+        self.setVisible(False)
+
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, func: Callable, on_finished: Callable,
+              on_failed: Optional[Callable] = None, on_cancelled: Optional[Callable] = None,
+              stage: str = "處理中") -> bool:
+        """
+        在背景執行緒開始工作
+
+        參數：
+            func: 工作函數 func(progress)
+            on_finished: 成功時在主執行緒以工作結果呼叫
+            on_failed: 失敗時在主執行緒以 (例外, 堆疊追蹤文字) 呼叫
+            on_cancelled: 取消時在主執行緒呼叫
+            stage: 第一次回報進度前顯示的階段名稱
+
+        返回：
+            是否已開始（已有工作在執行時返回 False）
+        """
+        if self.is_running():
+            return False
+        self._on_finished, self._on_failed, self._on_cancelled = on_finished, on_failed, on_cancelled
+
+        self._thread = QThread()
+        self._worker = JobWorker(func)
+        self._worker.moveToThread(self._thread)
+        self._thread.started.connect(self._worker.run)
+        # 訊號連到本元件的方法，由 Qt 排入主執行緒的事件迴圈執行
+        self._worker.progress.connect(self._show_progress)
+        self._worker.finished.connect(self._finished)
+        self._worker.failed.connect(self._failed)
+        self._worker.cancelled.connect(self._cancelled)
+
+        # 記下按鈕原本的狀態，結束後恢復
+        self._enabled = [button.isEnabled() for button in self.buttons]
+        for button in self.buttons:
+            button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.progress_bar.setVisible(True)
+        self.cancel_button.setVisible(True)
+        self.status_label.setToolTip("")
+        self._show_progress(stage, 0, 0)
+        self.setVisible(True)
+        self._thread.start()
+        return True
+
+    def cancel(self):
+        """要求取消目前的工作"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("正在取消…")
+
+    def shutdown(self):
+        """關閉視窗前取消工作並等待背景執行緒結束"""
+        if self._thread is not None:
+            self.cancel()
+            self._thread.quit()
+            self._thread.wait()
+
+    @pyqtSlot(str, int, int)
+    def _show_progress(self, stage: str, done: int, total: int):
+        if total > 0:
+            self.progress_bar.setRange(0, total)
+            self.progress_bar.setValue(min(done, total))
+            self.status_label.setText(f"{stage}… {done:,} / {total:,}")
+        else:
+            # 無法得知總數時顯示忙碌動畫
+            self.progress_bar.setRange(0, 0)
+            self.status_label.setText(f"{stage}… {done:,}" if done else f"{stage}…")
+
+    def _stop(self):
+        """結束背景執行緒並恢復按鈕"""
+        self._thread.quit()
+        self._thread.wait()
+        self._thread = None
+        self._worker = None
+        for button, enabled in zip(self.buttons, self._enabled):
+            button.setEnabled(enabled)
+        self.setVisible(False)
+
+    def _show_report(self, report):
+        """顯示工作的階段耗時：標籤為摘要，提示為完整報告"""
+        self.last_report = report
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
+        self.status_label.setText(f"上次工作{summarize_report(report)}")
+        self.status_label.setToolTip(f"<pre>{html.escape(format_report(report))}</pre>")
+        self.setVisible(True)
+
+    @pyqtSlot(object)
+    def _finished(self, result):
+        report = self._worker.profiler.report()
+        self._stop()
+        self._show_report(report)
+        self._on_finished(result)
+
+    @pyqtSlot(object, str)
+    def _failed(self, error, details):
+        self._stop()
+        if self._on_failed is not None:
+            self._on_failed(error, details)
+
+    @pyqtSlot()
+    def _cancelled(self):
+        self._stop()
+        if self._on_cancelled is not None:
+            self._on_cancelled()
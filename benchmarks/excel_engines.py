@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Excel 讀取引擎效能比較
+比較各個已安裝引擎完整讀取與只讀前 20 列的時間，以及 openpyxl 唯讀串流逐列讀取的時間
+
+使用方式：
+    python benchmarks/excel_engines.py --file 大型報表.xlsx
+    python benchmarks/excel_engines.py --rows 500000      # 產生測試檔案（欄位與 samples/master.xlsx 相同）
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dptools.excel_engines import available_engines, iter_excel_rows, read_excel  # noqa: E402
+
+SURNAMES = "王吳李陳林張黃劉蔡楊"
+GIVEN = "小大美傑華明志雅婷偉"
+
+
+def generate_workbook(path: str, rows: int, seed: int = 0) -> None:
+    """產生與 samples/master.xlsx 相同欄位的測試檔案"""
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["姓名", "身分證字號", "電話", "email", "生日", "建立日期"])
+    for _ in range(rows):
+        name = rng.choice(SURNAMES) + rng.choice(GIVEN) + rng.choice(GIVEN)
+        sheet.append([
+            name,
+            f"{rng.choice('ABCDEFGHJK')}{rng.randint(100000000, 299999999)}",
+            rng.randint(90000000, 99999999),
+            f"{name}@example.com",
+            date(1950, 1, 1) + timedelta(days=rng.randint(0, 20000)),
+            date(2025, 1, 1) + timedelta(days=rng.randint(0, 364)),
+        ])
+    workbook.save(path)
+
+
+def timed(func, repeat: int) -> float:
+    """執行 repeat 次取最短時間（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="比較 Excel 讀取引擎的速度")
+    parser.add_argument("--file", help="要測試的 .xlsx 檔案，未指定時產生測試檔案")
+    parser.add_argument("--rows", type=int, default=200_000, help="產生測試檔案的資料列數")
+    parser.add_argument("--repeat", type=int, default=1, help="每項測試重複次數（取最短時間）")
+    args = parser.parse_args(argv)
+
+    path = args.file
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "benchmark.xlsx")
+        print(f"產生 {args.rows:,} 列測試檔案…")
+        generate_workbook(path, args.rows)
+    print(f"檔案: {path}（{os.path.getsize(path) / 1024 / 1024:.1f} MB）")
+
+    print(f"{'引擎':<12}{'完整讀取 (秒)':>16}{'前 20 列 (秒)':>16}")
+    for engine in available_engines(path):
+        full = timed(lambda: read_excel(path, engine=engine), args.repeat)
+        head = timed(lambda: read_excel(path, nrows=20, engine=engine), args.repeat)
+        print(f"{engine:<12}{full:>16.2f}{head:>16.3f}")
+    stream = timed(lambda: sum(1 for _ in iter_excel_rows(path)), args.repeat)
+    print(f"{'串流逐列':<12}{stream:>16.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+讀取 / 清理 / 比對 / 寫出流程效能測試
+以固定亂數種子產生與 samples/master.xlsx 相同欄位的主檔與新檔（可調整重疊比例與錯字比例），
+分別計時各個階段，結果寫成 JSON；指定基準結果時逐項比較，變慢超過容許比例即視為效能退步
+
+使用方式：
+    python benchmarks/pipeline.py --sizes 1k,100k --output results.json
+    python benchmarks/pipeline.py --sizes 1k,100k --baseline baseline.json   # 有效能退步時結束代碼為 1
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dptools.cleaning import clean_frame, clean_series  # noqa: E402
+from dptools.compact import compact_frame, memory_saving  # noqa: E402
+from dptools.matching import match_dataframes  # noqa: E402
+from dptools.readers import read_table  # noqa: E402
+from dptools.writers import OUTPUT_FORMATS, available_formats, write_table  # noqa: E402
+
+# 結果檔案格式版本
+RESULT_VERSION = 1
+# 可用的資料量代號
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+# 精確比對使用的鍵值欄位
+MATCH_KEYS = ["身分證字號", "電話"]
+# 模糊比對使用的鍵值欄位（姓名只有三個字，單獨比對時一個錯字就低於門檻）
+FUZZY_KEYS = ["姓名", "email"]
+# 基準比較時低於此秒數的階段不判定退步（時間太短，誤差比例過大）
+MIN_COMPARE_SECONDS = 0.05
+
+SURNAMES = list("陳林黃張李王吳劉蔡楊許鄭謝郭洪曾邱廖賴周徐蘇葉莊呂江何蕭羅高")
+GIVEN = list("小大美傑華明志雅婷偉宏文俊怡君佳玲淑芬家豪建國信宗瑋庭欣儀")
+EMAIL_DOMAINS = ["example.com", "test.com", "mail.com.tw", "company.tw"]
+# 身分證字號英文字母對應的兩位數代碼
+ID_LETTER_CODES = {
+    "A": 10, "B": 11, "C": 12, "D": 13, "E": 14, "F": 15, "G": 16, "H": 17, "I": 34, "J": 18,
+    "K": 19, "L": 20, "M": 21, "N": 22, "O": 35, "P": 23, "Q": 24, "R": 25, "S": 26, "T": 27,
+    "U": 28, "V": 29, "W": 32, "X": 30, "Y": 31, "Z": 33,
+}
+# 全形數字對照表，部分電話以全形數字呈現
+FULLWIDTH_DIGITS = {ord(ch): ord(ch) + 0xFEE0 for ch in "0123456789-"}
+
+
+def _id_numbers(rng: np.random.Generator, rows: int) -> np.ndarray:
+    """產生檢查碼正確的身分證字號"""
+    letters = np.array(list(ID_LETTER_CODES))
+    codes = np.array(list(ID_LETTER_CODES.values()))
+    letter = rng.integers(0, len(letters), rows)
+    digits = np.column_stack([rng.integers(1, 3, rows), rng.integers(0, 10, (rows, 7))])
+    # 檢查規則：代碼十位數 ×1 + 個位數 ×9 + 各位數依序 ×8..1 + 檢查碼，總和為 10 的倍數
+    total = codes[letter] // 10 + codes[letter] % 10 * 9 + digits @ np.arange(8, 0, -1)
+    check = (10 - total % 10) % 10
+    number = np.column_stack([digits, check]) @ 10 ** np.arange(8, -1, -1, dtype=np.int64)
+    return np.char.add(letters[letter], number.astype(str))
+
+
+def _dates(rng: np.random.Generator, rows: int, start: str, days: int) -> np.ndarray:
+    """產生日期字串，約一成使用斜線格式"""
+    values = (np.datetime64(start) + rng.integers(0, days, rows)).astype(str)
+    slash = rng.random(rows) < 0.1
+    return np.where(slash, np.char.replace(values, "-", "/"), values)
+
+
+def _messy_phones(rng: np.random.Generator, phones: np.ndarray) -> np.ndarray:
+    """將部分電話改為含分隔符號、空白或全形數字的寫法，讓清理階段有實際的工作量"""
+    phones = phones.astype(object)
+    style = rng.random(len(phones))
+    dashed = style < 0.2
+    phones[dashed] = [f"{p[:4]}-{p[4:7]}-{p[7:]}" for p in phones[dashed]]
+    wide = (style >= 0.2) & (style < 0.25)
+    phones[wide] = [p.translate(FULLWIDTH_DIGITS) for p in phones[wide]]
+    padded = (style >= 0.25) & (style < 0.3)
+    phones[padded] = [f" {p} " for p in phones[padded]]
+    return phones
+
+
+def _typo(rng: np.random.Generator, names: np.ndarray) -> np.ndarray:
+    """每個姓名隨機換掉一個字（不換姓）"""
+    out = names.astype(object)
+    for i, name in enumerate(out):
+        pos = int(rng.integers(1, len(name)))
+        out[i] = name[:pos] + GIVEN[int(rng.integers(0, len(GIVEN)))] + name[pos + 1:]
+    return out
+
+
+def generate_records(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    產生與 samples/master.xlsx 相同欄位的測試資料
+    姓名、身分證字號（檢查碼正確）、手機號碼、email、生日與建立日期；
+    部分文字含前後空白、全形字元或不同的日期格式
+
+    參數：
+        rows: 資料列數
+        seed: 亂數種子，相同參數產生的資料完全相同
+
+    返回：
+        測試資料框架
+    """
+    rng = np.random.default_rng(seed)
+    surnames = np.array(SURNAMES)[rng.integers(0, len(SURNAMES), rows)]
+    given = np.char.add(np.array(GIVEN)[rng.integers(0, len(GIVEN), rows)],
+                        np.array(GIVEN)[rng.integers(0, len(GIVEN), rows)])
+    names = np.char.add(surnames, given).astype(object)
+    spaced = rng.random(rows) < 0.05
+    names[spaced] = [f"{name}　" for name in names[spaced]]
+
+    phones = np.char.add("09", np.char.zfill(rng.integers(0, 100_000_000, rows).astype(str), 8))
+    # 八個隨機英數字的帳號
+    alphabet = np.array(list("abcdefghijklmnopqrstuvwxyz0123456789"))
+    users = alphabet[rng.integers(0, len(alphabet), (rows, 8))].view("U8").ravel()
+    domains = np.array(EMAIL_DOMAINS)[rng.integers(0, len(EMAIL_DOMAINS), rows)]
+    emails = np.char.add(np.char.add(users, "@"), domains).astype(object)
+    upper = rng.random(rows) < 0.05
+    emails[upper] = [email.upper() for email in emails[upper]]
+
+    return pd.DataFrame({
+        "姓名": names,
+        "身分證字號": _id_numbers(rng, rows).astype(object),
+        "電話": _messy_phones(rng, phones),
+        "email": emails,
+        "生日": _dates(rng, rows, "1950-01-01", 20000).astype(object),
+        "建立日期": _dates(rng, rows, "2025-01-01", 365).astype(object),
+    })
+
+
+def generate_pair(rows: int, seed: int = 0, overlap: float = 0.5,
+                  typo_rate: float = 0.05) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    產生主檔與新檔
+    新檔中 overlap 比例的資料取自主檔（順序打亂，部分電話改為全形），其餘為新資料；
+    取自主檔的資料中 typo_rate 比例的姓名含一個錯字，供模糊比對使用
+
+    參數：
+        rows: 每個檔案的資料列數
+        seed: 亂數種子
+        overlap: 新檔與主檔重疊的比例（0-1）
+        typo_rate: 重疊資料中姓名含錯字的比例（0-1）
+
+    返回：
+        (主檔, 新檔)
+    """
+    master = generate_records(rows, seed)
+    fresh = generate_records(rows, seed + 1)
+    rng = np.random.default_rng(seed + 2)
+    shared = int(rows * overlap)
+    picked = rng.permutation(rows)[:shared]
+    copied = master.iloc[picked].reset_index(drop=True)
+    # 同一個人在新檔中電話可能以全形數字呈現，清理後才能精確比對
+    wide = rng.random(shared) < 0.1
+    copied.loc[wide, "電話"] = [phone.translate(FULLWIDTH_DIGITS) for phone in copied.loc[wide, "電話"]]
+    typos = rng.random(shared) < typo_rate
+    copied.loc[typos, "姓名"] = _typo(rng, copied.loc[typos, "姓名"].to_numpy())
+    new = pd.concat([copied, fresh.iloc[shared:]], ignore_index=True)
+    return master, new.iloc[rng.permutation(rows)].reset_index(drop=True)
+
+
+def timed_result(func: Callable, repeat: int) -> Tuple[float, object]:
+    """執行 repeat 次取最短時間（秒），並返回最後一次的結果"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_size(rows: int, seed: int, overlap: float, typo_rate: float, formats: List[str],
+             fuzzy_rows: int, repeat: int, work_dir: str) -> Dict:
+    """
+    對一種資料量執行所有階段
+
+    參數：
+        rows: 每個檔案的資料列數
+        seed: 亂數種子
+        overlap: 新檔與主檔重疊的比例
+        typo_rate: 重疊資料中姓名含錯字的比例
+        formats: 寫出與讀取測試的檔案格式
+        fuzzy_rows: 模糊比對每邊最多使用的筆數（模糊比對的時間與兩邊筆數的乘積成正比）
+        repeat: 每個階段重複次數（取最短時間）
+        work_dir: 暫存檔案資料夾
+
+    返回：
+        {"rows": 列數, "stages": {階段: 秒數}, "counts": {項目: 筆數}, "memory": 精簡前後的記憶體用量}
+    """
+    stages, counts = {}, {}
+    start = time.perf_counter()
+    master, new = generate_pair(rows, seed, overlap, typo_rate)
+    stages["generate"] = time.perf_counter() - start
+
+    text_columns = [col for col in master.columns if master[col].dtype == object]
+    stages["clean_series"], _ = timed_result(
+        lambda: [clean_series(frame[col]) for frame in (master, new) for col in text_columns], repeat)
+    stages["clean_frame"], (master, new) = timed_result(
+        lambda: (clean_frame(master), clean_frame(new)), repeat)
+
+    stages["exact_match"], (df_result, _) = timed_result(
+        lambda: match_dataframes(master, new, MATCH_KEYS, MATCH_KEYS), repeat)
+    counts.update(df_result.attrs["counts"])
+
+    # 精簡記憶體模式：轉換的時間、轉換後的精確比對時間，以及兩邊資料合計節省的記憶體
+    stages["compact"], (small_master, small_new) = timed_result(
+        lambda: (compact_frame(master), compact_frame(new)), repeat)
+    stages["exact_match_compact"], _ = timed_result(
+        lambda a=small_master, b=small_new: match_dataframes(a, b, MATCH_KEYS, MATCH_KEYS), repeat)
+    savings = [small_master.attrs["compact"], small_new.attrs["compact"]]
+    memory = memory_saving(sum(saving["原始 MB"] for saving in savings),
+                           sum(saving["精簡後 MB"] for saving in savings))
+    del small_master, small_new
+
+    # 模糊比對兩邊各取前 fuzzy_rows 筆，姓名含錯字的重疊資料由模糊比對找回
+    left, right = master.head(fuzzy_rows), new.head(fuzzy_rows)
+    stages["fuzzy_match"], (df_fuzzy, _) = timed_result(
+        lambda: match_dataframes(left, right, FUZZY_KEYS, FUZZY_KEYS, use_fuzzy=True), repeat)
+    counts["模糊比對筆數"] = len(left)
+    counts["模糊比對命中筆數"] = df_fuzzy.attrs["counts"]["模糊匹配筆數"]
+
+    for fmt in formats:
+        base = os.path.join(work_dir, f"bench_{rows}")
+        # 計時的是 write_table（ChunkedWriter 分批寫出），不是 DataFrame.to_excel
+        stages[f"write_table_{fmt}"], path = timed_result(lambda: write_table(new, base, fmt), repeat)
+        # read_table 只讀取 Excel / CSV，Parquet 直接以 pandas 讀取
+        reader = pd.read_parquet if fmt == "parquet" else read_table
+        stages[f"read_{fmt}"], _ = timed_result(lambda: reader(path), repeat)
+        os.remove(path)
+
+    return {"rows": rows, "stages": {name: round(seconds, 4) for name, seconds in stages.items()},
+            "counts": counts, "memory": memory}
+
+
+def compare_results(current: Dict, baseline: Dict, tolerance: float,
+                    min_seconds: float = MIN_COMPARE_SECONDS) -> List[Dict]:
+    """
+    逐項比較目前結果與基準結果
+
+    參數：
+        current: 目前的結果
+        baseline: 基準結果
+        tolerance: 容許變慢的比例（0.2 表示慢 20% 以內不算退步）
+        min_seconds: 兩邊都低於此秒數的階段不判定退步
+
+    返回：
+        每個共同階段的比較（資料量、階段、基準秒數、目前秒數、比例、是否退步）
+    """
+    rows = []
+    for size, result in current["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if base is None:
+            continue
+        for stage, seconds in result["stages"].items():
+            if stage == "generate" or stage not in base["stages"]:
+                continue
+            before = base["stages"][stage]
+            ratio = seconds / before if before > 0 else float("inf")
+            regressed = ratio > 1 + tolerance and max(seconds, before) >= min_seconds
+            rows.append({"size": size, "stage": stage, "baseline": before, "current": seconds,
+                         "ratio": round(ratio, 3), "regression": regressed})
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="測試讀取、清理、比對與寫出各階段的速度")
+    parser.add_argument("--sizes", default="1k,100k",
+                        help=f"資料量，以逗號分隔（{', '.join(SIZES)}）")
+    parser.add_argument("--seed", type=int, default=0, help="亂數種子")
+    parser.add_argument("--overlap", type=float, default=0.5, help="新檔與主檔重疊的比例")
+    parser.add_argument("--typo-rate", type=float, default=0.05, help="重疊資料中姓名含錯字的比例")
+    parser.add_argument("--formats", default="xlsx,csv", help="寫出與讀取測試的格式，以逗號分隔")
+    parser.add_argument("--fuzzy-rows", type=int, default=5_000, help="模糊比對每邊最多使用的筆數")
+    parser.add_argument("--repeat", type=int, default=1, help="每個階段重複次數（取最短時間）")
+    parser.add_argument("--output", help="結果 JSON 檔案路徑")
+    parser.add_argument("--baseline", help="基準結果 JSON，指定時比較並回報效能退步")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="容許變慢的比例")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"未知的資料量: {', '.join(unknown)}")
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    missing = [fmt for fmt in formats if fmt not in available_formats()]
+    if missing:
+        parser.error(f"無法使用的格式: {', '.join(missing)}（支援 {', '.join(OUTPUT_FORMATS)}，parquet 需要 pyarrow）")
+
+    current = {
+        "version": RESULT_VERSION,
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "overlap": args.overlap,
+            "typo_rate": args.typo_rate,
+            "fuzzy_rows": args.fuzzy_rows,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    work_dir = tempfile.mkdtemp(prefix="dptools_bench_")
+    try:
+        for size in sizes:
+            print(f"{size}（{SIZES[size]:,} 列）")
+            result = run_size(SIZES[size], args.seed, args.overlap, args.typo_rate, formats,
+                              args.fuzzy_rows, args.repeat, work_dir)
+            current["results"][size] = result
+            for stage, seconds in result["stages"].items():
+                print(f"  {stage:<20}{seconds:>10.3f} 秒")
+            memory = result["memory"]
+            print(f"  記憶體 {memory['原始 MB']:,.1f} MB → 精簡後 {memory['精簡後 MB']:,.1f} MB"
+                  f"（節省 {memory['節省比例']:.1%}）")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare_results(current, baseline, args.tolerance)
+        print(f"\n{'資料量':<8}{'階段':<20}{'基準 (秒)':>12}{'目前 (秒)':>12}{'比例':>8}")
+        for row in comparison:
+            mark = "  ← 退步" if row["regression"] else ""
+            print(f"{row['size']:<8}{row['stage']:<20}{row['baseline']:>12.3f}"
+                  f"{row['current']:>12.3f}{row['ratio']:>8.2f}{mark}")
+        if any(row["regression"] for row in comparison):
+            print(f"\n有階段比基準慢超過 {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
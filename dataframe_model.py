@@ -0,0 +1,72 @@
+# dataframe_model.py - 資料框架表格模型
+# 功能：讓 QTableView 直接顯示 pandas 資料框架
+# 只在儲存格實際顯示時才讀取內容，預覽成本與資料筆數無關
+
+from typing import Optional
+
+import pandas as pd
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtGui import QColor
+
+
+class DataFrameModel(QAbstractTableModel):
+    """
+    資料框架表格模型
+    不會預先建立任何表格項目；QTableView 捲動時只向模型要求畫面上看得到的儲存格
+
+    參數：
+        df: 要顯示的資料框架
+        highlight_col: 標記欄位名稱，該欄為 True 的列會以底色標示（例如「是否模糊比對」）
+        highlight_color: 標示用的底色
+    """
+
+    def __init__(self, df: Optional[pd.DataFrame] = None, highlight_col: Optional[str] = None,
+                 highlight_color: str = "yellow", parent=None):
+        super().__init__(parent)
+        self.highlight_col = highlight_col
+        self.highlight_brush = QColor(highlight_color)
+        self._df = pd.DataFrame()
+        self._highlight = None
+        self._flag_position = -1
+        if df is not None:
+            self.set_dataframe(df)
+
+    def set_dataframe(self, df: pd.DataFrame):
+        """更換顯示的資料框架"""
+        self.beginResetModel()
+        self._df = df
+        self._highlight = None
+        self._flag_position = -1
+        if self.highlight_col is not None and self.highlight_col in df.columns:
+            # 標記欄位先轉為布林陣列，繪製時只需查表
+            self._highlight = df[self.highlight_col].fillna(False).astype(bool).to_numpy()
+            self._flag_position = df.columns.get_loc(self.highlight_col)
+        self.endResetModel()
+
+    def dataframe(self) -> pd.DataFrame:
+        return self._df
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._df)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._df.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            return str(self._df.iat[row, col])
+        if role == Qt.BackgroundRole and self._highlight is not None:
+            # 模糊比對的列用底色標示，標記欄位本身不上色
+            if self._highlight[row] and col != self._flag_position:
+                return self.highlight_brush
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self._df.columns[section])
+        return str(section + 1)
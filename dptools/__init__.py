@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 """
 Data Processing Tools Package
+
+核心模組（readers、cleaning、detection、matching、writers）皆不依賴 PyQt5，
+可在無圖形介面的批次伺服器上使用；GUI 分頁只是這些模組的外層包裝。
 """
 
 __version__ = "2.0.0"
@@ -9,4 +12,7 @@ __email__ = "avon@example.com"
 
 from . import cli
 
-__all__ = ["cli"]
+__all__ = [
+    "cli", "batch", "blocking", "cache", "cleaning", "compact", "detection", "excel_engines",
+    "incremental", "matching", "presets", "profiling", "progress", "readers", "streaming", "writers",
+]
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+批次處理模組
+將資料夾中的廠商檔案依預設設定（跳過列數與保留欄位）分配到多個行程平行處理，
+回報每個檔案的處理狀態與耗時，不依賴 GUI
+"""
+
+import fnmatch
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Union
+
+import pandas as pd
+
+from .cleaning import clean_frame
+from .presets import VENDOR_PRESETS
+from .progress import ProgressCallback, report
+from .readers import read_table
+from .writers import DEFAULT_FORMAT, write_table
+
+# 批次處理支援的輸入檔案副檔名
+BATCH_SUFFIXES = (".xlsx", ".xlsm", ".xls", ".csv")
+# 批次處理結果摘要的檔案名稱（不含副檔名，格式與輸出檔案相同）
+BATCH_REPORT_NAME = "批次處理結果"
+# 輸出檔案名稱後綴
+BATCH_OUTPUT_SUFFIX = "_processed"
+
+# 預設對應：檔名樣式（fnmatch）→ 預設名稱或 {"skiprows": ..., "columns": [...]} 設定
+PresetMapping = Dict[str, Union[str, Dict]]
+
+
+def _status(file_name: str, preset_name: str = "", state: str = "完成", error: str = "") -> Dict:
+    """建立單一檔案的處理狀態，所有檔案的欄位一致，方便寫成狀態表"""
+    return {"檔案": file_name, "預設設定": preset_name, "狀態": state, "筆數": 0,
+            "讀取秒數": 0.0, "寫出秒數": 0.0, "總秒數": 0.0, "輸出": "", "錯誤": error}
+
+
+def batch_workers(workers: Optional[int] = None) -> int:
+    """同時處理的檔案數量，預設為 CPU 核心數（至少 1）"""
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def assign_preset(file_name: str, presets: Dict[str, Dict] = VENDOR_PRESETS,
+                  mapping: Optional[PresetMapping] = None) -> Optional[Dict]:
+    """
+    決定檔案使用的預設設定
+
+    參數：
+        file_name: 檔案名稱
+        presets: 可用的預設設定（名稱 → 設定）
+        mapping: 檔名樣式 → 預設名稱或設定；依序比對，第一個符合的樣式優先。
+                 未指定時以檔名中出現的預設名稱決定（名稱較長者優先，例如「小旺號」優先於「旺號」）
+
+    返回：
+        {"名稱": 預設名稱, "skiprows": 跳過列數, "columns": 欄位編號}，找不到時返回 None
+    """
+    if mapping:
+        for pattern, preset in mapping.items():
+            if fnmatch.fnmatch(file_name, pattern):
+                if isinstance(preset, str):
+                    return {"名稱": preset, **presets[preset]}
+                return {"名稱": pattern, **preset}
+        return None
+    for name in sorted(presets, key=len, reverse=True):
+        if name in file_name:
+            return {"名稱": name, **presets[name]}
+    return None
+
+
+def batch_output_names(paths: List[str]) -> Dict[str, str]:
+    """
+    決定每個輸入檔案的輸出名稱（不含副檔名）
+    一般為「檔名 + BATCH_OUTPUT_SUFFIX」；主檔名相同的檔案（例如 a.xlsx 與 a.csv）另外加上原副檔名，
+    避免平行處理時互相覆寫（不分大小寫，與 Windows 的檔名規則一致）
+
+    參數：
+        paths: 輸入檔案路徑
+
+    返回：
+        {輸入檔案路徑: 輸出名稱}
+    """
+    stems = {path: os.path.splitext(os.path.basename(path)) for path in paths}
+    counts = Counter(stem.lower() for stem, _ in stems.values())
+    names, used = {}, set()
+    for path, (stem, ext) in stems.items():
+        name = f"{stem}_{ext.lstrip('.')}" if counts[stem.lower()] > 1 else stem
+        # 加上副檔名後仍與其他檔案相同時依序編號
+        candidate, number = name, 1
+        while candidate.lower() in used:
+            number += 1
+            candidate = f"{name}_{number}"
+        used.add(candidate.lower())
+        names[path] = candidate + BATCH_OUTPUT_SUFFIX
+    return names
+
+
+def process_batch_file(path: str, preset: Dict, output_dir: str, fmt: str = DEFAULT_FORMAT,
+                       clean: bool = False, output_name: Optional[str] = None) -> Dict:
+    """
+    依預設設定處理單一檔案並寫出結果（在工作行程中執行，例外轉為狀態回報）
+
+    參數：
+        path: 輸入檔案路徑
+        preset: assign_preset 返回的設定
+        output_dir: 輸出資料夾
+        fmt: 輸出格式
+        clean: 是否執行 clean_frame
+        output_name: 輸出檔名（不含副檔名，見 batch_output_names），None 表示「檔名 + BATCH_OUTPUT_SUFFIX」
+
+    返回：
+        處理狀態（檔案、預設設定、狀態、筆數、讀取秒數、寫出秒數、總秒數、輸出、錯誤）
+    """
+    status = _status(os.path.basename(path), preset["名稱"])
+    start = time.perf_counter()
+    try:
+        df = read_table(path, skiprows=preset.get("skiprows", 0), columns=preset.get("columns"))
+        if clean:
+            df = clean_frame(df)
+        read_done = time.perf_counter()
+        if output_name is None:
+            output_name = os.path.splitext(os.path.basename(path))[0] + BATCH_OUTPUT_SUFFIX
+        status["輸出"] = write_table(df, os.path.join(output_dir, output_name), fmt)
+        status["筆數"] = len(df)
+        status["讀取秒數"] = round(read_done - start, 3)
+        status["寫出秒數"] = round(time.perf_counter() - read_done, 3)
+    except Exception as e:
+        status["狀態"] = "失敗"
+        status["錯誤"] = f"{type(e).__name__}: {e}"
+    status["總秒數"] = round(time.perf_counter() - start, 3)
+    return status
+
+
+def run_batch(directory: str, output_dir: str, presets: Dict[str, Dict] = VENDOR_PRESETS,
+              mapping: Optional[PresetMapping] = None, workers: Optional[int] = None,
+              fmt: str = DEFAULT_FORMAT, clean: bool = False,
+              progress: Optional[ProgressCallback] = None,
+              on_status: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """
+    平行處理資料夾中所有符合預設設定的檔案
+
+    參數：
+        directory: 輸入資料夾（不含子資料夾）
+        output_dir: 輸出資料夾
+        presets: 可用的預設設定
+        mapping: 檔名樣式 → 預設名稱或設定（見 assign_preset）
+        workers: 同時處理的檔案數量，None 表示 CPU 核心數
+        fmt: 輸出格式（xlsx / csv / parquet）
+        clean: 是否執行 clean_frame
+        progress: 每完成一個檔案回報一次進度；回呼拋出例外時取消尚未開始的檔案
+        on_status: 每完成一個檔案以該檔案的處理狀態呼叫（依完成順序）
+
+    返回：
+        所有檔案的處理狀態（依檔名排序），沒有對應預設設定的檔案狀態為「略過」；
+        另將狀態表寫出到輸出資料夾的「批次處理結果」檔案
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    statuses, jobs = [], []
+    for file_name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, file_name)
+        # 略過子資料夾、其他格式與 Excel 開啟中的暫存檔
+        if not os.path.isfile(path) or not file_name.lower().endswith(BATCH_SUFFIXES) \
+                or file_name.startswith("~$"):
+            continue
+        preset = assign_preset(file_name, presets, mapping)
+        if preset is None:
+            statuses.append(_status(file_name, state="略過", error="沒有對應的預設設定"))
+        else:
+            jobs.append((path, preset))
+
+    total = len(jobs)
+    report(progress, "批次處理", 0, total)
+    if jobs:
+        # 以 spawn 啟動工作行程：GUI 從背景執行緒呼叫時 fork 可能複製到鎖住的狀態，且與 Windows 行為一致
+        executor = ProcessPoolExecutor(max_workers=min(batch_workers(workers), total),
+                                       mp_context=multiprocessing.get_context("spawn"))
+        names = batch_output_names([path for path, _ in jobs])
+        try:
+            futures = [executor.submit(process_batch_file, path, preset, output_dir, fmt, clean, names[path])
+                       for path, preset in jobs]
+            for done, future in enumerate(as_completed(futures), 1):
+                status = future.result()
+                statuses.append(status)
+                if on_status is not None:
+                    on_status(status)
+                report(progress, "批次處理", done, total)
+        finally:
+            # 中途取消或發生錯誤時不再開始尚未處理的檔案
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    statuses.sort(key=lambda status: status["檔案"])
+    write_table(pd.DataFrame(statuses), os.path.join(output_dir, BATCH_REPORT_NAME), fmt)
+    return statuses
@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+N-gram 候選篩選（blocking）模組
+以字元 n-gram 倒排索引先找出可能相似的候選鍵值，只對候選配對計算模糊分數
+"""
+
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import process, fuzz
+
+from .progress import ProgressCallback, report
+
+# 出現在超過此比例（且超過 STOP_GRAM_MIN_POSTINGS 筆）清理檔鍵值的 gram 視為停用 gram，不列入索引
+STOP_GRAM_RATIO = 0.05
+STOP_GRAM_MIN_POSTINGS = 50
+
+# 展開一筆倒排列表（排序計數並計算候選分數）約相當於完整比對幾組配對的時間
+EXPANSION_COST = 6
+
+# 估計的計算量超過完整比對的此比例時，候選篩選省不了多少時間，改用完整比對
+FALLBACK_RATIO = 0.5
+
+# 每批展開的候選配對數上限（控制記憶體用量）與每批推算共用下界的查詢數
+PAIR_BATCH = 2_000_000
+NEED_BATCH = 20_000
+
+# 選擇 gram 長度與判斷是否改用完整比對時，只以抽樣的清理檔與主檔鍵值估計計算量
+PLAN_SAMPLE_CHOICES = 5_000
+PLAN_SAMPLE_QUERIES = 2_000
+
+
+def gram_table(keys: List[str], n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次取出所有鍵值的字元 n-gram，以欄位切片取代逐筆迴圈
+    短於 n 的字串（例如兩個字的中文姓名遇到 n=3）以整個字串作為唯一的 gram，空字串沒有 gram
+
+    參數：
+        keys: 清理後的鍵值
+        n: gram 長度
+
+    返回：
+        (gram 所屬的鍵值編號（由小到大）, gram)；同一筆鍵值重複的 gram 只保留一次
+    """
+    # pyarrow 字串欄位的切片比 Python 字串物件快約兩倍
+    dtype = "string[pyarrow]" if importlib.util.find_spec("pyarrow") is not None else object
+    series = pd.Series(keys, dtype=dtype)
+    lengths = series.str.len().to_numpy(dtype=np.int64)
+    owners, grams = [], []
+    # 短於 n 的字串以整個字串作為 gram
+    short = np.flatnonzero((lengths > 0) & (lengths < n))
+    owners.append(short)
+    grams.append(series.to_numpy()[short])
+    for start in range(int(lengths.max(initial=0)) - n + 1):
+        rows = np.flatnonzero(lengths >= start + n)
+        owners.append(rows)
+        grams.append(series.iloc[rows].str.slice(start, start + n).to_numpy())
+    owners = np.concatenate(owners).astype(np.int64)
+    codes, uniques = pd.factorize(np.concatenate(grams))
+    vocab = max(len(uniques), 1)
+    # 排序後去除相鄰重複（numpy 的 np.unique 對未排序的大陣列改用雜湊，反而慢上數十倍）
+    pairs = np.sort(owners * vocab + codes)
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+    return pairs // vocab, np.asarray(uniques, dtype=object)[pairs % vocab]
+
+
+def ngram_size_choices(keys: List[str]) -> List[int]:
+    """
+    依鍵值長度列出可嘗試的 gram 長度
+    短鍵值（例如三個字的中文姓名）使用單字或 2 字元片段，較長的鍵值使用 2 或 3 字元片段；
+    實際使用哪一個由 blocked_fuzzy_match 依估計的計算量決定
+    """
+    lengths = [len(k) for k in keys if k]
+    if not lengths:
+        return [1]
+    return [1, 2] if float(np.median(lengths)) <= 4 else [2, 3]
+
+
+class NGramIndex:
+    """
+    字元 n-gram 倒排索引
+    記錄每個 gram 出現在哪些清理檔鍵值中（以陣列存放，依 gram 排序），用於快速找出候選配對
+
+    出現在超過 max_postings 筆鍵值中的常見 gram（例如 email 的 "com"、"@gm"）視為停用 gram：
+    幾乎每筆都共用，無法區分候選，只會讓候選配對暴增，計算共用數時不展開
+    """
+
+    def __init__(self, keys: List[str], n: int = 1, max_postings: Optional[int] = None):
+        self.n = n
+        self.keys = list(keys)
+        key_ids, grams = gram_table(self.keys, n)
+        gram_ids, uniques = pd.factorize(grams)
+        self.vocab = pd.Index(uniques)
+        # 穩定排序：同一個 gram 的鍵值編號維持由小到大
+        self.postings = key_ids[np.argsort(gram_ids, kind="stable")]
+        self.sizes = np.bincount(gram_ids, minlength=len(self.vocab))
+        self.offsets = (np.cumsum(self.sizes) - self.sizes).astype(np.int64)
+        self.lengths = pd.Series(self.keys, dtype=object).str.len().to_numpy().astype(np.int64)
+        if max_postings is None:
+            max_postings = max(STOP_GRAM_MIN_POSTINGS, int(STOP_GRAM_RATIO * len(self.keys)))
+        self.stop = self.sizes > max_postings
+
+    def query_table(self, queries: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        查詢字串的 gram
+
+        返回：
+            (索引中非停用 gram 所屬的查詢編號（由小到大）, 其 gram 編號,
+             每個查詢可用來篩選的不重複 gram 數（不含停用 gram，包含索引中沒有的 gram）)
+        """
+        owners, grams = gram_table(queries, self.n)
+        ids = self.vocab.get_indexer(grams)
+        stop = np.zeros(len(ids), dtype=bool)
+        stop[ids >= 0] = self.stop[ids[ids >= 0]]
+        usable = np.bincount(owners[~stop], minlength=len(queries))
+        indexed = (ids >= 0) & ~stop
+        return owners[indexed], ids[indexed], usable
+
+    def shared_counts(self, query_ids: np.ndarray, gram_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次計算多筆查詢與索引鍵值共用的 gram 數
+
+        參數：
+            query_ids: 每個查詢 gram 所屬的查詢編號
+            gram_ids: 查詢 gram 的編號（不含停用 gram）
+
+        返回：
+            (配對鍵：查詢編號 × 鍵值數 + 鍵值編號（由小到大）, 共用 gram 數)
+        """
+        sizes = self.sizes[gram_ids]
+        total = int(sizes.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # 展開每個 gram 的倒排列表：第 i 個 gram 對應 postings[offsets[i]:offsets[i] + sizes[i]]
+        within = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        key_ids = self.postings[np.repeat(self.offsets[gram_ids], sizes) + within]
+        pairs = np.repeat(query_ids, sizes) * len(self.keys) + key_ids
+        return np.unique(pairs, return_counts=True)
+
+    def candidates(self, query: str, min_shared: int = 1) -> np.ndarray:
+        """
+        找出與查詢字串共用至少 min_shared 個非停用 gram 的鍵值編號（由小到大排序）
+        """
+        query_ids, gram_ids, _ = self.query_table([query])
+        key_ids, counts = self.shared_counts(query_ids, gram_ids)
+        # 查詢本身的 gram 數少於門檻時（例如很短的姓名），放寬為全部共用即可
+        return key_ids[counts >= min(min_shared, len(gram_ids))]
+
+
+def required_shared(query_lengths: np.ndarray, query_grams: np.ndarray, choice_lengths: np.ndarray,
+                    n: int, threshold: float) -> np.ndarray:
+    """
+    fuzz.ratio 達到門檻的配對至少共用幾個不重複 gram（q-gram 下界）
+
+    fuzz.ratio = 100 × (1 - d / (la + lb))，d 為插入／刪除距離，因此達到門檻時
+    d ≤ (1 - 門檻 / 100) × (la + lb)；從查詢刪除一個字最多破壞 n 個 gram，插入一個字最多破壞 n - 1 個，
+    其餘 gram 一定也出現在候選中。共用數低於此下界的配對不可能達到門檻，不需要計算分數
+
+    參數：
+        query_lengths: 查詢字串長度
+        query_grams: 查詢可用來篩選的不重複 gram 數（不含停用 gram）
+        choice_lengths: 候選字串長度
+        n: gram 長度
+        threshold: 相似度門檻（0-100）
+
+    返回：
+        (查詢數, 候選長度數) 的陣列；長度差距已不可能達到門檻時為 inf，不大於 0 表示無法以 gram 篩選
+    """
+    la = query_lengths[:, None].astype(np.float64)
+    lb = choice_lengths[None, :].astype(np.float64)
+    total = la + lb
+    distance = np.floor((1 - threshold / 100) * total + 1e-9)
+    # 插入／刪除距離與兩邊長度和同奇偶
+    distance -= (distance - total) % 2
+    deletions = np.clip((la - lb + distance) / 2, 0, None)
+    insertions = np.clip((lb - la + distance) / 2, 0, None)
+    need = query_grams[:, None] - (n * deletions + (n - 1) * insertions)
+    # 短於 n 的字串以整個字串作為 gram，上面的下界不適用
+    need = np.where((la < n) | (lb < n), 0, need)
+    return np.where(np.abs(la - lb) <= distance, need, np.inf)
+
+
+def blocked_fuzzy_match(main_keys: pd.Series, clear_keys: pd.Series, threshold: int,
+                        positions: np.ndarray, ngram_size: int = 0, min_shared: int = 1,
+                        recall_sample: int = 200, seed: int = 0,
+                        progress: Optional[ProgressCallback] = None) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    """
+    以 n-gram 候選篩選進行模糊比對
+    與 matching.fuzzy_match 相同的語意（fuzz.ratio、門檻、同分取最前面一筆），
+    但每個主檔鍵值只與共用足夠 gram 的清理檔鍵值計算分數，候選配對分批以 cpdist 計算
+
+    需要共用的 gram 數由門檻與兩邊長度推算（見 required_shared），不會漏掉達到門檻的配對；
+    無法篩選的主檔鍵值（太短或常見 gram 太多）直接與全部清理檔鍵值比對，
+    估計的計算量超過完整比對的 FALLBACK_RATIO 時（例如門檻較低的短 email）整批改用 fuzzy_match
+
+    參數：
+        main_keys: 主檔清理後的鍵值
+        clear_keys: 清理檔清理後的鍵值
+        threshold: 相似度門檻（0-100）
+        positions: exact_match 的結果
+        ngram_size: gram 長度，0 表示依估計的計算量自動選擇（見 ngram_size_choices）
+        min_shared: 大於 1 時另外要求至少共用幾個 gram（速度較快，但可能漏掉拼字差異大的配對）
+        recall_sample: 抽樣多少筆主檔鍵值與全量比對估計召回率，0 表示不估計
+        seed: 抽樣用的亂數種子
+        progress: 每計算一批候選配對回報一次進度
+
+    返回：
+        (更新後的列位置陣列, 是否為模糊比對的布林陣列, 統計資訊)
+    """
+    # 與 matching 互相引用，延後載入
+    from .matching import fuzzy_match
+
+    positions = positions.copy()
+    flags = np.zeros(len(positions), dtype=bool)
+    stats = {
+        "待比對筆數": 0,
+        "候選配對數": 0,
+        "完整配對數": 0,
+        "篩除比例": 0.0,
+        "抽樣召回率": None,
+        "gram 長度": ngram_size,
+        "停用 gram 數": 0,
+        "改用完整比對": False,
+    }
+    pending = np.flatnonzero(positions < 0)
+    if len(pending) == 0 or len(clear_keys) == 0:
+        return positions, flags, stats
+
+    # 清理檔重複鍵值只保留第一筆，相同的主檔鍵值只計算一次
+    clear_series = pd.Series(clear_keys).astype(str).reset_index(drop=True)
+    first = ~clear_series.duplicated(keep="first")
+    choice_positions = np.flatnonzero(first.to_numpy())
+    choices = clear_series[first].tolist()
+    queries, inverse = np.unique(
+        pd.Series(main_keys).astype(str).to_numpy()[pending], return_inverse=True
+    )
+    full_pairs = len(queries) * len(choices)
+    stats.update({"待比對筆數": int(len(pending)), "完整配對數": int(full_pairs)})
+
+    # 以抽樣估計每種 gram 長度的計算量，取最少的一種；省不了多少時間時改用完整比對
+    report(progress, "建立候選索引")
+    rng = np.random.default_rng(seed)
+    sizes = [ngram_size] if ngram_size > 0 else ngram_size_choices(choices)
+    costs = {n: _estimate_cost(choices, queries, n, threshold, min_shared, rng) for n in sizes}
+    ngram_size = min(costs, key=costs.get)
+    stats["gram 長度"] = ngram_size
+    plan = None
+    if costs[ngram_size] <= FALLBACK_RATIO * full_pairs:
+        index = NGramIndex(choices, n=ngram_size)
+        plan = _plan_blocking(index, queries, threshold, min_shared)
+        stats["停用 gram 數"] = int(index.stop.sum())
+    if plan is None or plan["cost"] > FALLBACK_RATIO * full_pairs:
+        positions, flags = fuzzy_match(main_keys, clear_keys, threshold, positions, progress=progress)
+        stats.update({"候選配對數": int(full_pairs), "改用完整比對": True})
+        return positions, flags, stats
+
+    best_pos = np.full(len(queries), -1, dtype=np.int64)
+    candidate_pairs = 0
+
+    # 無法篩選的查詢與全部清理檔鍵值比對（fuzzy_match 分批以 cdist 計算）
+    prunable = plan["prunable"]
+    loose = np.flatnonzero(~prunable)
+    if len(loose):
+        best_pos[loose] = fuzzy_match(pd.Series(queries[loose]), clear_keys, threshold,
+                                      np.full(len(loose), -1, dtype=np.int64))[0]
+        candidate_pairs += len(loose) * len(choices)
+
+    # 可篩選的查詢分批展開倒排列表，每批展開的配對數約 PAIR_BATCH
+    query_lengths = pd.Series(queries, dtype=object).str.len().to_numpy().astype(np.int64)
+    lengths, length_index = np.unique(index.lengths, return_inverse=True)
+    owners, gram_ids = plan["owners"], plan["gram_ids"]
+    targets = np.flatnonzero(prunable)
+    choice_array = np.asarray(choices, dtype=object)
+    local = np.zeros(len(queries), dtype=np.int64)
+    cumulative = np.cumsum(plan["expansions"][targets]) // PAIR_BATCH
+    bounds = [0, *(np.flatnonzero(np.diff(cumulative)) + 1), len(targets)]
+    for batch_start, batch_end in zip(bounds[:-1], bounds[1:]):
+        if batch_end == batch_start:
+            continue
+        report(progress, "模糊比對", batch_start, len(targets))
+        batch = targets[batch_start:batch_end]
+        # 查詢 gram 依查詢編號排序，這一批的 gram 是連續的一段
+        lo, hi = np.searchsorted(owners, [batch[0], batch[-1] + 1])
+        pairs, shared = index.shared_counts(owners[lo:hi], gram_ids[lo:hi])
+        query_ids, choice_ids = np.divmod(pairs, len(choices))
+        need = required_shared(query_lengths[batch], plan["usable"][batch], lengths, index.n, threshold)
+        need = np.maximum(need, plan["floor"][batch, None])
+        # 前綴以外最多還能共用 least - 1 個 gram
+        local[batch] = np.arange(len(batch))
+        rows = local[query_ids]
+        keep = shared >= need[rows, length_index[choice_ids]] - (plan["least"][batch][rows] - 1)
+        query_ids, choice_ids = query_ids[keep], choice_ids[keep]
+        candidate_pairs += len(query_ids)
+        if len(query_ids) == 0:
+            continue
+        # 每個查詢取最高分，同分取最前面的清理檔鍵值
+        scores = process.cpdist(
+            queries[query_ids].tolist(), choice_array[choice_ids].tolist(),
+            scorer=fuzz.ratio, score_cutoff=threshold, dtype=np.float32, workers=-1
+        )
+        passed = np.flatnonzero(scores >= threshold)
+        if len(passed) == 0:
+            continue
+        order = passed[np.lexsort((choice_ids[passed], -scores[passed], query_ids[passed]))]
+        leaders = order[np.r_[True, query_ids[order][1:] != query_ids[order][:-1]]]
+        best_pos[query_ids[leaders]] = choice_positions[choice_ids[leaders]]
+    report(progress, "模糊比對", len(targets), len(targets))
+
+    # 以抽樣的全量比對估計召回率：篩選後仍找到與全量相同最高分的比例
+    if recall_sample > 0:
+        report(progress, "估計召回率")
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(len(queries), size=min(recall_sample, len(queries)), replace=False)
+        scores = process.cdist(
+            queries[sample].tolist(), choices, scorer=fuzz.ratio,
+            score_cutoff=threshold, dtype=np.float32, workers=-1
+        )
+        full_best = scores.max(axis=1)
+        blocked_best = np.array([
+            fuzz.ratio(queries[q], clear_series[best_pos[q]]) if best_pos[q] >= 0 else -1.0
+            for q in sample
+        ], dtype=np.float32)
+        full_hits = full_best >= threshold
+        total = int(full_hits.sum())
+        recalled = int((blocked_best[full_hits] >= full_best[full_hits]).sum())
+        stats["抽樣召回率"] = recalled / total if total else 1.0
+
+    resolved = best_pos[inverse]
+    hit = resolved >= 0
+    positions[pending[hit]] = resolved[hit]
+    flags[pending[hit]] = True
+
+    stats.update({
+        "候選配對數": int(candidate_pairs),
+        "篩除比例": float(1 - candidate_pairs / full_pairs) if full_pairs else 0.0,
+    })
+    return positions, flags, stats
+
+
+def _plan_blocking(index: NGramIndex, queries: np.ndarray, threshold: int, min_shared: int) -> Dict:
+    """
+    找出可篩選的查詢、每個查詢需要展開的 gram，並估計計算量（以完整比對的配對數為單位）
+
+    前綴篩選：查詢有 u 個可篩選的 gram、候選至少要共用 k 個時，候選一定共用其中最少見的 u - k + 1 個之一，
+    只需要展開這些 gram 的倒排列表（索引中沒有的 gram 最少見，不需要展開）
+
+    返回：
+        {"owners" / "gram_ids"（要展開的 gram）, "usable"（可篩選的 gram 數）,
+         "floor"（min_shared 要求的下限）, "least"（各候選長度中最少需要共用的 gram 數）,
+         "prunable", "expansions"（展開的倒排列表長度）, "cost"}
+    """
+    owners, gram_ids, usable = index.query_table(list(queries))
+    query_lengths = pd.Series(queries, dtype=object).str.len().to_numpy().astype(np.int64)
+    floor = np.minimum(min_shared, usable) if min_shared > 1 else np.zeros(len(queries), dtype=np.int64)
+    lengths = np.unique(index.lengths)
+    prunable = np.ones(len(queries), dtype=bool)
+    least = np.ones(len(queries), dtype=np.int64)
+    for start in range(0, len(queries), NEED_BATCH):
+        end = start + NEED_BATCH
+        need = required_shared(query_lengths[start:end], usable[start:end], lengths, index.n, threshold)
+        need = np.maximum(need, floor[start:end, None])
+        # 任何一種候選長度無法篩選時，這個查詢只能與全部鍵值比對
+        prunable[start:end] = (need > 0).all(axis=1)
+        finite = np.where(np.isfinite(need), need, np.iinfo(np.int64).max).min(axis=1, initial=np.iinfo(np.int64).max)
+        least[start:end] = np.clip(np.ceil(np.minimum(finite, usable[start:end] + 1)), 1, None)
+
+    # 每個查詢依倒排列表長度由短到長排列，只保留前綴
+    sizes = index.sizes[gram_ids]
+    order = np.lexsort((sizes, owners))
+    owners, gram_ids, sizes = owners[order], gram_ids[order], sizes[order]
+    counts = np.bincount(owners, minlength=len(queries))
+    rank = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+    unknown = usable - counts
+    keep = prunable[owners] & (rank < (usable - least + 1 - unknown)[owners])
+    owners, gram_ids = owners[keep], gram_ids[keep]
+    expansions = np.bincount(owners, weights=sizes[keep], minlength=len(queries)).astype(np.int64)
+    cost = EXPANSION_COST * int(expansions.sum()) + int((~prunable).sum()) * len(index.keys)
+    return {"owners": owners, "gram_ids": gram_ids, "usable": usable, "floor": floor, "least": least,
+            "prunable": prunable, "expansions": expansions, "cost": cost}
+
+
+def _estimate_cost(choices: List[str], queries: np.ndarray, n: int, threshold: int, min_shared: int,
+                   rng: np.random.Generator) -> float:
+    """以抽樣的清理檔與主檔鍵值估計使用 gram 長度 n 時的計算量（以完整比對的配對數為單位）"""
+    sample_choices = [choices[i] for i in np.sort(rng.choice(
+        len(choices), size=min(PLAN_SAMPLE_CHOICES, len(choices)), replace=False))]
+    sample_queries = queries[np.sort(rng.choice(
+        len(queries), size=min(PLAN_SAMPLE_QUERIES, len(queries)), replace=False))]
+    scale = len(choices) / len(sample_choices)
+    # 停用 gram 的門檻換算為抽樣中的筆數
+    max_postings = max(STOP_GRAM_MIN_POSTINGS, int(STOP_GRAM_RATIO * len(choices))) / scale
+    index = NGramIndex(sample_choices, n=n, max_postings=int(max_postings))
+    plan = _plan_blocking(index, sample_queries, threshold, min_shared)
+    return plan["cost"] * scale * len(queries) / len(sample_queries)
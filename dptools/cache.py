@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+讀取快取模組
+將解析後的資料框架存到磁碟，依「檔案內容雜湊 + 讀取設定」作為鍵值；
+同一個大型檔案以相同設定重複讀取時直接載入快取，不再重新解析 Excel / CSV；
+快取只以 Parquet 儲存（需要 pyarrow），不使用 pickle，共用快取資料夾中的檔案無法用來執行程式碼
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+# 快取資料夾，可用環境變數 DPTOOLS_CACHE_DIR 指定
+CACHE_DIR = os.environ.get("DPTOOLS_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "dptools")
+# 快取總大小上限（位元組），超過時刪除最久未使用的項目
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+# 快取格式版本，讀取邏輯改變時遞增即可讓舊快取失效
+CACHE_VERSION = 2
+# 計算檔案雜湊時每次讀取的位元組數
+HASH_BLOCK_SIZE = 1024 * 1024
+# 檔案雜湊快取的最大檔案數
+HASH_CACHE_SIZE = 256
+
+# 檔案雜湊快取：(路徑, 檔案大小, 修改時間) → 內容雜湊
+_hash_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+
+def file_digest(path: str) -> str:
+    """
+    計算檔案內容的雜湊值
+    結果依 (路徑, 檔案大小, 修改時間) 快取，同一個行程內重複讀取不會重新計算
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key in _hash_cache:
+        _hash_cache.move_to_end(key)
+        return _hash_cache[key]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+
+    _hash_cache[key] = digest.hexdigest()
+    if len(_hash_cache) > HASH_CACHE_SIZE:
+        _hash_cache.popitem(last=False)
+    return _hash_cache[key]
+
+
+class ReadCache:
+    """
+    磁碟上的解析結果快取
+    每個項目以「來源路徑 + 讀取設定」的雜湊為前綴、檔案內容雜湊為後綴命名：
+    來源檔案內容改變時鍵值跟著改變，寫入新項目時同一前綴的舊項目會被刪除；
+    總大小超過上限時依最後使用時間刪除最久未使用的項目。
+    只以 Parquet 儲存：沒有安裝 pyarrow，或欄位型別無法以 Parquet 完整保存時（例如混雜數字與文字的欄位）不快取；
+    舊版留下的 pickle 項目只會被淘汰刪除，不會載入
+
+    參數：
+        directory: 快取資料夾
+        max_bytes: 快取總大小上限
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _prefix(self, path: str, settings: Dict) -> str:
+        text = json.dumps({"path": os.path.abspath(path), "version": CACHE_VERSION, **settings},
+                          sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+    def _entries(self):
+        """列出所有快取項目的 (檔名, 大小, 最後使用時間)"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith((".parquet", ".pkl")):
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_size, stat.st_mtime))
+        return entries
+
+    @staticmethod
+    def enabled() -> bool:
+        """快取需要 pyarrow 才能以 Parquet 儲存"""
+        return importlib.util.find_spec("pyarrow") is not None
+
+    def get(self, path: str, settings: Dict) -> Optional[pd.DataFrame]:
+        """取得快取的資料框架，沒有快取或快取已失效時返回 None"""
+        if not self.enabled():
+            return None
+        entry = os.path.join(self.directory, f"{self._prefix(path, settings)}-{file_digest(path)}.parquet")
+        if not os.path.exists(entry):
+            return None
+        try:
+            df = pd.read_parquet(entry)
+            # 更新最後使用時間，供 LRU 淘汰使用
+            os.utime(entry)
+            return df
+        except Exception:
+            # 快取檔案損毀或已被其他行程淘汰，視為沒有快取
+            return None
+
+    def put(self, path: str, settings: Dict, df: pd.DataFrame) -> None:
+        """寫入快取並淘汰同一來源的舊版本與超過大小上限的項目；無法以 Parquet 完整保存時不寫入"""
+        if not self.enabled():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = self._prefix(path, settings)
+        name = f"{prefix}-{file_digest(path)}"
+        # 先寫到暫存檔再更名，避免其他行程讀到寫到一半的檔案
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            try:
+                df.to_parquet(temp, index=True)
+                # 確認 Parquet 可以完整還原欄位名稱與型別
+                stored = pd.read_parquet(temp).dtypes.equals(df.dtypes)
+            except Exception:
+                stored = False
+            if not stored:
+                return
+            os.replace(temp, os.path.join(self.directory, name + ".parquet"))
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+        for entry, _, _ in self._entries():
+            if entry.startswith(prefix + "-") and not entry.startswith(name + "."):
+                self._remove(entry)
+        self.evict()
+
+    def evict(self) -> None:
+        """刪除最久未使用的項目，直到總大小不超過上限"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(entry)
+            total -= size
+
+    def _remove(self, entry: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, entry))
+        except OSError:
+            pass
+
+    def size(self) -> int:
+        """快取目前的總大小（位元組）"""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self) -> None:
+        """刪除所有快取項目"""
+        for entry, _, _ in self._entries():
+            self._remove(entry)
+
+    def load(self, path: str, settings: Dict, reader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        有快取時直接載入，否則呼叫 reader 讀取並寫入快取
+
+        參數：
+            path: 來源檔案路徑
+            settings: 影響讀取結果的設定（跳過列數、欄位、編碼等）
+            reader: 沒有快取時讀取檔案的函數
+
+        返回：
+            資料框架
+        """
+        df = self.get(path, settings)
+        if df is None:
+            df = reader()
+            try:
+                self.put(path, settings, df)
+            except OSError:
+                # 快取資料夾無法寫入時仍返回讀取結果
+                pass
+        return df
+
+
+_default_cache: Optional[ReadCache] = None
+
+
+def default_cache() -> ReadCache:
+    """共用的快取（位於 CACHE_DIR，大小上限 CACHE_MAX_BYTES）"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ReadCache()
+    return _default_cache
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+資料清理模組
+提供文字正規化與欄位選擇等不依賴 GUI 的清理函式
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 全形轉半形：全形 ASCII 字元（U+FF01–U+FF5E）對應到半形（U+0021–U+007E），全形空格轉為一般空格
+HALFWIDTH_TABLE = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+HALFWIDTH_TABLE[0x3000] = 0x20
+
+# 所有空白字元（與正規表示式 \s 相同，最大為全形空格 U+3000）
+WHITESPACE_CHARS = "".join(chr(code) for code in range(0x3001) if chr(code).isspace())
+
+# 比對鍵值正規化：全形轉半形並刪除所有空白字元，一次 str.translate 完成
+NORMALIZE_TABLE = {**HALFWIDTH_TABLE, **{ord(ch): None for ch in WHITESPACE_CHARS}}
+
+
+def clean_text(text) -> str:
+    """
+    文字清理函式
+    將文字進行標準化處理：全形轉半形、移除空白字元與全形空格，並轉為小寫
+    這樣可以提高比對的準確性
+
+    參數：
+        text: 要清理的文字
+
+    返回：
+        清理後的文字字串
+    """
+    if pd.isna(text):  # 檢查是否為空值
+        return ""
+    return str(text).translate(NORMALIZE_TABLE).lower()
+
+
+def clean_series(series: pd.Series) -> pd.Series:
+    """
+    對整個欄位進行文字清理
+    重複的值只清理一次，再以 str.translate 與 str.lower 套用與 clean_text 相同的規則
+
+    參數：
+        series: 要清理的欄位
+
+    返回：
+        清理後的字串欄位，空值為空字串
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # 類別欄位只清理每個類別一次，空值（代碼 -1）對應到最後的空字串
+        categories = clean_series(pd.Series(series.cat.categories)).to_numpy()
+        cleaned = np.append(categories, "").astype(object)[series.cat.codes.to_numpy()]
+        return pd.Series(cleaned, index=series.index, dtype=object)
+
+    # 先轉為 object，讓日期等型別的字串表示與 str() 一致
+    values = series.astype(object)
+    missing = values.isna().to_numpy()
+    text = values.astype(str)
+    # pandas 的雜湊表會在 NUL 字元處截斷字串，含 NUL 的值不參與去重
+    has_nul = text.str.contains("\x00", regex=False).to_numpy()
+
+    cleaned = np.empty(len(text), dtype=object)
+    codes, uniques = pd.factorize(text[~has_nul])
+    normalized = pd.Series(uniques, dtype=object).str.translate(NORMALIZE_TABLE).str.lower()
+    cleaned[~has_nul] = normalized.to_numpy().take(codes)
+    cleaned[has_nul] = [value.translate(NORMALIZE_TABLE).lower() for value in text[has_nul]]
+    cleaned[missing] = ""
+    return pd.Series(cleaned, index=series.index, dtype=object)
+
+
+def normalize_width(series: pd.Series) -> pd.Series:
+    """
+    將文字欄位全形轉半形並去除前後空白，非字串的值保持不變
+
+    參數：
+        series: 要處理的欄位
+
+    返回：
+        處理後的欄位
+    """
+    converted = series.str.translate(HALFWIDTH_TABLE).str.strip(WHITESPACE_CHARS)
+    # 非字串的值在 .str 操作後會變成空值，保留原值
+    return converted.where(converted.notna(), series)
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    清理整個資料框架
+    文字欄位全形轉半形並去除前後空白，並移除整列皆為空值的資料列
+
+    參數：
+        df: 原始資料框架
+
+    返回：
+        清理後的新資料框架
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = normalize_width(df[col])
+    df = df.replace("", pd.NA)
+    return df.dropna(how="all").reset_index(drop=True)
+
+
+def parse_columns(text) -> Optional[List[int]]:
+    """
+    解析欄位選擇設定
+    接受 "all"、逗號分隔的欄位編號字串或整數列表
+
+    參數：
+        text: 欄位設定
+
+    返回：
+        欄位編號列表；選擇全部欄位時返回 None
+
+    例外：
+        ValueError: 欄位編號不是整數
+    """
+    if text is None:
+        return None
+    if isinstance(text, (list, tuple)):
+        return [int(x) for x in text]
+    text = str(text).strip()
+    if text.lower() == "all" or text == "":
+        return None
+    return [int(x.strip()) for x in text.split(',')]
+
+
+def select_columns(df: pd.DataFrame, columns: Optional[List[int]]) -> pd.DataFrame:
+    """
+    依欄位編號篩選資料，columns 為 None 時保留全部欄位
+    """
+    if columns is None:
+        return df
+    return df.iloc[:, columns]
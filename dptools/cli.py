@@ -4,26 +4,190 @@
 Data Processing Tools CLI Entry Point
 """
 
-import sys
-import subprocess
+import argparse
+import json
 import os
+import sys
+from typing import List, Optional
 
-def main():
-    """主函數：根據參數決定啟動 GUI 或 CLI 模式"""
-    
-    # 獲取專案根目錄
+
+def parse_keys(text: str) -> List[str]:
+    """將逗號分隔的欄位名稱字串轉為列表"""
+    return [k.strip() for k in text.split(',') if k.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """建立命令列參數解析器"""
+    parser = argparse.ArgumentParser(
+        prog="excel-tools",
+        description="Excel/CSV 清理與比對工具（不帶參數執行時啟動 GUI）",
+    )
+    parser.add_argument("--left", required=True, help="左邊（主檔）Excel/CSV 檔案")
+    parser.add_argument("--right", required=True, help="右邊（新檔）Excel/CSV 檔案")
+    parser.add_argument("--left-key", required=True, help="左邊鍵值欄位，多個欄位用逗號分隔")
+    parser.add_argument("--right-key", help="右邊鍵值欄位，預設與 --left-key 相同")
+    parser.add_argument("--output", default="out", help="輸出資料夾（預設: out）")
+    parser.add_argument("--fuzzy-col", help="模糊比對欄位，例如 姓名")
+    parser.add_argument("--fuzzy-threshold", type=int, default=85,
+                        help="模糊比對相似度門檻 0-100（預設: 85）")
+    parser.add_argument("--block-min-shared", type=int, default=0,
+                        help="模糊比對候選篩選：1 表示依門檻推算需要共用的字元片段數（結果與完整比對相同），"
+                             "更大的值另外要求至少共用幾個片段（較快但可能漏配），0 表示不篩選（預設: 0）")
+    parser.add_argument("--format", choices=["xlsx", "csv", "parquet"], default="xlsx",
+                        help="結果檔案格式，parquet 需要安裝 pyarrow（預設: xlsx）")
+    parser.add_argument("--compact", action="store_true",
+                        help="清理後改用較省記憶體的欄位型別（類別、Arrow 字串、較小的數值型別），結果不變")
+    parser.add_argument("--stage-report", help="將各階段的時間、CPU 時間、每秒筆數與記憶體峰值寫成 JSON 檔案")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="以 tracemalloc 記錄各階段的 Python 記憶體峰值（會變慢）")
+    parser.add_argument("--profile", help="以 cProfile 執行並將分析檔寫到此路徑（可用 python -m pstats 開啟）")
+    return parser
+
+
+def build_batch_parser() -> argparse.ArgumentParser:
+    """建立批次處理的命令列參數解析器"""
+    parser = argparse.ArgumentParser(
+        prog="excel-tools batch",
+        description="依廠商預設設定平行處理資料夾中的所有檔案",
+    )
+    parser.add_argument("directory", help="輸入資料夾")
+    parser.add_argument("--output", default="out", help="輸出資料夾（預設: out）")
+    parser.add_argument("--mapping", help="檔名樣式對應預設設定的 JSON 檔案，例如 {\"*香連*\": \"香連\"}；"
+                                          "未指定時以檔名中的廠商名稱決定")
+    parser.add_argument("--workers", type=int, help="同時處理的檔案數量（預設: CPU 核心數）")
+    parser.add_argument("--format", choices=["xlsx", "csv", "parquet"], default="xlsx",
+                        help="輸出檔案格式，parquet 需要安裝 pyarrow（預設: xlsx）")
+    parser.add_argument("--clean", action="store_true", help="清理文字（去空白、全形轉半形、移除空白列）")
+    return parser
+
+
+def run_batch_cli(argv: List[str]) -> int:
+    """
+    執行批次處理，每完成一個檔案印出狀態與耗時
+
+    參數：
+        argv: 命令列參數（不含 "batch"）
+
+    返回：
+        結束代碼（有任何檔案失敗時為 1）
+    """
+    args = build_batch_parser().parse_args(argv)
+    from .batch import run_batch
+
+    def print_status(status):
+        if status["狀態"] == "完成":
+            print(f"   ✅ {status['檔案']}（{status['預設設定']}）{status['筆數']} 筆，{status['總秒數']:.2f} 秒")
+        else:
+            print(f"   ❌ {status['檔案']}（{status['預設設定']}）{status['錯誤']}")
+
+    try:
+        mapping = None
+        if args.mapping:
+            with open(args.mapping, 'r', encoding='utf-8') as f:
+                mapping = json.load(f)
+        statuses = run_batch(args.directory, args.output, mapping=mapping, workers=args.workers,
+                             fmt=args.format, clean=args.clean, on_status=print_status)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"❌ 批次處理失敗: {e}", file=sys.stderr)
+        return 1
+
+    counts = {}
+    for status in statuses:
+        counts[status["狀態"]] = counts.get(status["狀態"], 0) + 1
+    for status in statuses:
+        if status["狀態"] == "略過":
+            print(f"   ⏭️  {status['檔案']}：{status['錯誤']}")
+    print(f"✅ 批次處理結束（{'、'.join(f'{k} {v} 個' for k, v in counts.items()) or '沒有檔案'}），"
+          f"結果已儲存於: {os.path.abspath(args.output)}")
+    return 1 if counts.get("失敗") else 0
+
+
+def run_cli(argv: List[str]) -> int:
+    """
+    在目前的行程中執行比對流程
+
+    參數：
+        argv: 命令列參數（不含程式名稱）
+
+    返回：
+        結束代碼
+    """
+    args = build_parser().parse_args(argv)
+    left_keys = parse_keys(args.left_key)
+    right_keys = parse_keys(args.right_key) if args.right_key else left_keys
+
+    # 延後載入比對流程，避免 --help 等情況也要載入 pandas
+    from .pipeline import run_reconciliation
+    from .profiling import StageProfiler, format_report, profile_call
+
+    profiler = StageProfiler(trace_memory=args.trace_memory)
+
+    def run():
+        return run_reconciliation(
+            args.left, args.right, left_keys, right_keys, args.output,
+            fuzzy_col=args.fuzzy_col, fuzzy_threshold=args.fuzzy_threshold,
+            block_min_shared=args.block_min_shared, output_format=args.format,
+            compact=args.compact, progress=profiler,
+        )
+
+    try:
+        if args.profile:
+            summary, profile_text = profile_call(run, args.profile)
+        else:
+            summary = run()
+    except (OSError, KeyError, ValueError) as e:
+        print(f"❌ 比對失敗: {e}", file=sys.stderr)
+        return 1
+    finally:
+        profiler.finish()
+
+    outputs = summary.pop("輸出檔案")
+    for name, value in summary.items():
+        print(f"   - {name}: {value}")
+    print(f"✅ 比對完成，結果已儲存於: {os.path.abspath(args.output)}")
+    for path in outputs.values():
+        print(f"   - {os.path.basename(path)}")
+
+    # 只有要求效能資訊時才印出階段表，一般執行的輸出維持精簡
+    if args.stage_report or args.trace_memory or args.profile:
+        print("⏱️  各階段效能:")
+        print(format_report(profiler.report()))
+    if args.stage_report:
+        print(f"   - 階段報告: {profiler.write_json(args.stage_report)}")
+    if args.profile:
+        print(f"   - cProfile 分析檔: {args.profile}")
+        print(profile_text)
+    return 0
+
+
+def run_gui() -> int:
+    """啟動 GUI 模式"""
+    # 獲取專案根目錄，main.py 位於該處
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
-    if len(sys.argv) == 1:
+    sys.path.insert(0, project_root)
+    from PyQt5.QtWidgets import QApplication
+    from main import MainWindow
+
+    app = QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    return app.exec_()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函數：根據參數決定啟動 GUI 或 CLI 模式"""
+    argv = sys.argv[1:] if argv is None else argv
+
+    if not argv:
         # 無參數：啟動 GUI 模式
         print("🚀 啟動 Data Processing Tools GUI 模式...")
-        gui_script = os.path.join(project_root, "main.py")
-        subprocess.run([sys.executable, gui_script], check=False)
-    else:
-        # 有參數：啟動 CLI 模式
-        print("⌨️  啟動 Data Processing Tools CLI 模式...")
-        cli_script = os.path.join(project_root, "excel_matcher.py")
-        subprocess.run([sys.executable, cli_script] + sys.argv[1:], check=False)
+        return run_gui()
+
+    # 有參數：在同一個行程中執行 CLI 比對或批次處理
+    print("⌨️  啟動 Data Processing Tools CLI 模式...")
+    if argv[0] == "batch":
+        return run_batch_cli(argv[1:])
+    return run_cli(argv)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+精簡記憶體模組
+將讀入的資料框架改用較省記憶體的欄位型別：重複值多的文字欄位改為類別，
+其餘文字欄位在有安裝 pyarrow 時改為 Arrow 字串，數值欄位在不損失精度時縮小位元數
+"""
+
+import importlib.util
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# 不重複值比例不超過此值的文字欄位改為類別型別
+CATEGORY_MAX_RATIO = 0.5
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """資料框架實際佔用的記憶體（MB，包含文字內容）"""
+    return float(df.memory_usage(deep=True).sum()) / 1024 ** 2
+
+
+def compact_series(series: pd.Series, category_max_ratio: float = CATEGORY_MAX_RATIO) -> pd.Series:
+    """
+    將單一欄位轉為較省記憶體的型別，值不變
+
+    參數：
+        series: 欄位
+        category_max_ratio: 文字欄位不重複值比例不超過此值時改為類別型別
+
+    返回：
+        轉換後的欄位（無法精簡時返回原欄位）
+    """
+    if series.dtype == object:
+        try:
+            unique = series.nunique(dropna=True)
+        except TypeError:
+            # 含有無法雜湊的值（例如列表），保持原樣
+            return series
+        if unique <= category_max_ratio * len(series):
+            return series.astype("category")
+        # Arrow 字串以連續的緩衝區存放內容，不需要每個值一個 Python 物件
+        if importlib.util.find_spec("pyarrow") is not None \
+                and pd.api.types.infer_dtype(series, skipna=True) == "string":
+            return series.astype("string[pyarrow]")
+        return series
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    if pd.api.types.is_integer_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series.dtype) and series.dtype == np.float64:
+        # 只有轉成 float32 後數值完全相同時才縮小（金額等小數通常無法以 float32 精確表示）
+        narrow = series.astype(np.float32)
+        values = series.to_numpy()
+        if np.array_equal(narrow.to_numpy().astype(np.float64), values, equal_nan=True):
+            return narrow
+    return series
+
+
+def compact_frame(df: pd.DataFrame, category_max_ratio: float = CATEGORY_MAX_RATIO) -> pd.DataFrame:
+    """
+    將資料框架的欄位轉為較省記憶體的型別
+    值與欄位順序不變，比對、清理與寫出的結果與原資料相同；
+    轉換前後的記憶體用量放在結果的 attrs["compact"]
+
+    參數：
+        df: 資料框架
+        category_max_ratio: 文字欄位不重複值比例不超過此值時改為類別型別
+
+    返回：
+        精簡後的資料框架
+    """
+    before = frame_memory_mb(df)
+    columns = [compact_series(df.iloc[:, i], category_max_ratio) for i in range(df.shape[1])]
+    result = pd.concat(columns, axis=1) if columns else df.iloc[:, :0]
+    result.columns = df.columns
+    result.attrs["compact"] = memory_saving(before, frame_memory_mb(result))
+    return result
+
+
+def memory_saving(before: float, after: float) -> Dict[str, float]:
+    """整理精簡前後的記憶體用量（MB）與節省比例"""
+    return {
+        "原始 MB": round(before, 2),
+        "精簡後 MB": round(after, 2),
+        "節省比例": round(1 - after / before, 4) if before > 0 else 0.0,
+    }
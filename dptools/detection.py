@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+報表結構偵測模組
+分析檔案前幾列，推測表頭位置與欄位類型
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .presets import FIELD_KEYWORDS
+
+# 表頭常見的關鍵字
+HEADER_KEYWORDS = ['名稱', '編號', '數量', '價格', '日期', '時間', 'name', 'id', 'qty', 'price', 'date']
+
+# 偵測表頭時檢查的列數（廠商報表前面可能有十幾列的標題與說明）
+HEADER_PROBE_ROWS = 200
+
+# 推斷欄位類型時最多抽樣的資料筆數
+TYPE_SAMPLE_SIZE = 1000
+# 依序嘗試的日期格式，"ROC" 表示民國年（見 parse_roc_dates）
+DATE_FORMATS = ["%Y-%m-%d", "%Y/%m/%d", "%Y%m%d", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S",
+                "%Y/%m/%d %H:%M", "%m/%d/%Y", "%d/%m/%Y", "ROC"]
+# 視為布林值的文字與對應的值
+BOOL_VALUES = {'true': True, 'false': False, '是': True, '否': False, '1': True, '0': False}
+
+# 民國年日期：112/01/05、112.1.5、112-01-05、民國112年1月5日，或七位數的 1120105
+_ROC_PATTERN = (r'^\s*(?:民國)?\s*(?P<y>\d{2,3})\s*[/.\-年]\s*(?P<m>\d{1,2})\s*[/.\-月]'
+                r'\s*(?P<d>\d{1,2})\s*日?\s*$')
+_ROC_COMPACT_PATTERN = r'^\s*(?P<y>\d{3})(?P<m>\d{2})(?P<d>\d{2})\s*$'
+
+# 各欄位上次成功的日期格式，同一種報表的下一個檔案會先試這個格式
+_format_cache: Dict[str, str] = {}
+
+
+def calculate_header_score(row, keywords: Optional[List[str]] = None) -> float:
+    """計算某一行作為表頭的可能性分數，keywords 為 None 時使用 HEADER_KEYWORDS"""
+    keywords = HEADER_KEYWORDS if keywords is None else keywords
+    score = 0
+
+    for val in row:
+        val_str = str(val).lower()
+
+        # 檢查是否包含常見的表頭關鍵字
+        if any(keyword.lower() in val_str for keyword in keywords if keyword):
+            score += 2
+
+        # 檢查是否為文字（表頭通常是文字）
+        if isinstance(val, str) and not val.isdigit():
+            score += 1
+
+        # 檢查是否為空值（表頭通常不為空）
+        if pd.notna(val):
+            score += 1
+
+    return score
+
+
+def parse_roc_dates(data: pd.Series) -> pd.Series:
+    """
+    將民國年日期轉為日期（民國年 + 1911），無法解析的值為 NaT
+
+    參數：
+        data: 日期文字
+
+    返回：
+        datetime64 資料
+    """
+    # 同一個日期通常重複出現很多次，只解析不重複的值
+    codes, uniques = pd.factorize(data.astype(str))
+    text = pd.Series(uniques)
+    parts = text.str.extract(_ROC_PATTERN).fillna(text.str.extract(_ROC_COMPACT_PATTERN))
+    parts = parts.apply(pd.to_numeric, errors='coerce')
+    parsed = pd.to_datetime(
+        pd.DataFrame({'year': parts['y'] + 1911, 'month': parts['m'], 'day': parts['d']}),
+        errors='coerce'
+    ).to_numpy()
+    return pd.Series(parsed[codes], index=data.index)
+
+
+def parse_dates(data: pd.Series, date_format: Optional[str]) -> pd.Series:
+    """依 infer_column_spec 偵測到的格式解析日期，None 表示逐筆自動判斷格式（較慢）"""
+    if pd.api.types.is_datetime64_any_dtype(data):
+        return data
+    if date_format == "ROC":
+        return parse_roc_dates(data)
+    if date_format is None:
+        return pd.to_datetime(data, errors='coerce', format='mixed')
+    return pd.to_datetime(data.astype(str), errors='coerce', format=date_format)
+
+
+def _detect_date_format(sample: pd.Series, name: Optional[str],
+                        ratio: float) -> Tuple[bool, Optional[str]]:
+    """依序嘗試快取的格式與 DATE_FORMATS，最後才逐筆自動判斷"""
+    cached = _format_cache.get(name) if name is not None else None
+    formats = ([cached] if cached else []) + [f for f in DATE_FORMATS if f != cached]
+    for date_format in formats:
+        if parse_dates(sample, date_format).notna().mean() > ratio:
+            if name is not None:
+                _format_cache[name] = date_format
+            return True, date_format
+    if parse_dates(sample, None).notna().mean() > ratio:
+        return True, None
+    return False, None
+
+
+def infer_column_spec(data: pd.Series, name: Optional[str] = None,
+                      sample_size: int = TYPE_SAMPLE_SIZE, seed: int = 0) -> Dict:
+    """
+    以抽樣推斷欄位類型與對應的 pandas dtype
+    判斷順序與門檻（超過 80% 符合）和 infer_column_type 相同：數值、日期、布林值、文字
+
+    參數：
+        data: 欄位資料
+        name: 欄位名稱，用於快取偵測到的日期格式
+        sample_size: 最多抽樣的非空值筆數
+        seed: 抽樣用的亂數種子
+
+    返回：
+        {"類型": 中文類型名稱, "dtype": pandas dtype 名稱, "格式": 日期格式或 None}
+    """
+    clean_data = data.dropna()
+    if len(clean_data) == 0:
+        return {"類型": "未知", "dtype": "object", "格式": None}
+    if len(clean_data) > sample_size:
+        clean_data = clean_data.sample(sample_size, random_state=seed)
+
+    if pd.api.types.is_datetime64_any_dtype(clean_data):
+        return {"類型": "日期", "dtype": "datetime64[ns]", "格式": None}
+
+    # 檢查是否為數字
+    numeric = pd.to_numeric(clean_data, errors='coerce')
+    if numeric.notna().mean() > 0.8:
+        valid = numeric.dropna()
+        integral = bool((valid == np.floor(valid)).all())
+        return {"類型": "數值", "dtype": "Int64" if integral else "float64", "格式": None}
+
+    # 檢查是否為日期
+    is_date, date_format = _detect_date_format(clean_data, name, 0.8)
+    if is_date:
+        return {"類型": "日期", "dtype": "datetime64[ns]", "格式": date_format}
+
+    # 檢查是否為布林值
+    if clean_data.astype(str).str.lower().isin(list(BOOL_VALUES)).mean() > 0.8:
+        return {"類型": "布林值", "dtype": "boolean", "格式": None}
+
+    return {"類型": "文字", "dtype": "object", "格式": None}
+
+
+def infer_column_type(data: pd.Series) -> str:
+    """推斷欄位類型"""
+    return infer_column_spec(data)["類型"]
+
+
+def convert_column(data: pd.Series, spec: Dict) -> Optional[pd.Series]:
+    """
+    依 infer_column_spec 的結果轉換整個欄位
+    只有全部非空值都能轉換時才回傳結果，否則回傳 None（保留原始資料，不會把資料變成空值）
+    """
+    dtype = spec["dtype"]
+    if dtype == "object" or str(data.dtype) == dtype:
+        return None
+    if dtype in ("Int64", "float64"):
+        converted = pd.to_numeric(data, errors='coerce')
+        if dtype == "Int64" and (converted.dropna() == np.floor(converted.dropna())).all():
+            converted = converted.astype("Int64" if converted.isna().any() else "int64")
+    elif dtype == "datetime64[ns]":
+        converted = parse_dates(data, spec["格式"])
+    elif dtype == "boolean":
+        converted = data.astype(str).str.lower().map(BOOL_VALUES).astype("boolean")
+    else:
+        return None
+    if (converted.isna() & data.notna()).any():
+        return None
+    return converted
+
+
+def apply_column_types(df: pd.DataFrame, specs: List[Dict],
+                       columns: Optional[List[int]] = None) -> pd.DataFrame:
+    """
+    將偵測到的欄位類型套用到完整讀取的資料，避免後續處理都是 object 欄位
+
+    參數：
+        df: 完整讀取的資料框架（會直接修改）
+        specs: 依原始欄位順序排列的欄位規格（analyze_file_structure 的「欄位規格」）
+        columns: 讀取時保留的欄位編號，None 表示全部
+
+    返回：
+        轉換後的資料框架
+    """
+    positions = range(len(df.columns)) if columns is None else columns
+    for i, position in enumerate(positions):
+        if i >= len(df.columns) or position >= len(specs):
+            continue
+        converted = convert_column(df.iloc[:, i], specs[position])
+        if converted is not None:
+            df.isetitem(i, converted)
+    return df
+
+
+def header_keywords(field_keywords: Dict[str, List[str]]) -> List[str]:
+    """偵測表頭使用的關鍵字：HEADER_KEYWORDS 加上各欄位類別的關鍵字"""
+    return HEADER_KEYWORDS + [k for words in field_keywords.values() for k in words]
+
+
+def _keyword_pattern(keywords: List[str]) -> str:
+    return '|'.join(re.escape(k.lower()) for k in keywords)
+
+
+def detect_header(df_raw: pd.DataFrame, field_keywords: Optional[Dict[str, List[str]]] = None,
+                  probe_rows: int = HEADER_PROBE_ROWS) -> Tuple[int, Dict[int, str]]:
+    """
+    在前 probe_rows 列中找出表頭所在列，並依關鍵字推測各欄位的類別
+    每一列的分數與 calculate_header_score(row, header_keywords(field_keywords)) 相同：
+    含關鍵字 +2、不是全數字的字串 +1（包含 "12.5" 與空字串）、非空值 +1（包含空字串），
+    關鍵字除了 HEADER_KEYWORDS 之外也包含各欄位類別的關鍵字；
+    整個探測範圍的儲存格一次向量化計算，同分時取最前面的列
+
+    參數：
+        df_raw: 未指定表頭（header=None）讀取的原始列
+        field_keywords: 欄位類別與關鍵字列表（設定檔的「欄位對應」），None 表示使用預設值
+        probe_rows: 檢查的列數
+
+    返回：
+        (表頭列號, {欄位編號: 欄位類別})
+    """
+    if field_keywords is None:
+        field_keywords = FIELD_KEYWORDS
+    probe = df_raw.iloc[:probe_rows]
+    if probe.empty:
+        return 0, {}
+
+    cells = pd.Series(probe.to_numpy(dtype=object).ravel())
+    filled = cells.notna()
+    text = cells.astype(str).str.lower()
+    is_str = cells.map(lambda val: isinstance(val, str)).astype(bool)
+    digits = cells[is_str].str.isdigit().astype(bool).reindex(cells.index, fill_value=True)
+
+    keywords = [k for k in header_keywords(field_keywords) if k]
+    keyword_hit = text.str.contains(_keyword_pattern(keywords), regex=True) if keywords \
+        else pd.Series(False, index=cells.index)
+
+    cell_scores = keyword_hit.to_numpy() * 2 + (is_str & ~digits).to_numpy() + filled.to_numpy()
+    row_scores = cell_scores.reshape(probe.shape).sum(axis=1)
+    header_row = int(np.argmax(row_scores))
+
+    # 表頭列的每個欄位依序比對各類別的關鍵字，取第一個符合的類別
+    header = probe.iloc[header_row]
+    header_text = header.where(header.notna(), '').astype(str).str.lower().reset_index(drop=True)
+    mapping: Dict[int, str] = {}
+    for name, words in field_keywords.items():
+        if not words:
+            continue
+        hits = header_text.str.contains(_keyword_pattern(words), regex=True)
+        for col in np.flatnonzero(hits.to_numpy()):
+            mapping.setdefault(int(col), name)
+    return header_row, dict(sorted(mapping.items()))
+
+
+def analyze_file_structure(df_raw: pd.DataFrame,
+                           field_keywords: Optional[Dict[str, List[str]]] = None,
+                           probe_rows: int = HEADER_PROBE_ROWS) -> Dict:
+    """
+    分析檔案結構
+
+    參數：
+        df_raw: 檔案前幾列未指定表頭（header=None）的原始資料
+        field_keywords: 欄位類別與關鍵字列表，None 表示使用預設值
+        probe_rows: 偵測表頭時檢查的列數
+
+    返回：
+        包含建議跳過行數、欄位類型、欄位對應等資訊的字典
+    """
+    analysis = {
+        "總行數": len(df_raw),
+        "總欄數": len(df_raw.columns),
+        "建議跳過行數": 0,
+        "建議欄位": [],
+        "欄位類型": {},
+        "欄位規格": [],
+        "欄位對應": {},
+        "資料品質": {}
+    }
+
+    # 找出最佳表頭位置
+    best_header_row, mapping = detect_header(df_raw, field_keywords, probe_rows)
+    analysis["建議跳過行數"] = best_header_row
+
+    # 以表頭列的內容作為欄位名稱，分析表頭以下的資料
+    header = df_raw.iloc[best_header_row] if len(df_raw) else pd.Series(dtype=object)
+    names = [
+        str(val) if pd.notna(val) and str(val).strip() else f"Unnamed: {i}"
+        for i, val in enumerate(header)
+    ]
+    data = df_raw.iloc[best_header_row + 1:]
+    for i, name in enumerate(names):
+        spec = infer_column_spec(data.iloc[:, i], name=name)
+        analysis["欄位規格"].append(spec)
+        analysis["欄位類型"][name] = spec["類型"]
+        if i in mapping:
+            analysis["欄位對應"][name] = mapping[i]
+
+    # 建議要保留的欄位
+    analysis["建議欄位"] = list(range(len(df_raw.columns)))
+
+    return analysis
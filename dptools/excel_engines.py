@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Excel 讀取引擎模組
+統一選擇 Excel 讀取引擎：有安裝 python-calamine 時使用原生的 calamine 引擎，
+否則使用 openpyxl（.xlsx）或 xlrd（.xls）；另提供 openpyxl 唯讀模式的逐列串流讀取，
+以及只解析前幾列、不載入整個活頁簿的 .xlsx 快速探測
+"""
+
+import importlib.util
+import os
+import posixpath
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+import pandas as pd
+
+# 可用的讀取引擎，依優先順序排列
+# module 為引擎需要的套件，suffixes 為支援的副檔名；新增引擎只需在此加入一筆 pandas 支援的引擎名稱
+EXCEL_ENGINES: Dict[str, Dict] = {
+    "calamine": {"module": "python_calamine", "suffixes": (".xlsx", ".xlsm", ".xlsb", ".xls", ".ods")},
+    "openpyxl": {"module": "openpyxl", "suffixes": (".xlsx", ".xlsm")},
+    "xlrd": {"module": "xlrd", "suffixes": (".xls",)},
+}
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def available_engines(path: Optional[str] = None) -> List[str]:
+    """
+    列出已安裝的讀取引擎（依優先順序）
+
+    參數：
+        path: 檔案路徑，指定時只列出支援該副檔名的引擎
+    """
+    suffix = os.path.splitext(path)[1].lower() if path else None
+    return [
+        name for name, spec in EXCEL_ENGINES.items()
+        if _installed(spec["module"]) and (suffix is None or suffix in spec["suffixes"])
+    ]
+
+
+def select_engine(path: str, engine: Optional[str] = None) -> Optional[str]:
+    """
+    選擇讀取引擎
+    指定 engine 時直接使用；否則取第一個已安裝且支援該副檔名的引擎，都沒有時交由 pandas 判斷
+    """
+    if engine:
+        return engine
+    engines = available_engines(path)
+    return engines[0] if engines else None
+
+
+def read_excel(path: str, skiprows: int = 0, nrows: Optional[int] = None,
+               header: Optional[int] = 0, engine: Optional[str] = None,
+               usecols: Optional[List[int]] = None) -> pd.DataFrame:
+    """
+    以選定的引擎讀取第一個工作表
+
+    參數：
+        path: 檔案路徑
+        skiprows: 跳過的列數
+        nrows: 最多讀取的資料列數
+        header: 表頭所在列（跳過 skiprows 之後），None 表示不使用表頭
+        engine: 讀取引擎，None 表示自動選擇（見 select_engine）
+        usecols: 只讀取的欄位編號（由小到大），None 表示全部
+
+    返回：
+        讀取後的資料框架
+    """
+    return pd.read_excel(path, skiprows=skiprows, nrows=nrows, header=header,
+                         engine=select_engine(path, engine), usecols=usecols)
+
+
+def iter_excel_rows(path: str, skiprows: int = 0) -> Iterator[tuple]:
+    """
+    以 openpyxl 唯讀模式逐列讀取第一個工作表的值，記憶體用量與檔案大小無關
+
+    參數：
+        path: .xlsx 檔案路徑
+        skiprows: 跳過的列數
+
+    返回：
+        每列儲存格值的 tuple 迭代器
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        for _ in range(skiprows):
+            if next(rows, None) is None:
+                return
+        yield from rows
+    finally:
+        workbook.close()
+
+
+# 工作表沒有 dimension 資訊時，至少解析這麼多位元組來估計總列數
+ESTIMATE_BYTES = 1024 * 1024
+
+# .xlsx 內部 XML 使用的命名空間
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+class _CountingReader:
+    """記錄已讀取的位元組數，用於由解析進度估計總列數"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.consumed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.consumed += len(data)
+        return data
+
+
+def _part_path(base: str, target: str) -> str:
+    """將關聯檔中的 Target 轉為壓縮檔內的路徑"""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, Dict[str, str]]:
+    """讀取某個部件的關聯檔，返回 {Id: {"type": 類型, "target": 路徑}}"""
+    rels_path = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    if rels_path not in archive.namelist():
+        return {}
+    root = ElementTree.fromstring(archive.read(rels_path))
+    return {
+        rel.get("Id"): {"type": rel.get("Type", "").rsplit("/", 1)[-1],
+                        "target": _part_path(part, rel.get("Target", ""))}
+        for rel in root.iter(_PKG_REL_NS + "Relationship")
+    }
+
+
+def _text(element) -> str:
+    """合併字串項目的文字（含多段格式文字），略過注音標示"""
+    if element is None:
+        return ""
+    texts = []
+    for child in element:
+        if child.tag == _MAIN_NS + "t":
+            texts.append(child.text or "")
+        elif child.tag == _MAIN_NS + "r":
+            run = child.find(_MAIN_NS + "t")
+            texts.append(run.text or "" if run is not None else "")
+    return "".join(texts)
+
+
+def _date_styles(archive: zipfile.ZipFile, path: Optional[str]) -> List[bool]:
+    """依 styles.xml 判斷每個儲存格樣式是否為日期格式"""
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+
+    if not path or path not in archive.namelist():
+        return []
+    root = ElementTree.fromstring(archive.read(path))
+    custom = {int(fmt.get("numFmtId")): fmt.get("formatCode", "")
+              for fmt in root.iter(_MAIN_NS + "numFmt")}
+    cell_xfs = root.find(_MAIN_NS + "cellXfs")
+    if cell_xfs is None:
+        return []
+    flags = []
+    for xf in cell_xfs.iter(_MAIN_NS + "xf"):
+        fmt_id = int(xf.get("numFmtId", 0))
+        code = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id, "General"))
+        flags.append(is_date_format(code))
+    return flags
+
+
+def _shared_strings(archive: zipfile.ZipFile, path: Optional[str], needed: int) -> List[str]:
+    """只解析共用字串表的前 needed 筆，大型活頁簿不需要讀完整個字串表"""
+    strings: List[str] = []
+    if needed <= 0 or not path or path not in archive.namelist():
+        return strings
+    with archive.open(path) as stream:
+        for _, element in ElementTree.iterparse(stream, events=("end",)):
+            if element.tag == _MAIN_NS + "si":
+                strings.append(_text(element))
+                element.clear()
+                if len(strings) >= needed:
+                    break
+    return strings
+
+
+def _column_index(ref: str) -> int:
+    """由儲存格位置（例如 "C5"）取得從 0 開始的欄位編號"""
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + (ord(char.upper()) - 64)
+    return index - 1
+
+
+def probe_xlsx(path: str, nrows: int = 20) -> Dict:
+    """
+    快速探測 .xlsx 檔案：只解析第一個工作表的前 nrows 列與需要的共用字串，
+    不論檔案多大都只需讀取開頭的一小段
+
+    參數：
+        path: .xlsx 檔案路徑
+        nrows: 讀取的原始列數（含表頭）
+
+    返回：
+        {"sheet_names": 工作表名稱列表, "rows": 原始列（list of list）,
+         "row_count": 總列數, "row_count_exact": 總列數是否為精確值}
+    """
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+    with zipfile.ZipFile(path) as archive:
+        package = _relationships(archive, "")
+        workbook_path = next((rel["target"] for rel in package.values() if rel["type"] == "officeDocument"),
+                             "xl/workbook.xml")
+        workbook = ElementTree.fromstring(archive.read(workbook_path))
+        workbook_rels = _relationships(archive, workbook_path)
+        sheets = [(sheet.get("name"), workbook_rels[sheet.get(_DOC_REL_NS + "id")]["target"])
+                  for sheet in workbook.iter(_MAIN_NS + "sheet")]
+        by_type = {rel["type"]: rel["target"] for rel in workbook_rels.values()}
+        properties = workbook.find(_MAIN_NS + "workbookPr")
+        epoch = CALENDAR_WINDOWS_1900
+        if properties is not None and properties.get("date1904") in ("1", "true"):
+            epoch = CALENDAR_MAC_1904
+        date_styles = _date_styles(archive, by_type.get("styles"))
+
+        cells, row_count, exact = [], None, False
+        sheet_path = sheets[0][1]
+        with archive.open(sheet_path) as raw:
+            stream = _CountingReader(raw)
+            parsed = counted = 0
+            for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    if element.tag == _MAIN_NS + "dimension":
+                        ref = element.get("ref", "")
+                        digits = "".join(c for c in ref.split(":")[-1] if c.isdigit())
+                        if ":" in ref and digits:
+                            row_count = int(digits)
+                    continue
+                if element.tag != _MAIN_NS + "row":
+                    continue
+                counted = int(element.get("r", counted + 1))
+                if counted <= nrows:
+                    parsed = counted
+                    for cell in element.iter(_MAIN_NS + "c"):
+                        kind = cell.get("t", "n")
+                        value = cell.find(_MAIN_NS + "v")
+                        text = _text(cell.find(_MAIN_NS + "is")) if kind == "inlineStr" else (
+                            None if value is None else value.text)
+                        column = _column_index(cell.get("r")) if cell.get("r") else None
+                        cells.append((counted - 1, column, kind, int(cell.get("s", 0)), text))
+                element.clear()
+                # 已取得前 nrows 列；沒有 dimension 時再多讀一段以估計總列數
+                if counted >= nrows and (row_count is not None or stream.consumed >= ESTIMATE_BYTES):
+                    break
+            else:
+                # 整個工作表都讀完了，列數是精確值
+                row_count, exact = counted, True
+            if row_count is None and counted:
+                # 依已解析的位元組比例估計
+                row_count = int(counted * archive.getinfo(sheet_path).file_size / max(stream.consumed, 1))
+
+        needed = max((int(v) + 1 for _, _, t, _, v in cells if t == "s" and v is not None), default=0)
+        strings = _shared_strings(archive, by_type.get("sharedStrings"), needed)
+
+    rows: List[List] = [[] for _ in range(min(nrows, parsed))]
+    for row, column, kind, style, text in cells:
+        if kind == "s":
+            value = strings[int(text)] if text is not None else None
+        elif kind == "inlineStr":
+            value = text
+        elif text is None:
+            value = None
+        elif kind == "b":
+            value = text == "1"
+        elif kind in ("str", "e"):
+            value = text
+        elif kind == "d":
+            value = datetime.fromisoformat(text)
+        else:
+            number = float(text)
+            if style < len(date_styles) and date_styles[style]:
+                value = from_excel(number, epoch)
+            else:
+                value = int(number) if number.is_integer() else number
+        if value == "":
+            value = None
+        target = rows[row]
+        column = len(target) if column is None else column
+        target.extend([None] * (column + 1 - len(target)))
+        target[column] = value
+    width = max((len(r) for r in rows), default=0)
+    for r in rows:
+        r.extend([None] * (width - len(r)))
+
+    return {"sheet_names": [name for name, _ in sheets], "rows": rows,
+            "row_count": row_count, "row_count_exact": exact}
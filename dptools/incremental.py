@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+增量比對模組
+在「比對結果」資料夾保存每個主檔鍵值的比對結果（以原始鍵值的列雜湊索引），
+下次比對同一個清理檔時只重新比對新增或變更的主檔列，其餘沿用上次的結果
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .blocking import blocked_fuzzy_match
+from .matching import (
+    STATUS_RIGHT_ONLY, build_key, build_match_result, classify_matches, clean_key_frame, exact_match,
+    fuzzy_match, hash_keys, match_key_frames
+)
+from .progress import ProgressCallback, report
+from .writers import match_output_paths
+
+# 增量狀態格式版本，比對邏輯改變時遞增即可讓舊狀態失效
+STATE_VERSION = 1
+
+
+def incremental_state_path(file_main: str, file_clear: str) -> str:
+    """增量狀態檔案的位置：「比對結果」資料夾中以主檔名稱命名的隱藏檔案"""
+    output_dir = match_output_paths(file_main, file_clear)[0]
+    base_name = os.path.splitext(os.path.basename(file_main))[0]
+    return os.path.join(output_dir, f".{base_name}_增量狀態.npz")
+
+
+def row_hashes(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """
+    每列原始鍵值（未清理）的 64 位元雜湊；比對結果只取決於鍵值欄位，其他欄位改變不需要重新比對
+    """
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise KeyError(f"比對欄位不存在: {', '.join(map(str, missing))}")
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def match_fingerprint(df_clear: pd.DataFrame, main_keys: List[str], clear_keys: List[str],
+                      settings: Dict) -> str:
+    """
+    清理檔內容與比對設定的指紋；與上次不同時上次的列位置已不適用，需要完整重新比對
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps({
+        "version": STATE_VERSION, "main_keys": main_keys, "clear_keys": clear_keys,
+        "columns": [str(c) for c in df_clear.columns], **settings,
+    }, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df_clear, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def load_state(path: str) -> Optional[Dict[str, np.ndarray]]:
+    """讀取增量狀態，不存在或無法讀取時返回 None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(path: str, state: Dict[str, np.ndarray]) -> None:
+    """寫出增量狀態（先寫暫存檔再更名，中途失敗不會留下損毀的狀態）"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=directory, suffix=".npz")
+    os.close(fd)
+    try:
+        np.savez(temp, **state)
+        os.replace(temp, path)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def match_incremental(df_main: pd.DataFrame, df_clear: pd.DataFrame,
+                      main_key: Union[str, List[str]], clear_key: Union[str, List[str]],
+                      state_path: str, use_fuzzy: bool = False, threshold: int = 85,
+                      block_min_shared: int = 0, ngram_size: int = 0,
+                      progress: Optional[ProgressCallback] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    增量比對：結果與 match_dataframes 相同，但只重新比對上次之後新增或變更的主檔鍵值
+
+    狀態以「原始鍵值雜湊 → 清理檔列位置、是否模糊比對、清理後鍵值雜湊、列數」保存，
+    另保存清理檔每列清理後鍵值的雜湊；清理檔內容或比對設定改變時（見 match_fingerprint）自動改為完整比對。
+    反向比對（清理檔中未出現在主檔的資料）以清理後鍵值的 64 位元雜湊比對，不再逐欄核對
+
+    參數：
+        df_main: 主檔資料框架
+        df_clear: 清理檔資料框架
+        main_key: 主檔比對欄位，多個欄位時傳入列表
+        clear_key: 清理檔比對欄位，欄位數需與 main_key 相同
+        state_path: 增量狀態檔案路徑（見 incremental_state_path）
+        use_fuzzy: 是否對未精確命中的資料進行模糊比對
+        threshold: 模糊比對相似度門檻
+        block_min_shared: 大於 0 時啟用 n-gram 候選篩選
+        ngram_size: 候選篩選使用的 gram 長度，0 表示自動選擇
+        progress: 各階段的進度回呼
+
+    返回：
+        (比對結果, 清理檔中未出現在主檔的資料)；
+        比對結果的 attrs["incremental"] 為沿用、重新比對與上次鍵值已不存在的筆數，attrs["counts"] 為各分類的筆數
+    """
+    main_keys = [main_key] if isinstance(main_key, str) else list(main_key)
+    clear_keys = [clear_key] if isinstance(clear_key, str) else list(clear_key)
+    if len(main_keys) != len(clear_keys):
+        raise ValueError("兩邊的比對欄位數量必須相同")
+
+    report(progress, "比對變更")
+    raw = row_hashes(df_main, main_keys)
+    fingerprint = match_fingerprint(df_clear, main_keys, clear_keys, {
+        "use_fuzzy": use_fuzzy, "threshold": threshold,
+        "block_min_shared": block_min_shared, "ngram_size": ngram_size,
+    })
+    state = load_state(state_path)
+    reuse = state is not None and str(state["fingerprint"]) == fingerprint
+    if reuse:
+        found = pd.Index(state["hashes"]).get_indexer(raw)
+    else:
+        found = np.full(len(raw), -1, dtype=np.int64)
+
+    # 新增或變更的列：相同的原始鍵值只比對一次
+    delta = np.flatnonzero(found < 0)
+    new_hashes, first = np.unique(raw[delta], return_index=True)
+    subset = df_main.iloc[delta[first]]
+
+    report(progress, "精確比對")
+    subset_frame = clean_key_frame(subset, main_keys)
+    subset_clean = hash_keys(subset_frame)
+    if reuse:
+        # 清理檔未改變，沿用上次的清理後鍵值雜湊，只清理命中的列用來核對
+        clear_hash = state["clear"]
+        positions = exact_match(subset_clean, clear_hash)
+        hit = np.flatnonzero(positions >= 0)
+        hit_frame = clean_key_frame(df_clear.iloc[positions[hit]], clear_keys)
+        same = np.ones(len(hit), dtype=bool)
+        for col in subset_frame.columns:
+            same &= subset_frame[col].to_numpy()[hit] == hit_frame[col].to_numpy()
+        if not same.all():
+            # 雜湊碰撞極少發生，發生時改以完整鍵值比對
+            positions = match_key_frames(subset_frame, subset_clean,
+                                         clean_key_frame(df_clear, clear_keys), clear_hash)
+    else:
+        clear_frame = clean_key_frame(df_clear, clear_keys)
+        clear_hash = hash_keys(clear_frame)
+        positions = match_key_frames(subset_frame, subset_clean, clear_frame, clear_hash)
+    flags = np.zeros(len(positions), dtype=bool)
+    blocking_stats = None
+    if use_fuzzy and (positions < 0).any():
+        main_strings = build_key(subset, main_keys)
+        clear_strings = build_key(df_clear, clear_keys)
+        if block_min_shared > 0:
+            positions, flags, blocking_stats = blocked_fuzzy_match(
+                main_strings, clear_strings, threshold, positions,
+                ngram_size=ngram_size, min_shared=block_min_shared, progress=progress
+            )
+        else:
+            positions, flags = fuzzy_match(main_strings, clear_strings, threshold, positions,
+                                           progress=progress)
+
+    # 合併：上次仍存在的鍵值沿用舊結果，之後接上這次重新比對的鍵值
+    report(progress, "合併結果")
+    if reuse:
+        kept = np.flatnonzero(np.bincount(found[found >= 0], minlength=len(state["hashes"])))
+        old_counts = state["counts"]
+        # 上次的鍵值這次已不存在的列數：狀態只以鍵值識別資料列，刪除的列與鍵值被修改的列無法區分
+        vanished = int(old_counts.sum() - old_counts[kept].sum()) if len(old_counts) else 0
+        # 仍存在的舊鍵值在合併後的位置
+        remap = np.full(len(state["hashes"]), -1, dtype=np.int64)
+        remap[kept] = np.arange(len(kept))
+        slots = np.where(found >= 0, remap[np.maximum(found, 0)], -1)
+        merged = {name: state[name][kept] for name in ("hashes", "positions", "flags", "clean")}
+    else:
+        vanished = 0
+        slots = np.full(len(raw), -1, dtype=np.int64)
+        merged = {"hashes": raw[:0], "positions": np.zeros(0, np.int64),
+                  "flags": np.zeros(0, bool), "clean": raw[:0]}
+    offset = len(merged["hashes"])
+    slots[delta] = offset + np.searchsorted(new_hashes, raw[delta])
+    merged = {
+        "hashes": np.concatenate([merged["hashes"], new_hashes]),
+        "positions": np.concatenate([merged["positions"], positions]).astype(np.int64),
+        "flags": np.concatenate([merged["flags"], flags]).astype(bool),
+        "clean": np.concatenate([merged["clean"], subset_clean]),
+    }
+    merged["counts"] = np.bincount(slots, minlength=len(merged["hashes"])).astype(np.int64)
+
+    positions, flags = merged["positions"][slots], merged["flags"][slots]
+    df_result = build_match_result(df_main, main_keys, df_clear, positions, flags)
+    if blocking_stats is not None:
+        df_result.attrs["blocking"] = blocking_stats
+    df_result.attrs["incremental"] = {
+        "沿用上次結果": reuse,
+        "沿用筆數": int(len(raw) - len(delta)),
+        "重新比對筆數": int(len(delta)),
+        "舊鍵值消失筆數": vanished,
+    }
+
+    # 反向比對：清理檔鍵值對照所有主檔列的清理後鍵值雜湊，再與正向結果一起分類
+    report(progress, "反向比對")
+    outer = classify_matches(positions, flags, exact_match(clear_hash, merged["clean"][slots]))
+    df_result.attrs["counts"] = outer.counts()
+    df_unmatched = df_clear.take(outer.right_rows(STATUS_RIGHT_ONLY))
+
+    save_state(state_path, {**merged, "clear": clear_hash, "fingerprint": np.array(fingerprint)})
+    return df_result, df_unmatched
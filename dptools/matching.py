@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""
+比對引擎模組
+提供不依賴 GUI 的比對函式，供 ExcelMatcherApp 與批次作業共用
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import process, fuzz
+
+from .blocking import blocked_fuzzy_match
+from .cleaning import clean_series
+from .progress import ProgressCallback, report
+
+# 結果中標記模糊比對的欄位名稱
+FUZZY_FLAG_COL = "是否模糊比對"
+# 模糊比對每批分數矩陣的預設最大格數（float32，約 80MB）
+FUZZY_MAX_CELLS = 20_000_000
+# 組合多個欄位為比對鍵值時使用的分隔字元
+KEY_SEPARATOR = "\x1f"
+# 結果中標記比對分類的欄位名稱與分類
+MATCH_STATUS_COL = "比對分類"
+STATUS_INNER = "完全匹配"
+STATUS_FUZZY = "模糊匹配"
+STATUS_LEFT_ONLY = "僅左"
+STATUS_RIGHT_ONLY = "僅右"
+
+
+def build_key(df: pd.DataFrame, columns: List[str]) -> pd.Series:
+    """
+    由一個或多個欄位建立清理後的比對鍵值
+    多個欄位時以不會出現在資料中的分隔字元串接
+
+    參數：
+        df: 資料框架
+        columns: 比對欄位名稱列表
+
+    返回：
+        清理後的鍵值欄位
+    """
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise KeyError(f"比對欄位不存在: {', '.join(map(str, missing))}")
+    key = clean_series(df[columns[0]])
+    for col in columns[1:]:
+        key = key + KEY_SEPARATOR + clean_series(df[col])
+    return key
+
+
+def exact_match(main_keys: pd.Series, clear_keys: pd.Series) -> np.ndarray:
+    """
+    精確比對
+    對清理檔建立一次「鍵值 → 第一筆列位置」的雜湊索引，再一次查詢所有主檔鍵值
+
+    參數：
+        main_keys: 主檔清理後的鍵值
+        clear_keys: 清理檔清理後的鍵值
+
+    返回：
+        與 main_keys 等長的列位置陣列，-1 表示無匹配；重複鍵值取第一筆
+    """
+    clear_keys = pd.Series(clear_keys).reset_index(drop=True)
+    first = ~clear_keys.duplicated(keep="first")
+    positions = np.flatnonzero(first.to_numpy())
+    index = pd.Index(clear_keys[first].to_numpy())
+    found = index.get_indexer(pd.Series(main_keys).to_numpy())
+    return np.where(found >= 0, positions[found], -1).astype(np.int64)
+
+
+def clean_key_frame(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    取出並清理比對欄位，欄位依順序重新命名為 0..k-1，讓兩邊可以逐欄對照
+
+    參數：
+        df: 資料框架
+        columns: 比對欄位名稱列表
+
+    返回：
+        清理後的鍵值資料框架
+    """
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise KeyError(f"比對欄位不存在: {', '.join(map(str, missing))}")
+    return pd.DataFrame(
+        {i: clean_series(df[col]).to_numpy() for i, col in enumerate(columns)}
+    )
+
+
+def hash_keys(key_frame: pd.DataFrame) -> np.ndarray:
+    """
+    將清理後的鍵值欄位合併為每列一個 64 位元雜湊值
+
+    參數：
+        key_frame: clean_key_frame 的結果
+
+    返回：
+        uint64 雜湊陣列
+    """
+    return pd.util.hash_pandas_object(key_frame, index=False).to_numpy()
+
+
+def match_key_frames(main_frame: pd.DataFrame, main_hash: np.ndarray,
+                     clear_frame: pd.DataFrame, clear_hash: np.ndarray) -> np.ndarray:
+    """
+    以雜湊值比對兩份已清理的鍵值資料，並逐欄核對命中的配對
+    若發生雜湊碰撞，該列改以完整鍵值重新比對
+
+    參數：
+        main_frame: 主檔 clean_key_frame 的結果
+        main_hash: 主檔 hash_keys 的結果
+        clear_frame: 清理檔 clean_key_frame 的結果
+        clear_hash: 清理檔 hash_keys 的結果
+
+    返回：
+        與 main_frame 等長的列位置陣列，-1 表示無匹配；重複鍵值取第一筆
+    """
+    positions = exact_match(main_hash, clear_hash)
+
+    collided = _collided_rows(main_frame, clear_frame, positions)
+    if len(collided):
+        # 雜湊碰撞極少發生，僅對碰撞的列改用串接字串鍵值比對
+        joined_main = main_frame.iloc[collided].agg(KEY_SEPARATOR.join, axis=1)
+        joined_clear = clear_frame.agg(KEY_SEPARATOR.join, axis=1)
+        positions[collided] = exact_match(joined_main, joined_clear)
+    return positions
+
+
+def _collided_rows(main_frame: pd.DataFrame, clear_frame: pd.DataFrame,
+                   positions: np.ndarray) -> np.ndarray:
+    """雜湊命中但鍵值不同（雜湊碰撞）的主檔列位置"""
+    hit = np.flatnonzero(positions >= 0)
+    same = np.ones(len(hit), dtype=bool)
+    for col in main_frame.columns:
+        same &= main_frame[col].to_numpy()[hit] == clear_frame[col].to_numpy()[positions[hit]]
+    return hit[~same]
+
+
+def _first_positions(codes: np.ndarray, size: int) -> np.ndarray:
+    """每個編碼第一次出現的列位置，未出現的編碼為 -1"""
+    first = np.full(size, -1, dtype=np.int64)
+    rows = np.flatnonzero(~pd.Series(codes).duplicated(keep="first").to_numpy())
+    first[codes[rows]] = rows
+    return first
+
+
+def outer_key_match(left_frame: pd.DataFrame, left_hash: np.ndarray,
+                    right_frame: pd.DataFrame, right_hash: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    單次全外部精確比對
+    兩邊的鍵值雜湊合併後只編碼一次，同時得到左→右與右→左兩個方向的對應，
+    不需要為反向比對再清理、雜湊與建立一次索引；
+    雜湊命中的配對逐欄核對，發生碰撞時改以 match_key_frames 分別比對兩個方向
+
+    參數：
+        left_frame: 左邊 clean_key_frame 的結果
+        left_hash: 左邊 hash_keys 的結果
+        right_frame: 右邊 clean_key_frame 的結果
+        right_hash: 右邊 hash_keys 的結果
+
+    返回：
+        (左邊每列對應的右邊列位置, 右邊每列對應的左邊列位置)，-1 表示無匹配；重複鍵值取第一筆
+    """
+    codes, uniques = pd.factorize(np.concatenate([left_hash, right_hash]))
+    left_codes, right_codes = codes[:len(left_hash)], codes[len(left_hash):]
+    positions = _first_positions(right_codes, len(uniques))[left_codes]
+    partners = _first_positions(left_codes, len(uniques))[right_codes]
+    if len(_collided_rows(left_frame, right_frame, positions)) \
+            or len(_collided_rows(right_frame, left_frame, partners)):
+        positions = match_key_frames(left_frame, left_hash, right_frame, right_hash)
+        partners = match_key_frames(right_frame, right_hash, left_frame, left_hash)
+    return positions, partners
+
+
+@dataclass
+class OuterMatch:
+    """
+    全外部比對的分類結果
+    左右兩邊每一列各有一個分類（完全匹配、模糊匹配、僅左、僅右），
+    各類資料與摘要筆數都由這一份結果取出，不需要再掃描任何一邊
+    """
+    # 左邊每列對應的右邊列位置，-1 表示無匹配
+    positions: np.ndarray
+    # 左邊每列的分類：完全匹配、模糊匹配或僅左
+    left_status: np.ndarray
+    # 右邊每列的分類：完全匹配、模糊匹配或僅右
+    right_status: np.ndarray
+    # 左邊每列的模糊比對相似度，非模糊匹配為 NaN；未計算時為 None
+    scores: Optional[np.ndarray] = None
+
+    def left_rows(self, status: str) -> np.ndarray:
+        """左邊屬於該分類的列位置（依原始順序）"""
+        return np.flatnonzero(self.left_status == status)
+
+    def right_rows(self, status: str) -> np.ndarray:
+        """右邊屬於該分類的列位置（依原始順序）"""
+        return np.flatnonzero(self.right_status == status)
+
+    def counts(self) -> Dict[str, int]:
+        """摘要筆數；完全匹配與模糊匹配以左邊的列計算"""
+        return {
+            f"{STATUS_INNER}筆數": len(self.left_rows(STATUS_INNER)),
+            f"{STATUS_FUZZY}筆數": len(self.left_rows(STATUS_FUZZY)),
+            f"{STATUS_LEFT_ONLY}筆數": len(self.left_rows(STATUS_LEFT_ONLY)),
+            f"{STATUS_RIGHT_ONLY}筆數": len(self.right_rows(STATUS_RIGHT_ONLY)),
+        }
+
+
+def classify_matches(positions: np.ndarray, fuzzy_flags: np.ndarray,
+                     partners: np.ndarray) -> OuterMatch:
+    """
+    依比對結果將兩邊每一列分類
+
+    參數：
+        positions: 左邊每列對應的右邊列位置（包含模糊比對），-1 表示無匹配
+        fuzzy_flags: 左邊每列是否為模糊比對
+        partners: 右邊每列精確比對到的左邊列位置，-1 表示無匹配
+
+    返回：
+        OuterMatch；右邊的列同時被精確比對與模糊比對命中時算作完全匹配
+    """
+    fuzzy_flags = np.asarray(fuzzy_flags, dtype=bool)
+    left_status = np.where(positions < 0, STATUS_LEFT_ONLY,
+                           np.where(fuzzy_flags, STATUS_FUZZY, STATUS_INNER))
+    right_status = np.where(partners >= 0, STATUS_INNER, STATUS_RIGHT_ONLY)
+    fuzzy_right = positions[fuzzy_flags & (positions >= 0)]
+    right_status[fuzzy_right[partners[fuzzy_right] < 0]] = STATUS_FUZZY
+    return OuterMatch(positions, left_status, right_status)
+
+
+def _fuzzy_chunk_rows(n_choices: int, max_cells: int) -> int:
+    """依清理檔鍵值數量計算每批可處理的主檔鍵值筆數"""
+    return max(1, max_cells // max(1, n_choices))
+
+
+def fuzzy_match(main_keys: pd.Series, clear_keys: pd.Series, threshold: int,
+                positions: np.ndarray, workers: int = -1, max_cells: int = FUZZY_MAX_CELLS,
+                progress: Optional[ProgressCallback] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    模糊比對
+    將精確比對未命中的主檔鍵值一次取出，分批以 rapidfuzz.process.cdist 計算
+    fuzz.ratio 分數矩陣，門檻直接作為 score_cutoff，並使用多核心平行計算
+
+    每批矩陣大小不超過 max_cells 格，不會建立完整的 n×m 矩陣；
+    相同分數時取清理檔中最前面的一筆，與 process.extractOne 的結果一致
+
+    參數：
+        main_keys: 主檔清理後的鍵值
+        clear_keys: 清理檔清理後的鍵值
+        threshold: 相似度門檻（0-100）
+        positions: exact_match 的結果
+        workers: 平行計算的執行緒數，-1 表示使用全部核心
+        max_cells: 每批分數矩陣的最大格數
+        progress: 每批計算前回報進度（已完成 / 全部不重複的主檔鍵值數）
+
+    返回：
+        (更新後的列位置陣列, 是否為模糊比對的布林陣列)
+    """
+    positions = positions.copy()
+    flags = np.zeros(len(positions), dtype=bool)
+    pending = np.flatnonzero(positions < 0)
+    if len(pending) == 0 or len(clear_keys) == 0:
+        return positions, flags
+
+    # 清理檔重複鍵值只保留第一筆，相同的主檔鍵值只計算一次
+    clear_series = pd.Series(clear_keys).astype(str).reset_index(drop=True)
+    first = ~clear_series.duplicated(keep="first")
+    choice_positions = np.flatnonzero(first.to_numpy())
+    choices = clear_series[first].tolist()
+
+    queries, inverse = np.unique(
+        pd.Series(main_keys).astype(str).to_numpy()[pending], return_inverse=True
+    )
+    best_pos = np.full(len(queries), -1, dtype=np.int64)
+
+    step = _fuzzy_chunk_rows(len(choices), max_cells)
+    for start in range(0, len(queries), step):
+        report(progress, "模糊比對", start, len(queries))
+        batch = queries[start:start + step].tolist()
+        scores = process.cdist(
+            batch, choices, scorer=fuzz.ratio, score_cutoff=threshold,
+            dtype=np.float32, workers=workers
+        )
+        best = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(batch)), best]
+        hit = best_score >= threshold
+        best_pos[start:start + step] = np.where(hit, choice_positions[best], -1)
+
+    resolved = best_pos[inverse]
+    hit = resolved >= 0
+    positions[pending[hit]] = resolved[hit]
+    flags[pending[hit]] = True
+    return positions, flags
+
+
+def _as_key_list(key: Union[str, List[str]]) -> List[str]:
+    """將單一欄位名稱或欄位列表統一為列表"""
+    return [key] if isinstance(key, str) else list(key)
+
+
+def take_rows(df: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+    """
+    依列位置逐欄取出資料，-1 的位置為空值
+    只配置結果需要的記憶體，不先複製整個資料框架再重新索引；類別與字串等欄位型別保持不變
+
+    參數：
+        df: 資料框架
+        positions: 列位置陣列，-1 表示空列
+
+    返回：
+        與 positions 等長、索引為 0..n-1 的資料框架
+    """
+    columns = {}
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        values = column.array if pd.api.types.is_extension_array_dtype(column.dtype) else column.to_numpy()
+        columns[i] = pd.api.extensions.take(values, positions, allow_fill=True)
+    result = pd.DataFrame(columns, index=pd.RangeIndex(len(positions)))
+    result.columns = df.columns
+    return result
+
+
+def build_match_result(df_main: pd.DataFrame, main_key: Union[str, List[str]],
+                       df_clear: pd.DataFrame,
+                       positions: np.ndarray, fuzzy_flags: np.ndarray) -> pd.DataFrame:
+    """
+    依列位置組合比對結果
+    主檔比對欄位命名為 "KEY"（多個欄位時以 " / " 串接），其後接清理檔對應列，最後為模糊比對標記與比對分類
+
+    參數：
+        df_main: 主檔資料框架
+        main_key: 主檔比對欄位或欄位列表
+        df_clear: 清理檔資料框架
+        positions: 每筆主檔對應的清理檔列位置，-1 表示無匹配
+        fuzzy_flags: 每筆主檔是否為模糊比對
+
+    返回：
+        比對結果資料框架
+    """
+    main_keys = _as_key_list(main_key)
+    if len(main_keys) == 1:
+        main_col = df_main[main_keys].reset_index(drop=True)
+    else:
+        # 逐欄向量化串接，不逐列呼叫 join；空值一律顯示為 nan，與欄位型別（類別、Arrow 字串）無關
+        parts = df_main[main_keys].astype(object)
+        parts = parts.where(parts.notna(), np.nan).astype(str).reset_index(drop=True)
+        key = parts.iloc[:, 0]
+        for i in range(1, len(main_keys)):
+            key = key + " / " + parts.iloc[:, i]
+        main_col = key.to_frame()
+    main_col.columns = ["KEY"]
+
+    # 以位置一次取出對應列；無匹配的列整列為空值
+    matched = take_rows(df_clear, positions)
+
+    df_result = pd.concat([main_col, matched], axis=1)
+    fuzzy_flags = np.asarray(fuzzy_flags, dtype=bool)
+    df_result[FUZZY_FLAG_COL] = fuzzy_flags
+    df_result[MATCH_STATUS_COL] = pd.Categorical(
+        np.where(positions < 0, STATUS_LEFT_ONLY, np.where(fuzzy_flags, STATUS_FUZZY, STATUS_INNER)),
+        categories=[STATUS_INNER, STATUS_FUZZY, STATUS_LEFT_ONLY]
+    )
+    return df_result
+
+
+def match_dataframes(df_main: pd.DataFrame, df_clear: pd.DataFrame,
+                     main_key: Union[str, List[str]], clear_key: Union[str, List[str]],
+                     use_fuzzy: bool = False, threshold: int = 85, block_min_shared: int = 0,
+                     ngram_size: int = 0,
+                     progress: Optional[ProgressCallback] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    執行主檔與清理檔的比對
+
+    參數：
+        df_main: 主檔資料框架
+        df_clear: 清理檔資料框架
+        main_key: 主檔比對欄位，多個欄位時傳入列表
+        clear_key: 清理檔比對欄位，欄位數需與 main_key 相同
+        use_fuzzy: 是否對未精確命中的資料進行模糊比對（多個欄位時比對串接後的鍵值）
+        threshold: 模糊比對相似度門檻
+        block_min_shared: 大於 0 時啟用 n-gram 候選篩選；需要共用的 gram 數由門檻推算，
+            大於 1 時另外要求至少共用幾個 gram（較快但可能漏配）；篩選統計會放在比對結果的 attrs["blocking"]
+        ngram_size: 候選篩選使用的 gram 長度，0 表示自動選擇
+        progress: 各階段（清理鍵值、精確比對、模糊比對、整理結果）的進度回呼
+
+    返回：
+        (比對結果, 清理檔中沒有被任何主檔精確或模糊比對到的資料（僅右）)；
+        比對結果的 attrs["counts"] 為完全匹配、模糊匹配、僅左（主檔）與僅右（清理檔）的筆數
+    """
+    main_keys = _as_key_list(main_key)
+    clear_keys = _as_key_list(clear_key)
+    if len(main_keys) != len(clear_keys):
+        raise ValueError("兩邊的比對欄位數量必須相同")
+
+    # 兩邊各清理與雜湊一次，一次比對同時得到主檔與清理檔兩個方向的結果
+    report(progress, "清理鍵值")
+    main_frame = clean_key_frame(df_main, main_keys)
+    clear_frame = clean_key_frame(df_clear, clear_keys)
+    report(progress, "清理鍵值", len(df_main) + len(df_clear))
+    report(progress, "精確比對")
+    positions, partners = outer_key_match(main_frame, hash_keys(main_frame),
+                                          clear_frame, hash_keys(clear_frame))
+    report(progress, "精確比對", len(df_main))
+    fuzzy_flags = np.zeros(len(positions), dtype=bool)
+    blocking_stats = None
+    if use_fuzzy and (positions < 0).any():
+        # 模糊比對需要字串鍵值，只在啟用時才建立
+        main_strings = build_key(df_main, main_keys)
+        clear_strings = build_key(df_clear, clear_keys)
+        if block_min_shared > 0:
+            positions, fuzzy_flags, blocking_stats = blocked_fuzzy_match(
+                main_strings, clear_strings, threshold, positions,
+                ngram_size=ngram_size, min_shared=block_min_shared, progress=progress
+            )
+        else:
+            positions, fuzzy_flags = fuzzy_match(main_strings, clear_strings, threshold, positions,
+                                                 progress=progress)
+
+    report(progress, "整理結果")
+    outer = classify_matches(positions, fuzzy_flags, partners)
+    df_result = build_match_result(df_main, main_keys, df_clear, positions, fuzzy_flags)
+    if blocking_stats is not None:
+        df_result.attrs["blocking"] = blocking_stats
+    df_result.attrs["counts"] = outer.counts()
+
+    # 未匹配的記錄：清理檔中與主檔任何一筆都沒有精確或模糊匹配的記錄
+    df_unmatched = df_clear.take(outer.right_rows(STATUS_RIGHT_ONLY))
+    return df_result, df_unmatched
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+比對流程模組
+在同一個行程內完成「讀取 → 清理 → 精確比對 → 模糊比對 → 輸出」，供 CLI 與批次作業使用
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz
+
+from .cleaning import clean_frame
+from .compact import compact_frame, memory_saving
+from .matching import (
+    STATUS_FUZZY, STATUS_INNER, STATUS_LEFT_ONLY, STATUS_RIGHT_ONLY, OuterMatch, build_key,
+    classify_matches, clean_key_frame, fuzzy_match, hash_keys, outer_key_match
+)
+from .blocking import blocked_fuzzy_match
+from .progress import ProgressCallback, report
+from .readers import read_table
+from .writers import DEFAULT_FORMAT, OUTPUT_FORMATS, available_formats, write_summary_html, write_table
+
+# 輸出檔案名稱
+OUTPUT_FILES = {
+    "left_clean": "left_clean.xlsx",
+    "right_clean": "right_clean.xlsx",
+    "inner": "match_inner.xlsx",
+    "left_only": "left_only.xlsx",
+    "right_only": "right_only.xlsx",
+    "fuzzy": "fuzzy_matches.xlsx",
+    "summary": "summary.html",
+}
+# 模糊比對結果的分數欄位
+SCORE_COL = "相似度"
+
+
+def join_rows(left: pd.DataFrame, right: pd.DataFrame, left_rows: np.ndarray,
+              right_rows: np.ndarray) -> pd.DataFrame:
+    """
+    依列位置將左右兩邊的資料並排組合
+    右邊與左邊同名的欄位加上 "_right" 後綴
+
+    參數：
+        left: 左邊資料框架
+        right: 右邊資料框架
+        left_rows: 左邊的列位置
+        right_rows: 與 left_rows 對應的右邊列位置
+
+    返回：
+        組合後的資料框架
+    """
+    left_part = left.take(left_rows).reset_index(drop=True)
+    right_part = right.take(right_rows).reset_index(drop=True)
+    right_part.columns = [f"{c}_right" if c in left.columns else c for c in right.columns]
+    return pd.concat([left_part, right_part], axis=1)
+
+
+def reconcile_rows(left: pd.DataFrame, right: pd.DataFrame, left_keys: List[str],
+                   right_keys: List[str], fuzzy_col: Optional[str] = None,
+                   fuzzy_threshold: int = 85, block_min_shared: int = 0,
+                   progress: Optional[ProgressCallback] = None) -> OuterMatch:
+    """
+    以單次全外部比對將兩份已清理資料的每一列分類
+
+    先以鍵值欄位精確比對（多欄位以 64 位元雜湊比對，重複鍵值取右邊第一筆），
+    鍵值全空的資料不參與比對；
+    指定 fuzzy_col 時，再將兩邊剩餘的資料以該欄位做模糊比對
+
+    參數：
+        left: 左邊（主檔）資料
+        right: 右邊（新檔）資料
+        left_keys: 左邊鍵值欄位
+        right_keys: 右邊鍵值欄位，欄位數需與 left_keys 相同
+        fuzzy_col: 模糊比對欄位，None 表示不進行模糊比對
+        fuzzy_threshold: 模糊比對相似度門檻
+        block_min_shared: 大於 0 時模糊比對啟用 n-gram 候選篩選
+        progress: 各階段（清理鍵值、精確比對、模糊比對）的進度回呼
+
+    返回：
+        OuterMatch；指定 fuzzy_col 時包含模糊匹配的相似度
+    """
+    if len(left_keys) != len(right_keys):
+        raise ValueError("左右兩邊的鍵值欄位數量必須相同")
+
+    # 每邊只清理與計算雜湊一次，一次比對同時得到正反兩個方向
+    report(progress, "清理鍵值")
+    left_frame = clean_key_frame(left, left_keys)
+    right_frame = clean_key_frame(right, right_keys)
+    report(progress, "清理鍵值", len(left) + len(right))
+    report(progress, "精確比對")
+    positions, partners = outer_key_match(left_frame, hash_keys(left_frame),
+                                          right_frame, hash_keys(right_frame))
+    report(progress, "精確比對", len(left))
+
+    # 鍵值欄位全部為空的資料不參與精確比對
+    positions[(left_frame == "").all(axis=1).to_numpy()] = -1
+    partners[(right_frame == "").all(axis=1).to_numpy()] = -1
+
+    flags = np.zeros(len(positions), dtype=bool)
+    scores = None
+    if fuzzy_col:
+        # 與左邊任一鍵值相同的右邊資料不參與模糊比對
+        left_rest = np.flatnonzero(positions < 0)
+        right_rest = np.flatnonzero(partners < 0)
+        left_names = build_key(left.take(left_rest), [fuzzy_col]).to_numpy()
+        right_names = build_key(right.take(right_rest), [fuzzy_col]).to_numpy()
+        # 模糊比對欄位為空的資料不參與模糊比對
+        left_cand, left_names = left_rest[left_names != ""], left_names[left_names != ""]
+        right_cand, right_names = right_rest[right_names != ""], right_names[right_names != ""]
+
+        unmatched = np.full(len(left_cand), -1, dtype=np.int64)
+        if block_min_shared > 0:
+            found, hits, _ = blocked_fuzzy_match(
+                pd.Series(left_names), pd.Series(right_names), fuzzy_threshold, unmatched,
+                min_shared=block_min_shared, progress=progress
+            )
+        else:
+            found, hits = fuzzy_match(
+                pd.Series(left_names), pd.Series(right_names), fuzzy_threshold, unmatched,
+                progress=progress
+            )
+        hit = np.flatnonzero(hits)
+        positions[left_cand[hit]] = right_cand[found[hit]]
+        flags[left_cand[hit]] = True
+        scores = np.full(len(positions), np.nan)
+        scores[left_cand[hit]] = [
+            round(fuzz.ratio(left_names[i], right_names[j]), 2) for i, j in zip(hit, found[hit])
+        ]
+
+    outer = classify_matches(positions, flags, partners)
+    outer.scores = scores
+    return outer
+
+
+def reconcile_frames(left: pd.DataFrame, right: pd.DataFrame, outer: OuterMatch) -> Dict[str, pd.DataFrame]:
+    """
+    由 reconcile_rows 的分類結果取出各類資料
+
+    參數：
+        left: 左邊（主檔）資料
+        right: 右邊（新檔）資料
+        outer: reconcile_rows 的結果
+
+    返回：
+        包含 inner、left_only、right_only、fuzzy 四個資料框架的字典
+    """
+    inner_left = outer.left_rows(STATUS_INNER)
+    fuzzy = pd.DataFrame()
+    if outer.scores is not None:
+        fuzzy_left = outer.left_rows(STATUS_FUZZY)
+        fuzzy = join_rows(left, right, fuzzy_left, outer.positions[fuzzy_left])
+        fuzzy[SCORE_COL] = outer.scores[fuzzy_left]
+    return {
+        "inner": join_rows(left, right, inner_left, outer.positions[inner_left]),
+        "left_only": left.take(outer.left_rows(STATUS_LEFT_ONLY)).reset_index(drop=True),
+        "right_only": right.take(outer.right_rows(STATUS_RIGHT_ONLY)).reset_index(drop=True),
+        "fuzzy": fuzzy,
+    }
+
+
+def reconcile(left: pd.DataFrame, right: pd.DataFrame, left_keys: List[str],
+              right_keys: List[str], fuzzy_col: Optional[str] = None,
+              fuzzy_threshold: int = 85, block_min_shared: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    比對兩份已清理的資料（參數見 reconcile_rows）
+
+    返回：
+        包含 inner、left_only、right_only、fuzzy 四個資料框架的字典
+    """
+    outer = reconcile_rows(left, right, left_keys, right_keys, fuzzy_col=fuzzy_col,
+                           fuzzy_threshold=fuzzy_threshold, block_min_shared=block_min_shared)
+    return reconcile_frames(left, right, outer)
+
+
+def run_reconciliation(left_path: str, right_path: str, left_keys: List[str],
+                       right_keys: List[str], output_dir: str, fuzzy_col: Optional[str] = None,
+                       fuzzy_threshold: int = 85, block_min_shared: int = 0,
+                       output_format: str = DEFAULT_FORMAT, compact: bool = False,
+                       progress: Optional[ProgressCallback] = None) -> Dict:
+    """
+    讀取兩個檔案、清理、比對並寫出所有結果檔案
+
+    參數：
+        left_path: 左邊（主檔）檔案路徑
+        right_path: 右邊（新檔）檔案路徑
+        left_keys: 左邊鍵值欄位
+        right_keys: 右邊鍵值欄位
+        output_dir: 輸出資料夾
+        fuzzy_col: 模糊比對欄位，None 表示不進行模糊比對
+        fuzzy_threshold: 模糊比對相似度門檻
+        block_min_shared: 大於 0 時模糊比對啟用 n-gram 候選篩選
+        output_format: 結果檔案的格式（xlsx / csv / parquet），摘要報告固定為 HTML
+        compact: 清理後將兩邊資料改用較省記憶體的欄位型別（見 compact_frame），結果不變
+        progress: 各階段（讀取、清理資料、比對、整理結果、寫出）的進度回呼，可傳入 StageProfiler 記錄各階段效能
+
+    返回：
+        比對摘要（各類筆數與輸出檔案路徑）
+    """
+    # 先確認輸出格式可用，避免比對完才發現缺少套件
+    if output_format not in available_formats():
+        raise ValueError(f"無法輸出 {output_format} 格式，請確認已安裝 {OUTPUT_FORMATS[output_format]['module']}")
+    left = read_table(left_path, progress=progress)
+    right = read_table(right_path, progress=progress)
+    report(progress, "清理資料")
+    left, right = clean_frame(left), clean_frame(right)
+    report(progress, "清理資料", len(left) + len(right))
+    if compact:
+        report(progress, "精簡記憶體")
+        left, right = compact_frame(left), compact_frame(right)
+        report(progress, "精簡記憶體", len(left) + len(right))
+    outer = reconcile_rows(left, right, left_keys, right_keys, fuzzy_col=fuzzy_col,
+                           fuzzy_threshold=fuzzy_threshold, block_min_shared=block_min_shared,
+                           progress=progress)
+    report(progress, "整理結果")
+    result = reconcile_frames(left, right, outer)
+    counts = outer.counts()
+
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {}
+    suffix = OUTPUT_FORMATS[output_format]["suffix"]
+    frames = {"left_clean": left, "right_clean": right, **result}
+    for name, frame in frames.items():
+        if name == "fuzzy" and not fuzzy_col:
+            continue
+        file_name = os.path.splitext(OUTPUT_FILES[name])[0] + suffix
+        outputs[name] = write_table(frame, os.path.join(output_dir, file_name), progress=progress)
+
+    summary = {
+        "左邊檔案": left_path,
+        "右邊檔案": right_path,
+        "左邊鍵值": ", ".join(left_keys),
+        "右邊鍵值": ", ".join(right_keys),
+        "左邊筆數": len(left),
+        "右邊筆數": len(right),
+        "完全匹配筆數": counts["完全匹配筆數"],
+        "僅左筆數": counts["僅左筆數"],
+        "僅右筆數": counts["僅右筆數"],
+    }
+    if fuzzy_col:
+        summary["模糊比對欄位"] = fuzzy_col
+        summary["模糊比對門檻"] = fuzzy_threshold
+        summary["模糊匹配筆數"] = counts["模糊匹配筆數"]
+    if compact:
+        saving = memory_saving(left.attrs["compact"]["原始 MB"] + right.attrs["compact"]["原始 MB"],
+                               left.attrs["compact"]["精簡後 MB"] + right.attrs["compact"]["精簡後 MB"])
+        summary["記憶體（原始 → 精簡）"] = f"{saving['原始 MB']:,.1f} MB → {saving['精簡後 MB']:,.1f} MB"
+        summary["記憶體節省比例"] = f"{saving['節省比例']:.1%}"
+
+    report(progress, "寫出摘要")
+    outputs["summary"] = write_summary_html(summary, os.path.join(output_dir, OUTPUT_FILES["summary"]))
+    summary["輸出檔案"] = outputs
+    return summary
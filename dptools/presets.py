@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+預設處理設定模組
+集中管理特定廠商的檔案格式設定與通用設定檔的載入
+"""
+
+import copy
+import json
+import os
+from typing import Dict, List
+
+# 預設設定檔名稱
+CONFIG_FILE = "config_template.json"
+
+# 針對不同廠商的檔案，預先設定好跳過行數和要保留的欄位
+VENDOR_PRESETS: Dict[str, Dict] = {
+    "香連": {"skiprows": 17, "columns": [0, 1, 3]},      # 香連檔案：跳過 17 行，保留第 0、1、3 欄
+    "甘妹": {"skiprows": 7, "columns": [2, 3]},          # 甘妹檔案：跳過 7 行，保留第 2、3 欄
+    "周照子": {"skiprows": 7, "columns": [2, 3]},        # 周照子檔案：跳過 7 行，保留第 2、3 欄
+    "炎弟": {"skiprows": 7, "columns": [2, 3]},          # 炎弟檔案：跳過 7 行，保留第 2、3 欄
+    "威宇": {"skiprows": 7, "columns": [2, 3]},          # 威宇檔案：跳過 7 行，保留第 2、3 欄
+    "麻煮": {"skiprows": 7, "columns": [2, 3]},          # 麻煮檔案：跳過 7 行，保留第 2、3 欄
+    "小旺號": {"skiprows": 8, "columns": [2, 3, 6]},     # 小旺號檔案：跳過 8 行，保留第 2、3、6 欄
+    "扶旺號": {"skiprows": 10, "columns": [1, 5]}        # 扶旺號檔案：跳過 10 行，保留第 1、5 欄
+}
+
+# 常見欄位名稱與對應的欄位類別，用於偵測表頭（與 config_template.json 的「欄位對應」相同）
+FIELD_KEYWORDS: Dict[str, List[str]] = {
+    "商品相關": ["商品名稱", "產品名稱", "品名", "商品", "產品", "item", "product"],
+    "數量相關": ["數量", "qty", "quantity", "amount"],
+    "價格相關": ["價格", "單價", "金額", "price", "cost", "amount"],
+    "日期相關": ["日期", "時間", "date", "time", "datetime"],
+    "編號相關": ["編號", "代碼", "序號", "id", "code", "serial"]
+}
+
+# 設定檔不存在時使用的預設設定
+DEFAULT_CONFIG: Dict = {
+    "預設設定": {
+        "通用報表": {"skiprows": 0, "columns": "all", "encoding": "auto"},
+        "有表頭的報表": {"skiprows": 1, "columns": "all", "encoding": "auto"},
+        "複雜報表": {"skiprows": 5, "columns": "2,3,4", "encoding": "auto"}
+    },
+    "欄位對應": FIELD_KEYWORDS
+}
+
+
+def load_config(config_file: str = CONFIG_FILE) -> Dict:
+    """
+    載入設定檔案
+    如果設定檔案不存在或無法解析，則使用預設設定
+    """
+    if os.path.exists(config_file):
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"載入設定檔案失敗: {e}")
+
+    # 返回預設設定
+    return copy.deepcopy(DEFAULT_CONFIG)
+
+
+def field_keywords(config: Dict) -> Dict[str, List[str]]:
+    """
+    取出設定檔「欄位對應」中的關鍵字列表（略過「說明」等非列表項目）
+    設定檔沒有此區段時使用 FIELD_KEYWORDS
+    """
+    mapping = config.get("欄位對應") or FIELD_KEYWORDS
+    return {name: list(words) for name, words in mapping.items() if isinstance(words, list)}
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+階段效能記錄模組
+以進度回呼的階段名稱切分工作，記錄每個階段的牆上時間、CPU 時間、處理筆數與記憶體峰值，
+可輸出為 JSON 報告；另提供以 cProfile 執行函數並寫出分析檔的工具，不依賴 GUI
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .progress import ProgressCallback
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組，不記錄 RSS
+    resource = None
+
+# 報告格式版本
+PROFILE_VERSION = 1
+
+
+def peak_rss_mb() -> Optional[float]:
+    """行程目前為止的最大常駐記憶體（MB），無法取得時返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以位元組為單位
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class StageProfiler:
+    """
+    依階段記錄效能
+    本身即是進度回呼：階段名稱改變時結束上一個階段並開始新的階段，
+    同一階段回報的最大已完成數量作為該階段的處理筆數（用來計算每秒筆數）
+
+    參數：
+        trace_memory: 是否以 tracemalloc 記錄每個階段的 Python 記憶體峰值（會讓配置記憶體較多的階段變慢）
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: List[Dict] = []
+        self._current: Optional[Dict] = None
+        self._started_tracing = False
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def __call__(self, stage: str, done: int = 0, total: int = 0) -> None:
+        if self._current is None or self._current["階段"] != stage:
+            self._end_stage()
+            self._current = {"階段": stage, "筆數": 0, "_wall": time.perf_counter(),
+                             "_cpu": time.process_time(), "_rss": peak_rss_mb()}
+            if self.trace_memory:
+                tracemalloc.reset_peak()
+        self._current["筆數"] = max(self._current["筆數"], done)
+
+    def wrap(self, progress: Optional[ProgressCallback] = None) -> ProgressCallback:
+        """返回同時記錄階段並轉送給 progress 的進度回呼"""
+        def callback(stage: str, done: int = 0, total: int = 0) -> None:
+            self(stage, done, total)
+            if progress is not None:
+                progress(stage, done, total)
+        return callback
+
+    def _end_stage(self) -> None:
+        current, self._current = self._current, None
+        if current is None:
+            return
+        wall = time.perf_counter() - current.pop("_wall")
+        rss_before = current.pop("_rss")
+        rss = peak_rss_mb()
+        current["牆上秒數"] = round(wall, 4)
+        current["CPU 秒數"] = round(time.process_time() - current.pop("_cpu"), 4)
+        current["每秒筆數"] = round(current["筆數"] / wall, 1) if current["筆數"] and wall > 0 else None
+        current["記憶體峰值 MB"] = (round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+                                if self.trace_memory else None)
+        current["RSS 峰值 MB"] = round(rss, 1) if rss is not None else None
+        # 這個階段讓行程的 RSS 峰值增加了多少（之前的階段已達到的峰值不會重複計算）
+        current["RSS 增加 MB"] = round(rss - rss_before, 1) if rss is not None else None
+        self.stages.append(current)
+
+    def finish(self) -> None:
+        """結束目前的階段，由本物件啟動的 tracemalloc 也一併停止"""
+        self._end_stage()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self) -> Dict:
+        """
+        階段效能報告
+
+        返回：
+            {"version", "總牆上秒數", "總 CPU 秒數", "RSS 峰值 MB", "階段": [每個階段的記錄]}
+        """
+        rss = peak_rss_mb()
+        return {
+            "version": PROFILE_VERSION,
+            "總牆上秒數": round(time.perf_counter() - self._start, 4),
+            "總 CPU 秒數": round(time.process_time() - self._cpu_start, 4),
+            "RSS 峰值 MB": round(rss, 1) if rss is not None else None,
+            "階段": list(self.stages),
+        }
+
+    def write_json(self, path: str) -> str:
+        """將報告寫成 JSON 檔案，返回檔案路徑"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def format_report(report: Dict) -> str:
+    """將階段效能報告整理為對齊的文字表格"""
+    lines = [f"{'階段':<20}{'牆上秒數':>10}{'CPU 秒數':>10}{'筆數':>12}{'每秒筆數':>12}{'RSS 峰值 MB':>12}"]
+    for stage in report["階段"]:
+        per_second = f"{stage['每秒筆數']:,.0f}" if stage["每秒筆數"] else "-"
+        rss = f"{stage['RSS 峰值 MB']:,.1f}" if stage["RSS 峰值 MB"] is not None else "-"
+        lines.append(f"{stage['階段']:<20}{stage['牆上秒數']:>10.3f}{stage['CPU 秒數']:>10.3f}"
+                     f"{stage['筆數'] or '-':>12}{per_second:>12}{rss:>12}")
+        if stage["記憶體峰值 MB"] is not None:
+            lines[-1] += f"（Python 配置峰值 {stage['記憶體峰值 MB']:,.1f} MB）"
+    lines.append(f"總計 {report['總牆上秒數']:.3f} 秒（CPU {report['總 CPU 秒數']:.3f} 秒）")
+    return "\n".join(lines)
+
+
+def summarize_report(report: Dict, top: int = 3) -> str:
+    """一行摘要：總時間與最耗時的 top 個階段"""
+    stages = sorted(report["階段"], key=lambda stage: stage["牆上秒數"], reverse=True)[:top]
+    parts = "、".join(f"{stage['階段']} {stage['牆上秒數']:.2f} 秒" for stage in stages)
+    return f"總計 {report['總牆上秒數']:.2f} 秒" + (f"：{parts}" if parts else "")
+
+
+def profile_call(func: Callable, path: str, top: int = 20) -> Tuple[object, str]:
+    """
+    以 cProfile 執行函數並寫出分析檔（可用 python -m pstats 或 snakeviz 開啟）
+
+    參數：
+        func: 要執行的函數（不帶參數）
+        path: 分析檔路徑
+        top: 摘要列出累計時間最長的函數數量
+
+    返回：
+        (函數的返回值, 累計時間最長的 top 個函數的文字摘要)
+    """
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(func)
+    finally:
+        profiler.dump_stats(path)
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+    return result, text.getvalue()
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+進度回報模組
+核心函數以 progress(階段, 已完成, 總數) 回報進度；回呼函數拋出 JobCancelled 即可在下一個回報點中止工作，
+不需要依賴任何執行緒或 GUI 套件
+"""
+
+from typing import Callable, Optional
+
+# 進度回呼：progress(階段名稱, 已完成數量, 總數量)，總數量為 0 表示無法得知進度
+ProgressCallback = Callable[[str, int, int], None]
+
+
+class JobCancelled(Exception):
+    """使用者取消工作時由進度回呼拋出"""
+
+
+def report(progress: Optional[ProgressCallback], stage: str, done: int = 0, total: int = 0) -> None:
+    """有設定回呼時回報進度"""
+    if progress is not None:
+        progress(stage, done, total)
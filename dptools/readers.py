@@ -0,0 +1,434 @@
+# -*- coding: utf-8 -*-
+"""
+檔案讀取模組
+提供 Excel / CSV 檔案的讀取與編碼偵測，不依賴 GUI
+"""
+
+import codecs
+import csv
+import io
+import os
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import chardet
+import pandas as pd
+
+from .cache import ReadCache
+from .cleaning import select_columns
+from .detection import HEADER_PROBE_ROWS, detect_header
+from .excel_engines import probe_xlsx, read_excel, select_engine
+from .progress import ProgressCallback, report
+
+# 智慧讀取時依序嘗試的 CSV 分隔符號
+CSV_SEPARATORS = [',', '\t', ';', '|']
+
+# 編碼偵測每段取樣的位元組數（檔頭、中段、檔尾各一段）
+ENCODING_SAMPLE_SIZE = 64 * 1024
+# 偵測信心達到此門檻就不再讀取更多取樣
+ENCODING_MIN_CONFIDENCE = 0.9
+# 編碼偵測結果快取的最大檔案數
+ENCODING_CACHE_SIZE = 256
+# chardet 回報的編碼改用相容的超集合，避免取樣外的字元解碼失敗
+ENCODING_SUPERSETS = {"ascii": "utf-8", "gb2312": "gb18030", "gbk": "gb18030", "big5": "cp950"}
+# 分隔符號偵測最多檢查的取樣列數
+SNIFF_MAX_LINES = 200
+# chardet 的結果無法解碼取樣時，依序改試的常見編碼
+ENCODING_FALLBACKS = ["utf-8", "cp950", "gb18030"]
+# 依 BOM 直接判斷的編碼
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# 編碼偵測結果快取：(路徑, 檔案大小, 修改時間) → 編碼
+_encoding_cache: "OrderedDict[Tuple[str, int, int], Optional[str]]" = OrderedDict()
+
+
+def is_csv(path: str) -> bool:
+    """判斷是否以 CSV 方式讀取"""
+    return path.lower().endswith(('.csv', '.txt'))
+
+
+def _encoding_samples(path: str, sample_size: int) -> List[bytes]:
+    """
+    讀取檔頭、中段、檔尾三段取樣；小檔案直接讀取全部內容
+    中段與檔尾會從下一個換行開始，避免從多位元組字元的中間切開
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        if size <= sample_size * 3:
+            return [f.read()]
+        samples = [f.read(sample_size)]
+        for offset in (size // 2, size - sample_size):
+            f.seek(offset)
+            block = f.read(sample_size)
+            newline = block.find(b'\n')
+            samples.append(block[newline + 1:] if newline >= 0 else block)
+        return samples
+
+
+def _decodes(samples: List[bytes], encoding: str) -> bool:
+    """檢查取樣能否以指定編碼完整解碼（取樣結尾可能截斷一個多位元組字元，不列入檢查）"""
+    try:
+        for sample in samples:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
+def _detect_samples(samples: List[bytes], min_confidence: float) -> Optional[str]:
+    """
+    依序加入取樣給 chardet，信心達到門檻即停止
+    字元種類很少的中文資料可能被誤判（例如 Big5 判成 CP949），因此會以取樣驗證結果
+    """
+    for bom, name in BOM_ENCODINGS:
+        if samples[0].startswith(bom):
+            return name
+    encoding = None
+    data = b''
+    for sample in samples:
+        data += sample
+        result = chardet.detect(data)
+        encoding = result['encoding']
+        # 全是 ASCII 的檔頭不足以判斷，後面可能還有中文，繼續取樣
+        if encoding and encoding.lower() != 'ascii' and result['confidence'] >= min_confidence:
+            break
+    if encoding:
+        encoding = ENCODING_SUPERSETS.get(encoding.lower(), encoding)
+    if encoding and not _decodes(samples, encoding):
+        encoding = next((e for e in ENCODING_FALLBACKS if _decodes(samples, e)), encoding)
+    return encoding
+
+
+def detect_encoding(path: str, sample_size: int = ENCODING_SAMPLE_SIZE,
+                    min_confidence: float = ENCODING_MIN_CONFIDENCE,
+                    samples: Optional[List[bytes]] = None) -> Optional[str]:
+    """
+    以取樣方式自動偵測檔案編碼
+    依序加入檔頭、中段、檔尾的取樣給 chardet，信心達到門檻即停止，不讀取整個檔案；
+    結果依 (路徑, 檔案大小, 修改時間) 快取，同一個檔案在偵測與處理步驟之間不會重複偵測
+
+    參數：
+        path: 檔案路徑
+        sample_size: 每段取樣的位元組數
+        min_confidence: 停止取樣的信心門檻
+        samples: 已讀取的取樣（見 _encoding_samples），None 表示由此函數讀取
+
+    返回：
+        偵測到的編碼名稱，無法判斷時為 None
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key in _encoding_cache:
+        _encoding_cache.move_to_end(key)
+        return _encoding_cache[key]
+
+    if samples is None:
+        samples = _encoding_samples(path, sample_size)
+    encoding = _detect_samples(samples, min_confidence)
+
+    _encoding_cache[key] = encoding
+    if len(_encoding_cache) > ENCODING_CACHE_SIZE:
+        _encoding_cache.popitem(last=False)
+    return encoding
+
+
+def resolve_encoding(path: str, encoding: Optional[str]) -> Optional[str]:
+    """
+    將設定值轉換為實際使用的編碼
+    None、"auto" 或 "自動偵測" 表示自動偵測
+    """
+    if encoding is None or encoding in ("auto", "自動偵測"):
+        return detect_encoding(path)
+    return encoding
+
+
+def column_projection(columns: Optional[List[int]]) -> Tuple[Optional[List[int]], Optional[List[int]]]:
+    """
+    將要保留的欄位編號轉為讀取時使用的 usecols
+
+    返回：
+        (由小到大且不重複的欄位編號, 讀取後恢復指定順序用的位置)；
+        保留全部欄位或含負數編號（無法在讀取時篩選）時為 (None, None)
+    """
+    if columns is None or any(c < 0 for c in columns):
+        return None, None
+    usecols = sorted(set(columns))
+    return usecols, [usecols.index(c) for c in columns]
+
+
+def reorder_columns(df: pd.DataFrame, order: Optional[List[int]]) -> pd.DataFrame:
+    """依 column_projection 的位置恢復使用者指定的欄位順序（可重複）"""
+    if order is None or order == list(range(len(df.columns))):
+        return df
+    return df.iloc[:, order]
+
+
+def read_table(path: str, skiprows: int = 0, columns: Optional[List[int]] = None,
+               encoding: Optional[str] = None, nrows: Optional[int] = None,
+               sep: str = ',', quotechar: str = '"',
+               engine: Optional[str] = None, cache: Optional[ReadCache] = None,
+               progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+    """
+    讀取 Excel 或 CSV 檔案並篩選欄位
+    指定欄位時只解析需要的欄位（傳給 pandas 的 usecols），不會先讀入整個檔案再篩選
+
+    參數：
+        path: 檔案路徑
+        skiprows: 跳過的列數
+        columns: 要保留的欄位編號，None 表示全部
+        encoding: CSV 編碼，None 或 "auto" 表示自動偵測
+        nrows: 最多讀取的資料列數
+        sep: CSV 分隔符號
+        quotechar: CSV 引號字元
+        engine: Excel 讀取引擎，None 表示自動選擇（見 excel_engines.select_engine）
+        cache: 讀取快取，指定時以相同內容與設定讀取過的檔案直接由快取載入
+        progress: 進度回呼，依序回報「偵測編碼」（CSV 自動偵測時）與「讀取」階段，讀取完成時回報筆數
+
+    返回：
+        讀取後的資料框架
+    """
+    name = os.path.basename(path)
+    if is_csv(path):
+        if encoding is None or encoding in ("auto", "自動偵測"):
+            report(progress, f"偵測編碼 {name}")
+        encoding = resolve_encoding(path, encoding)
+    report(progress, f"讀取 {name}")
+    if cache is not None:
+        settings = {"skiprows": skiprows, "columns": columns, "nrows": nrows}
+        if is_csv(path):
+            settings.update(encoding=encoding, sep=sep, quotechar=quotechar)
+        else:
+            # 不同引擎解析出的型別可能不同（例如日期、空白儲存格），各自快取
+            settings["engine"] = select_engine(path, engine)
+        df = cache.load(path, settings, lambda: read_table(path, skiprows, columns, encoding, nrows,
+                                                           sep, quotechar, engine))
+        report(progress, f"讀取 {name}", len(df), len(df))
+        return df
+
+    usecols, order = column_projection(columns)
+    if is_csv(path):
+        df = pd.read_csv(path, encoding=encoding, skiprows=skiprows, nrows=nrows,
+                         sep=sep, quotechar=quotechar, usecols=usecols)
+    else:
+        df = read_excel(path, skiprows=skiprows, nrows=nrows, engine=engine, usecols=usecols)
+    df = select_columns(df, columns) if usecols is None else reorder_columns(df, order)
+    report(progress, f"讀取 {name}", len(df), len(df))
+    return df
+
+
+def header_names(values) -> List[str]:
+    """
+    將表頭列轉為欄位名稱，空白欄位與重複名稱的處理方式與 pandas 相同
+    （空白為 "Unnamed: i"，重複名稱加上 ".1"、".2"…）
+    """
+    names, seen = [], {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None or pd.isna(value) or str(value).strip() == "" else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _sniff_dialect(lines: List[str]) -> Tuple[str, str]:
+    """
+    由取樣文字判斷分隔符號與引號字元
+    分隔符號取能把最多列切成相同欄位數（且多於一欄）的候選
+    """
+    quotechar = '"'
+    try:
+        quotechar = csv.Sniffer().sniff('\n'.join(lines[:50]), delimiters=''.join(CSV_SEPARATORS)).quotechar
+    except csv.Error:
+        pass
+    best_sep, best_rows = CSV_SEPARATORS[0], 0
+    for sep in CSV_SEPARATORS:
+        widths = Counter(len(row) for row in csv.reader(lines, delimiter=sep, quotechar=quotechar))
+        width, rows = widths.most_common(1)[0] if widths else (0, 0)
+        if width > 1 and rows > best_rows:
+            best_sep, best_rows = sep, rows
+    return best_sep, quotechar
+
+
+@dataclass
+class ReadPlan:
+    """
+    檔案讀取計畫
+    智慧偵測時由一段取樣決定編碼、分隔符號、引號字元與表頭所在列，
+    預覽直接解析取樣內容，完整讀取依計畫執行一次，不再重新偵測或逐一嘗試分隔符號
+    """
+    path: str
+    encoding: Optional[str] = None
+    sep: str = ','
+    quotechar: str = '"'
+    skiprows: int = 0
+    # CSV 取樣的文字（已解碼、截到最後一個完整的列）
+    sample_text: str = field(default='', repr=False)
+    # Excel 取樣的原始列（不含表頭設定）
+    sample_rows: Optional[pd.DataFrame] = field(default=None, repr=False)
+    # CSV 的總行數；line_count_exact 為 False 時是依取樣的平均行長估計的值
+    line_count: Optional[int] = None
+    line_count_exact: bool = False
+
+    @property
+    def is_csv(self) -> bool:
+        return is_csv(self.path)
+
+    def raw_rows(self, nrows: int = HEADER_PROBE_ROWS) -> pd.DataFrame:
+        """取樣的前 nrows 列原始資料（不指定表頭，空白儲存格為 None），用於表頭與欄位偵測"""
+        if not self.is_csv:
+            return self.sample_rows.iloc[:nrows]
+        lines = self.sample_text.splitlines()[:nrows]
+        rows = [[value if value.strip() else None for value in row]
+                for row in csv.reader(lines, delimiter=self.sep, quotechar=self.quotechar)]
+        return pd.DataFrame(rows)
+
+    def preview(self, nrows: int = 20, skiprows: Optional[int] = None) -> pd.DataFrame:
+        """由取樣內容產生前 nrows 列的預覽，不重新開啟檔案"""
+        skiprows = self.skiprows if skiprows is None else skiprows
+        if self.is_csv:
+            return pd.read_csv(io.StringIO(self.sample_text), sep=self.sep, quotechar=self.quotechar,
+                               skiprows=skiprows, nrows=nrows)
+        rows = self.sample_rows.iloc[skiprows:]
+        if rows.empty:
+            return pd.DataFrame()
+        df = rows.iloc[1:nrows + 1].reset_index(drop=True).infer_objects()
+        df.columns = header_names(rows.iloc[0].tolist())
+        return df
+
+    def read(self, skiprows: Optional[int] = None, columns: Optional[List[int]] = None,
+             nrows: Optional[int] = None, cache: Optional[ReadCache] = None,
+             progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+        """依計畫讀取完整檔案，指定 cache 時優先由讀取快取載入"""
+        skiprows = self.skiprows if skiprows is None else skiprows
+        return read_table(self.path, skiprows=skiprows, columns=columns, encoding=self.encoding,
+                          nrows=nrows, sep=self.sep, quotechar=self.quotechar, cache=cache,
+                          progress=progress)
+
+
+def _is_xlsx(path: str) -> bool:
+    return path.lower().endswith(('.xlsx', '.xlsm'))
+
+
+def _excel_sample_rows(path: str, nrows: int) -> pd.DataFrame:
+    """讀取 Excel 檔案前 nrows 列原始資料（不指定表頭）；.xlsx 只解析檔案開頭，不載入整個活頁簿"""
+    if _is_xlsx(path):
+        return pd.DataFrame(probe_xlsx(path, nrows)["rows"]).infer_objects()
+    return read_excel(path, header=None, nrows=nrows)
+
+
+def build_read_plan(path: str, encoding: Optional[str] = None,
+                    field_keywords: Optional[Dict[str, List[str]]] = None,
+                    sample_size: int = ENCODING_SAMPLE_SIZE,
+                    probe_rows: int = HEADER_PROBE_ROWS) -> ReadPlan:
+    """
+    開啟檔案一次取樣，偵測編碼、分隔符號、引號字元與表頭所在列
+
+    參數：
+        path: 檔案路徑
+        encoding: CSV 編碼，None 或 "auto" 表示自動偵測
+        field_keywords: 偵測表頭用的欄位關鍵字（設定檔的「欄位對應」），None 表示使用預設值
+        sample_size: 取樣的位元組數
+        probe_rows: 偵測表頭時檢查的列數
+
+    返回：
+        ReadPlan 讀取計畫
+    """
+    if not is_csv(path):
+        plan = ReadPlan(path, sample_rows=_excel_sample_rows(path, probe_rows))
+    else:
+        samples = _encoding_samples(path, sample_size)
+        if encoding is None or encoding in ("auto", "自動偵測"):
+            encoding = detect_encoding(path, samples=samples)
+        text = samples[0].decode(encoding or 'utf-8', errors='replace')
+        if len(samples) > 1:
+            # 取樣可能在一列的中間截斷，捨棄最後不完整的一列
+            text = text[:text.rfind('\n') + 1]
+        sep, quotechar = _sniff_dialect(text.splitlines()[:SNIFF_MAX_LINES])
+        plan = ReadPlan(path, encoding=encoding, sep=sep, quotechar=quotechar, sample_text=text)
+        # 以檔頭、中段、檔尾取樣的平均行長估計總行數
+        newlines = sum(sample.count(b'\n') for sample in samples)
+        if len(samples) == 1:
+            plan.line_count = text.count('\n') + (0 if text.endswith('\n') or not text else 1)
+            plan.line_count_exact = True
+        elif newlines:
+            plan.line_count = int(os.path.getsize(path) * newlines / sum(len(sample) for sample in samples))
+    plan.skiprows, _ = detect_header(plan.raw_rows(probe_rows), field_keywords, probe_rows)
+    return plan
+
+
+@dataclass
+class FileProbe:
+    """
+    檔案探測結果：欄位名稱、工作表、估計列數與前幾列資料
+    只讀取檔案開頭，用於選擇檔案後立即顯示欄位，完整讀取留到實際處理時
+    """
+    path: str
+    headers: List
+    sample: pd.DataFrame = field(repr=False)
+    sheet_names: List[str] = field(default_factory=list)
+    # 資料列數（不含表頭）；row_count_exact 為 False 時是依檔案大小估計的值
+    row_count: Optional[int] = None
+    row_count_exact: bool = False
+
+
+def probe_file(path: str, nrows: int = 20, skiprows: int = 0,
+               encoding: Optional[str] = None) -> FileProbe:
+    """
+    快速探測檔案的欄位與前幾列資料，不載入整個檔案
+
+    參數：
+        path: 檔案路徑
+        nrows: 取樣的資料列數
+        skiprows: 跳過的列數（表頭在跳過之後的第一列）
+        encoding: CSV 編碼，None 或 "auto" 表示自動偵測
+
+    返回：
+        FileProbe 探測結果
+    """
+    if is_csv(path):
+        plan = build_read_plan(path, encoding)
+        sample = plan.preview(nrows=nrows, skiprows=skiprows)
+        row_count = None if plan.line_count is None else max(plan.line_count - skiprows - 1, 0)
+        return FileProbe(path, list(sample.columns), sample,
+                         row_count=row_count, row_count_exact=plan.line_count_exact)
+
+    if _is_xlsx(path):
+        info = probe_xlsx(path, skiprows + nrows + 1)
+        rows = info["rows"][skiprows:]
+        sheet_names, row_count, exact = info["sheet_names"], info["row_count"], info["row_count_exact"]
+    else:
+        workbook = pd.ExcelFile(path, engine=select_engine(path))
+        rows = workbook.parse(0, header=None, skiprows=skiprows, nrows=nrows + 1).values.tolist()
+        # 舊版 .xls 沒有可快速取得的列數資訊
+        sheet_names, row_count, exact = workbook.sheet_names, None, False
+    headers = header_names(rows[0]) if rows else []
+    sample = pd.DataFrame(rows[1:nrows + 1], columns=headers).infer_objects()
+    if row_count is not None:
+        row_count = max(row_count - skiprows - 1, 0)
+    return FileProbe(path, headers, sample, sheet_names, row_count, exact)
+
+
+def read_preview(path: str, encoding: Optional[str] = None, nrows: int = 20) -> pd.DataFrame:
+    """
+    智慧讀取檔案前幾列，用於格式偵測
+    由一段取樣判斷分隔符號與表頭位置（見 build_read_plan），不需要逐一嘗試解析
+
+    參數：
+        path: 檔案路徑
+        encoding: CSV 編碼，None 或 "auto" 表示自動偵測
+        nrows: 讀取的資料列數
+
+    返回：
+        前 nrows 列的資料框架
+    """
+    return build_read_plan(path, encoding).preview(nrows)
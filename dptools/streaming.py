@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+串流處理模組
+將大型 CSV / Excel 檔案分批讀取、篩選欄位、清理並逐批寫出，記憶體用量只與每批大小有關
+"""
+
+from operator import itemgetter
+from typing import Callable, Iterator, List, Optional
+
+import pandas as pd
+
+from .cleaning import clean_frame, select_columns
+from .excel_engines import iter_excel_rows
+from .readers import column_projection, header_names, is_csv, read_table, reorder_columns, resolve_encoding
+from .writers import ChunkedWriter
+
+# 預設每批處理的資料列數
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def _iter_excel_chunks(path: str, skiprows: int, chunksize: int,
+                       usecols: Optional[List[int]] = None) -> Iterator[pd.DataFrame]:
+    """
+    以 openpyxl 唯讀模式逐列讀取第一個工作表，每 chunksize 列產生一批
+    指定 usecols 時每列只保留這些欄位，不需要的儲存格不會放進資料框架
+    """
+    rows = iter_excel_rows(path, skiprows)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = header_names(header)
+    pick = None
+    if usecols is not None:
+        columns = [columns[i] for i in usecols]
+        pick = (lambda row, i=usecols[0]: (row[i],)) if len(usecols) == 1 else itemgetter(*usecols)
+    batch = []
+    for row in rows:
+        batch.append(row if pick is None else pick(row))
+        if len(batch) >= chunksize:
+            yield pd.DataFrame(batch, columns=columns)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=columns)
+
+
+def iter_table_chunks(path: str, skiprows: int = 0, columns: Optional[List[int]] = None,
+                      encoding: Optional[str] = None, chunksize: int = DEFAULT_CHUNKSIZE,
+                      sep: str = ',', quotechar: str = '"') -> Iterator[pd.DataFrame]:
+    """
+    分批讀取檔案並篩選欄位
+
+    參數：
+        path: 檔案路徑
+        skiprows: 跳過的列數
+        columns: 要保留的欄位編號，None 表示全部
+        encoding: CSV 編碼，None 或 "auto" 表示自動偵測
+        chunksize: 每批資料列數
+        sep: CSV 分隔符號
+        quotechar: CSV 引號字元
+
+    返回：
+        產生資料框架的迭代器
+    """
+    # 指定欄位時在讀取階段就只解析需要的欄位
+    usecols, order = column_projection(columns)
+    if usecols is None and columns is not None:
+        project = lambda chunk: select_columns(chunk, columns)  # noqa: E731
+    else:
+        project = lambda chunk: reorder_columns(chunk, order)  # noqa: E731
+    if is_csv(path):
+        encoding = resolve_encoding(path, encoding)
+        reader = pd.read_csv(path, encoding=encoding, skiprows=skiprows, chunksize=chunksize,
+                             sep=sep, quotechar=quotechar, usecols=usecols)
+        with reader:
+            for chunk in reader:
+                yield project(chunk)
+    elif path.lower().endswith('.xlsx'):
+        for chunk in _iter_excel_chunks(path, skiprows, chunksize, usecols):
+            yield project(chunk)
+    else:
+        # 舊版 .xls 無法串流讀取，只能整份載入後分批寫出
+        df = read_table(path, skiprows=skiprows, columns=columns)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def process_file_streaming(path: str, output_path: str, skiprows: int = 0,
+                           columns: Optional[List[int]] = None, encoding: Optional[str] = None,
+                           clean: bool = False, chunksize: int = DEFAULT_CHUNKSIZE,
+                           progress: Optional[Callable[[int], None]] = None,
+                           preview_rows: int = 20, sep: str = ',',
+                           quotechar: str = '"', output_format: Optional[str] = None) -> dict:
+    """
+    以串流方式處理檔案：分批讀取、篩選欄位、清理並逐批寫出
+
+    參數：
+        path: 輸入檔案路徑
+        output_path: 輸出檔案路徑（.csv、.xlsx 或 .parquet）
+        skiprows: 跳過的列數
+        columns: 要保留的欄位編號，None 表示全部
+        encoding: CSV 編碼，None 或 "auto" 表示自動偵測
+        clean: 是否對每批資料執行 clean_frame（去空白、全形轉半形、移除空白列）
+        chunksize: 每批資料列數
+        progress: 每寫出一批後呼叫，參數為目前累計處理的列數
+        preview_rows: 保留前幾列作為預覽
+        sep: CSV 分隔符號
+        quotechar: CSV 引號字元
+        output_format: 輸出路徑沒有副檔名時使用的格式（見 writers.output_path）
+
+    返回：
+        包含 "rows"（處理列數）、"output"（輸出路徑）、"preview"（預覽資料）的字典
+    """
+    preview = None
+    with ChunkedWriter(output_path, output_format) as writer:
+        for chunk in iter_table_chunks(path, skiprows=skiprows, columns=columns,
+                                       encoding=encoding, chunksize=chunksize,
+                                       sep=sep, quotechar=quotechar):
+            if clean:
+                chunk = clean_frame(chunk)
+            writer.write(chunk)
+            if preview is None or len(preview) < preview_rows:
+                head = chunk.head(preview_rows)
+                preview = head if preview is None else pd.concat([preview, head]).head(preview_rows)
+            if progress is not None:
+                progress(writer.rows)
+    return {"rows": writer.rows, "output": writer.path, "preview": preview}
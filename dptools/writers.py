@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""
+結果輸出模組
+將處理或比對結果寫出為 Excel / CSV / Parquet 檔案，不依賴 GUI
+所有格式都以固定列數分批寫出，記憶體用量只與單批資料大小有關
+"""
+
+import html
+import importlib.util
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .progress import ProgressCallback, report
+
+# 比對結果輸出資料夾名稱
+MATCH_OUTPUT_DIRNAME = "比對結果"
+
+# 輸出格式：副檔名、需要的套件（None 表示不需額外套件）與顯示名稱
+OUTPUT_FORMATS: Dict[str, Dict] = {
+    "xlsx": {"suffix": ".xlsx", "module": "openpyxl", "label": "Excel 檔案"},
+    "csv": {"suffix": ".csv", "module": None, "label": "CSV 檔案"},
+    "parquet": {"suffix": ".parquet", "module": "pyarrow", "label": "Parquet 檔案"},
+}
+DEFAULT_FORMAT = "xlsx"
+
+# 每批寫出的列數
+WRITE_CHUNKSIZE = 50_000
+
+# float64 可精確表示的整數範圍（絕對值上限）
+FLOAT_EXACT_LIMIT = 2 ** 53
+
+
+def available_formats() -> List[str]:
+    """列出已安裝所需套件的輸出格式"""
+    return [
+        name for name, spec in OUTPUT_FORMATS.items()
+        if spec["module"] is None or importlib.util.find_spec(spec["module"]) is not None
+    ]
+
+
+def output_path(path: str, fmt: Optional[str] = None) -> Tuple[str, str]:
+    """
+    決定輸出格式與實際路徑
+    路徑已有支援的副檔名時依副檔名決定格式；否則使用 fmt（預設 .xlsx）並補上副檔名
+
+    返回：
+        (實際輸出路徑, 輸出格式)
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    for name, spec in OUTPUT_FORMATS.items():
+        if suffix == spec["suffix"]:
+            return path, name
+    fmt = fmt or DEFAULT_FORMAT
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"不支援的輸出格式: {fmt}")
+    return path + OUTPUT_FORMATS[fmt]["suffix"], fmt
+
+
+def dialog_filter(formats: Optional[List[str]] = None) -> str:
+    """產生存檔對話框的檔案類型篩選字串，例如「Excel 檔案 (*.xlsx);;CSV 檔案 (*.csv)」"""
+    formats = available_formats() if formats is None else formats
+    return ";;".join(f"{OUTPUT_FORMATS[f]['label']} (*{OUTPUT_FORMATS[f]['suffix']})" for f in formats)
+
+
+def filter_format(selected: str) -> Optional[str]:
+    """由存檔對話框選取的篩選字串取得輸出格式"""
+    return next((name for name, spec in OUTPUT_FORMATS.items() if f"*{spec['suffix']})" in selected), None)
+
+
+def write_table(df: pd.DataFrame, path: str, fmt: Optional[str] = None,
+                chunksize: int = WRITE_CHUNKSIZE, progress: Optional[ProgressCallback] = None) -> str:
+    """
+    分批寫出資料，.csv 以 UTF-8 BOM 寫出（Excel 可直接開啟），.parquet 需要 pyarrow，
+    其餘一律寫成 .xlsx
+
+    參數：
+        df: 要寫出的資料框架
+        path: 輸出檔案路徑
+        fmt: 路徑沒有支援的副檔名時使用的格式（xlsx / csv / parquet）
+        chunksize: 每批寫出的列數
+        progress: 每批寫出後回報已寫出的列數
+
+    返回：
+        實際寫出的檔案路徑
+    """
+    stage = f"寫出 {os.path.basename(output_path(path, fmt)[0])}"
+    report(progress, stage, 0, len(df))
+    with ChunkedWriter(path, fmt) as writer:
+        # 沒有資料時也寫出一次，保留欄位名稱
+        for start in range(0, max(len(df), 1), chunksize):
+            writer.write(df.iloc[start:start + chunksize])
+            report(progress, stage, min(start + chunksize, len(df)), len(df))
+    return writer.path
+
+
+def _text_values(values: pd.Series, integer: bool = False) -> pd.Series:
+    """
+    將欄位轉為字串並保留空值；integer 為 True 時整數值的浮點數不加上 ".0"
+    （原本是整數、為了容納空值或小數而放寬為 float64 的欄位）
+    """
+    text = values.astype(object)
+    text = text.where(text.isna(), text.astype(str))
+    if integer:
+        whole = values.notna() & (values % 1 == 0)
+        text[whole] = values[whole].astype("int64").astype(str)
+    return text
+
+
+class ChunkedWriter:
+    """
+    分批寫出資料，適用於無法一次放進記憶體的大型結果
+    .csv 以附加方式逐批寫出；.xlsx 使用 openpyxl 的 write_only 模式逐列寫出；
+    .parquet 以 pyarrow 每批寫成一個 row group，三者的記憶體用量都只與單批資料大小有關；
+    Parquet 整個檔案只能有一種欄位型別，保留第一批推斷的型別；後續批次放不進時才放寬
+    （整數欄位出現小數時改為 float64，無法精確表示的大整數或出現文字時改為字串），
+    發生例外（包含取消）時刪除寫到一半的檔案，不留下看似完整的結果
+
+    使用方式：
+        with ChunkedWriter(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        self.path, self.format = output_path(path, fmt)
+        if self.format not in available_formats():
+            raise ValueError(f"輸出 {self.format} 格式需要安裝 {OUTPUT_FORMATS[self.format]['module']}")
+        self.rows = 0
+        self._header_written = False
+        self._workbook = None
+        self._sheet = None
+        self._parquet = None
+        self._parquet_temp = None
+        self._schema = None
+        # 原本為整數、之後放寬為 float64 或字串的欄位（轉為字串時整數值不加上 ".0"）
+        self._integer_columns = set()
+        # 已寫出的整數欄位的最小與最大值，判斷放寬為 float64 時是否會損失精確度
+        self._integer_ranges: Dict[str, Tuple[int, int]] = {}
+
+    def __enter__(self):
+        if self.format == "xlsx":
+            from openpyxl import Workbook
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet()
+        return self
+
+    def write(self, df: pd.DataFrame):
+        """寫出一批資料，第一批同時寫出欄位名稱"""
+        if self.format == "csv":
+            df.to_csv(
+                self.path, index=False, header=not self._header_written,
+                mode='a' if self._header_written else 'w',
+                encoding='utf-8' if self._header_written else 'utf-8-sig',
+            )
+        elif self.format == "parquet":
+            self._write_parquet(df)
+        else:
+            if not self._header_written:
+                self._sheet.append([str(c) for c in df.columns])
+            # openpyxl 不接受 pandas 的空值物件，先轉為 None
+            for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+                self._sheet.append(list(row))
+        self._header_written = True
+        self.rows += len(df)
+
+    def _write_parquet(self, df: pd.DataFrame):
+        # 欄位名稱一律轉為字串
+        df = df.set_axis([str(c) for c in df.columns], axis=1)
+        table = self._arrow_table(df)
+        if self._parquet is None:
+            self._schema = self._widen_schema(table)
+            self._open_parquet()
+        elif table.schema.names != self._schema.names:
+            raise ValueError("每批資料的欄位必須與第一批相同")
+        fitted = self._fit_schema(table)
+        if fitted is None:
+            # 這批資料放不進目前的型別（例如數字欄位出現文字），放寬型別並改寫已寫出的資料
+            self._unify_schema(table)
+            fitted = self._fit_schema(self._arrow_table(df))
+        self._track_integers(fitted)
+        self._parquet.write_table(fitted)
+
+    def _arrow_table(self, df: pd.DataFrame):
+        """將一批資料轉為 Arrow 表格：文字欄位可能混雜數字與文字，統一轉為字串（保留空值）"""
+        import pyarrow as pa
+
+        df = df.copy(deep=False)
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = _text_values(df[col])
+            elif self._schema is not None and pa.types.is_string(self._schema.field(col).type):
+                # 已放寬為字串的欄位，這批的數字或類別也轉為字串
+                df[col] = _text_values(df[col], col in self._integer_columns)
+        return pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+
+    @staticmethod
+    def _widen_schema(table):
+        """由第一批資料決定欄位型別：全為空值的欄位改為字串，其餘保留 Arrow 推斷的型別"""
+        import pyarrow as pa
+
+        return pa.schema([
+            field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+            for field in table.schema
+        ])
+
+    def _track_integers(self, table):
+        """記錄整數欄位已寫出的最小與最大值"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        for field in self._schema:
+            if not pa.types.is_integer(field.type):
+                continue
+            bounds = pc.min_max(table.column(field.name))
+            low, high = bounds["min"].as_py(), bounds["max"].as_py()
+            if low is None:
+                continue
+            seen = self._integer_ranges.get(field.name, (low, high))
+            self._integer_ranges[field.name] = (min(seen[0], low), max(seen[1], high))
+
+    def _float_safe(self, name: str) -> bool:
+        """已寫出的整數欄位能否精確轉為 float64（絕對值不超過 2**53）"""
+        low, high = self._integer_ranges.get(name, (0, 0))
+        return -FLOAT_EXACT_LIMIT <= low and high <= FLOAT_EXACT_LIMIT
+
+    @staticmethod
+    def _fits(column, target) -> bool:
+        """欄位能否不損失內容地轉為 target 型別"""
+        import pyarrow as pa
+
+        if column.type == target or pa.types.is_null(column.type):
+            return True
+        integer = pa.types.is_integer(column.type)
+        if not ((pa.types.is_floating(target) and (integer or pa.types.is_floating(column.type)))
+                or (pa.types.is_integer(target) and integer)):
+            # 只允許數值放寬，文字不自動解析為數字（避免 "007" 變成 7）
+            return False
+        try:
+            column.cast(target)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return False
+        return True
+
+    def _fit_schema(self, table):
+        """將一批資料轉為目前的欄位型別，無法轉換時返回 None"""
+        if not all(self._fits(table.column(field.name), field.type) for field in self._schema):
+            return None
+        return table.cast(self._schema)
+
+    def _unify_schema(self, table):
+        """
+        合併目前的欄位型別與新一批資料的型別：兩者都是數值且整數都能精確轉為 float64 時改為 float64，
+        其餘改為字串；已寫出的資料逐個 row group 轉為新型別寫到新的暫存檔，記憶體用量仍只與單批大小有關
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        fields, changed = [], {}
+        for field in self._schema:
+            column = table.column(field.name)
+            if self._fits(column, field.type):
+                fields.append(field)
+                continue
+            numeric = all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in (field.type, column.type))
+            if numeric and self._float_safe(field.name) and self._fits(column, pa.float64()):
+                target = pa.float64()
+            else:
+                target = pa.string()
+            if pa.types.is_integer(field.type):
+                self._integer_columns.add(field.name)
+            changed[field.name] = target
+            fields.append(field.with_type(target))
+        self._schema = pa.schema(fields)
+        for name in changed:
+            self._integer_ranges.pop(name, None)
+
+        previous = self._parquet_temp
+        self._parquet.close()
+        self._open_parquet()
+        source = pq.ParquetFile(previous)
+        try:
+            for i in range(source.num_row_groups):
+                group = source.read_row_group(i)
+                for name, target in changed.items():
+                    position = group.schema.get_field_index(name)
+                    column = group.column(name)
+                    if target == pa.string() and not pa.types.is_integer(column.type):
+                        # 浮點數與類別以 pandas 轉為字串，與之後批次的轉換方式相同
+                        values = _text_values(column.to_pandas(), name in self._integer_columns)
+                        column = pa.array(values, type=pa.string(), from_pandas=True)
+                    else:
+                        # 整數直接由 Arrow 轉換，大整數不經過 float64
+                        column = column.cast(target)
+                    group = group.set_column(position, self._schema.field(name), column)
+                self._parquet.write_table(group.cast(self._schema))
+        finally:
+            source.close()
+            os.remove(previous)
+
+    def _open_parquet(self):
+        """在輸出資料夾開啟新的暫存檔寫出，結束時才更名為輸出檔案（型別放寬時需要重寫）"""
+        import pyarrow.parquet as pq
+
+        fd, self._parquet_temp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".parquet")
+        os.close(fd)
+        self._parquet = pq.ParquetWriter(self._parquet_temp, self._schema)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # 寫到一半失敗或被取消：關閉並刪除未完成的檔案，不儲存 Excel
+            if self._parquet is not None:
+                self._parquet.close()
+                os.remove(self._parquet_temp)
+            elif self.format == "csv" and self._header_written and os.path.exists(self.path):
+                os.remove(self.path)
+            elif self._sheet is not None:
+                # 結束 openpyxl 的暫存工作表，但不寫出活頁簿
+                self._sheet.close()
+            return False
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+        elif self._parquet is not None:
+            self._parquet.close()
+            os.replace(self._parquet_temp, self.path)
+        elif not self._header_written:
+            # 沒有任何資料時仍建立空白檔案
+            open(self.path, 'w', encoding='utf-8-sig').close()
+        return False
+
+
+def match_output_paths(file_main: str, file_clear: str,
+                       fmt: str = DEFAULT_FORMAT) -> Tuple[str, str, str]:
+    """
+    計算比對結果的輸出位置
+    結果放在清理檔所在資料夾的「比對結果」子資料夾，以主檔名稱命名，副檔名依輸出格式決定
+
+    返回：
+        (輸出資料夾, 比對結果檔案, 未匹配檔案)
+    """
+    output_dir = os.path.join(os.path.dirname(file_clear), MATCH_OUTPUT_DIRNAME)
+    base_name = os.path.splitext(os.path.basename(file_main))[0]
+    suffix = OUTPUT_FORMATS[fmt]["suffix"]
+    result_file = os.path.join(output_dir, f"{base_name}_比對結果{suffix}")
+    unmatched_file = os.path.join(output_dir, f"{base_name}_未匹配{suffix}")
+    return output_dir, result_file, unmatched_file
+
+
+def write_match_results(df_result: pd.DataFrame, df_unmatched: pd.DataFrame,
+                        file_main: str, file_clear: str, fmt: str = DEFAULT_FORMAT,
+                        progress: Optional[ProgressCallback] = None) -> str:
+    """
+    寫出比對結果與未匹配資料
+
+    參數：
+        df_result: 比對結果
+        df_unmatched: 清理檔中未出現在主檔的資料
+        file_main: 主檔路徑
+        file_clear: 清理檔路徑
+        fmt: 輸出格式（xlsx / csv / parquet）
+        progress: 寫出進度回呼（每個檔案一個階段）
+
+    返回：
+        輸出資料夾路徑
+    """
+    output_dir, result_file, unmatched_file = match_output_paths(file_main, file_clear, fmt)
+    os.makedirs(output_dir, exist_ok=True)
+    # 儲存完整的比對結果
+    write_table(df_result, result_file, progress=progress)
+    # 儲存清理檔中未出現在主檔的記錄
+    write_table(df_unmatched, unmatched_file, progress=progress)
+    return output_dir
+
+
+def write_summary_html(summary: Dict, path: str) -> str:
+    """
+    將比對摘要寫成簡單的 HTML 報告
+
+    參數：
+        summary: 摘要項目（名稱 → 數值）
+        path: 輸出檔案路徑
+
+    返回：
+        輸出檔案路徑
+    """
+    rows = "\n".join(
+        f"    <tr><th>{html.escape(str(k))}</th><td>{html.escape(str(v))}</td></tr>"
+        for k, v in summary.items()
+    )
+    content = f"""<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+  <meta charset="utf-8">
+  <title>比對總結報告</title>
+  <style>
+    body {{ font-family: sans-serif; margin: 2em; }}
+    table {{ border-collapse: collapse; }}
+    th, td {{ border: 1px solid #ccc; padding: 4px 12px; text-align: left; }}
+    th {{ background: #f4f4f4; }}
+  </style>
+</head>
+<body>
+  <h1>比對總結報告</h1>
+  <p>產生時間：{datetime.now():%Y-%m-%d %H:%M:%S}</p>
+  <table>
+{rows}
+  </table>
+</body>
+</html>
+"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
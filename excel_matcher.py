@@ -2,20 +2,25 @@
 # 功能：提供兩個 Excel 檔案之間的資料比對功能，類似 VLOOKUP 但更強大
 # 支援精確比對和模糊比對，可處理文字清理和相似度計算
 
-import pandas as pd  # 用於資料處理和分析
-import re  # 用於正則表達式處理
-import os  # 用於檔案路徑操作
 from datetime import datetime  # 用於時間處理
 # 導入 PyQt5 的 GUI 元件
 from PyQt5.QtWidgets import (
-    QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QTableWidget,
-    QTableWidgetItem, QFileDialog, QComboBox, QMessageBox,
-    QCheckBox, QSpinBox, QLineEdit
+    QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QTableView,
+    QFileDialog, QListWidget, QAbstractItemView, QMessageBox,
+    QCheckBox, QSpinBox, QLineEdit, QComboBox
 )
-from PyQt5.QtGui import QColor  # 用於設定顏色
-# 導入模糊比對相關功能
-from rapidfuzz import process, fuzz
-import numpy as np  # 用於數值運算
+# 導入不依賴 GUI 的核心功能
+from dptools.cache import CACHE_DIR, default_cache
+from dptools.cleaning import clean_text
+from dptools.compact import compact_frame
+from dptools.incremental import incremental_state_path, match_incremental
+from dptools.matching import FUZZY_FLAG_COL, match_dataframes
+from dptools.readers import probe_file, read_table
+from dptools.writers import available_formats, write_match_results
+# 只繪製看得到的儲存格的預覽表格模型
+from dataframe_model import DataFrameModel
+# 背景執行比對工作的進度列
+from background_worker import JobProgress
 
 class ExcelMatcherApp(QWidget):
     """
@@ -28,8 +33,10 @@ class ExcelMatcherApp(QWidget):
         # === 初始化成員變數 ===
         self.file_main = ""        # 主檔案路徑（通常是商品排行榜）
         self.file_clear = ""       # 清理檔案路徑（已經清理過的資料）
-        self.df_main = None        # 主檔案的資料框架
-        self.df_clear = None       # 清理檔案的資料框架
+        self.df_main = None        # 主檔案的資料框架（執行比對時才完整讀取）
+        self.df_clear = None       # 清理檔案的資料框架（執行比對時才完整讀取）
+        self.probe_main = None     # 主檔案的探測結果（欄位名稱與估計列數）
+        self.probe_clear = None    # 清理檔案的探測結果
         self.initUI()  # 初始化使用者介面
 
     def initUI(self):
@@ -60,10 +67,10 @@ class ExcelMatcherApp(QWidget):
         layout.addLayout(main_file_layout)
 
         # 主檔案比對欄位選擇
-        layout.addWidget(QLabel("選擇主檔比對欄位 (將用於與清理檔比對):"))
-        self.combo_main = QComboBox()
-        self.combo_main.setToolTip("選擇主檔中要用來比對的欄位，通常是商品名稱或編號")
-        layout.addWidget(self.combo_main)
+        layout.addWidget(QLabel("選擇主檔比對欄位 (可複選，將用於與清理檔比對):"))
+        self.list_main = self.create_key_list()
+        self.list_main.setToolTip("選擇主檔中要用來比對的欄位，可複選多個欄位組成複合鍵值（如身分證字號＋電話）")
+        layout.addWidget(self.list_main)
 
         # === 清理檔案選擇區域 ===
         clear_file_layout = QHBoxLayout()
@@ -81,10 +88,10 @@ class ExcelMatcherApp(QWidget):
         layout.addLayout(clear_file_layout)
 
         # 清理檔案比對欄位選擇
-        layout.addWidget(QLabel("選擇清理檔比對欄位 (將與主檔欄位進行比對):"))
-        self.combo_clear = QComboBox()
-        self.combo_clear.setToolTip("選擇清理檔中要用來比對的欄位，通常是商品名稱或編號")
-        layout.addWidget(self.combo_clear)
+        layout.addWidget(QLabel("選擇清理檔比對欄位 (可複選，依欄位順序與主檔欄位對應):"))
+        self.list_clear = self.create_key_list()
+        self.list_clear.setToolTip("選擇清理檔中要用來比對的欄位，數量需與主檔相同，依欄位順序一一對應")
+        layout.addWidget(self.list_clear)
 
         # === 比對設定區域 ===
         # 模糊比對開關
@@ -96,25 +103,101 @@ class ExcelMatcherApp(QWidget):
         self.threshold_spinner.setRange(0, 100)  # 設定範圍 0-100
         self.threshold_spinner.setValue(85)  # 預設值 85%
 
+        # N-gram 候選篩選開關：大型名單時只對共用字元片段的候選計算相似度
+        self.blocking_checkbox = QCheckBox("啟用 N-gram 候選篩選（大型名單加速）")
+        self.blocking_checkbox.setChecked(False)  # 預設關閉
+        self.blocking_checkbox.setToolTip("需要共用的片段數依相似度門檻自動推算，結果與完整比對相同；"
+                                          "篩選不了多少時自動改用完整比對")
+
+        # 額外要求至少共用幾個字元片段：1 表示只用門檻推算的下限（不漏配），數值越大越快但可能漏配
+        self.min_shared_spinner = QSpinBox()
+        self.min_shared_spinner.setRange(1, 10)
+        self.min_shared_spinner.setValue(1)  # 預設 1
+
+        # 結果檔案格式：大型結果可改用 CSV 或 Parquet，寫出速度較快
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(available_formats())
+        self.format_combo.setToolTip("xlsx 可直接以 Excel 開啟；csv 與 parquet（需安裝 pyarrow）寫出較快、檔案較小")
+
+        # 讀取快取：同一個大型主檔搭配不同清理檔重複比對時，直接載入上次解析的結果
+        self.cache_checkbox = QCheckBox("使用讀取快取（相同檔案不重新解析）")
+        self.cache_checkbox.setChecked(True)
+        self.cache_checkbox.setToolTip(f"快取位於 {CACHE_DIR}，檔案內容改變時自動失效")
+
+        # 增量比對：主檔每天只變動少數列時，只重新比對新增或變更的列
+        self.incremental_checkbox = QCheckBox("增量比對（沿用上次結果，只重新比對新增或變更的列）")
+        self.incremental_checkbox.setChecked(False)
+        self.incremental_checkbox.setToolTip("比對狀態保存在「比對結果」資料夾；清理檔或比對設定改變時自動完整比對")
+
+        # 精簡記憶體：大型檔案讀入後改用類別、Arrow 字串與較小的數值型別，比對結果不變
+        self.compact_checkbox = QCheckBox("精簡記憶體（大型檔案讀入後改用較省記憶體的欄位型別）")
+        self.compact_checkbox.setChecked(False)
+        self.compact_checkbox.setToolTip("重複值多的文字欄位改為類別，其餘文字欄位改為 Arrow 字串（需安裝 pyarrow），數值欄位在不損失精度時縮小")
+
         # === 執行按鈕 ===
         self.btn_match = QPushButton("執行比對")
         self.btn_match.setToolTip("開始進行主檔與清理檔的欄位比對，並產生結果預覽與檔案")
         self.btn_match.clicked.connect(self.run_matching)
 
+        # === 背景工作進度 ===
+        # 比對期間停用檔案選擇與執行按鈕，其他分頁仍可正常使用
+        self.job_progress = JobProgress([self.btn_select_main, self.btn_select_clear, self.btn_match])
+
         # === 結果預覽表格 ===
-        self.table_preview = QTableWidget()
+        # 模糊比對的列以黃色底色標示
+        self.preview_model = DataFrameModel(highlight_col=FUZZY_FLAG_COL, highlight_color="yellow")
+        self.table_preview = QTableView()
+        self.table_preview.setModel(self.preview_model)
 
         # 將所有元件加入到佈局中
         layout.addWidget(self.fuzzy_checkbox)
         layout.addWidget(QLabel("相似度門檻:"))
         layout.addWidget(self.threshold_spinner)
+        layout.addWidget(self.blocking_checkbox)
+        layout.addWidget(QLabel("候選篩選至少共用片段數:"))
+        layout.addWidget(self.min_shared_spinner)
+        layout.addWidget(QLabel("結果檔案格式:"))
+        layout.addWidget(self.format_combo)
+        layout.addWidget(self.cache_checkbox)
+        layout.addWidget(self.incremental_checkbox)
+        layout.addWidget(self.compact_checkbox)
         layout.addWidget(self.btn_match)
+        layout.addWidget(self.job_progress)
         layout.addWidget(QLabel("比對結果預覽:"))
         layout.addWidget(self.table_preview)
 
         # 設定佈局
         self.setLayout(layout)
 
+    def create_key_list(self):
+        """
+        建立可複選的比對欄位清單
+        """
+        key_list = QListWidget()
+        key_list.setSelectionMode(QAbstractItemView.MultiSelection)  # 允許複選多個欄位
+        key_list.setMaximumHeight(100)
+        return key_list
+
+    def fill_key_list(self, key_list, probe):
+        """
+        以探測到的欄位名稱重新填充比對欄位清單，預設選取第一個欄位
+        """
+        key_list.clear()
+        key_list.addItems([str(col) for col in probe.headers])
+        if key_list.count() > 0:
+            key_list.item(0).setSelected(True)
+        # 滑鼠停在清單上時顯示估計的資料筆數
+        if probe.row_count is not None:
+            prefix = "" if probe.row_count_exact else "約 "
+            key_list.setToolTip(f"{prefix}{probe.row_count:,} 筆資料")
+
+    def selected_keys(self, key_list, probe):
+        """
+        取得清單中選取的欄位名稱，依欄位在檔案中的順序排列
+        """
+        rows = sorted(key_list.row(item) for item in key_list.selectedItems())
+        return [probe.headers[row] for row in rows]
+
     def select_main_file(self):
         """
         選擇主檔案方法
@@ -127,19 +210,20 @@ class ExcelMatcherApp(QWidget):
                 self.file_main = file_name
                 self.main_file_path.setText(file_name)
                 
-                # 讀取 Excel 檔案
-                self.df_main = pd.read_excel(file_name)
+                # 只探測欄位名稱，完整讀取留到執行比對時
+                self.probe_main = probe_file(file_name)
+                self.df_main = None
                 
                 # 清空並重新填充欄位選擇下拉選單
-                self.combo_main.clear()
-                self.combo_main.addItems([str(col) for col in self.df_main.columns])
+                self.fill_key_list(self.list_main, self.probe_main)
                 
             except Exception as e:
                 # 錯誤處理：顯示讀取失敗的詳細訊息
                 QMessageBox.critical(self, "錯誤", f"讀取主檔案失敗:\n{str(e)}")
                 # 重置相關變數
                 self.df_main = None
-                self.combo_main.clear()
+                self.probe_main = None
+                self.list_main.clear()
                 self.main_file_path.setText("")
 
     def select_clear_file(self):
@@ -154,19 +238,20 @@ class ExcelMatcherApp(QWidget):
                 self.file_clear = file_name
                 self.clear_file_path.setText(file_name)
                 
-                # 讀取 Excel 檔案
-                self.df_clear = pd.read_excel(file_name)
+                # 只探測欄位名稱，完整讀取留到執行比對時
+                self.probe_clear = probe_file(file_name)
+                self.df_clear = None
                 
                 # 清空並重新填充欄位選擇下拉選單
-                self.combo_clear.clear()
-                self.combo_clear.addItems([str(col) for col in self.df_clear.columns])
+                self.fill_key_list(self.list_clear, self.probe_clear)
                 
             except Exception as e:
                 # 錯誤處理：顯示讀取失敗的詳細訊息
                 QMessageBox.critical(self, "錯誤", f"讀取清理檔案失敗:\n{str(e)}")
                 # 重置相關變數
                 self.df_clear = None
-                self.combo_clear.clear()
+                self.probe_clear = None
+                self.list_clear.clear()
                 self.clear_file_path.setText("")
 
     def clean_text(self, text):
@@ -181,10 +266,7 @@ class ExcelMatcherApp(QWidget):
         返回：
             清理後的文字字串
         """
-        if pd.isna(text):  # 檢查是否為空值
-            return ""
-        # 移除空白字元、全形空格，並轉為小寫
-        return re.sub(r'\s+|\u3000', '', str(text).strip().lower())
+        return clean_text(text)
 
     def run_matching(self):
         """
@@ -192,178 +274,131 @@ class ExcelMatcherApp(QWidget):
         主要的比對邏輯，包含精確比對和模糊比對兩種模式
         """
         # 檢查是否已選擇兩個檔案
-        if not self.file_main or not self.file_clear or self.df_main is None or self.df_clear is None:
+        if not self.file_main or not self.file_clear or self.probe_main is None or self.probe_clear is None:
             QMessageBox.warning(self, "錯誤", "請先選擇兩個 Excel 檔案！")
             return
 
-        try:
-            # 獲取選擇的比對欄位
-            main_key = self.combo_main.currentText()
-            clear_key = self.combo_clear.currentText()
-
-            # 驗證欄位是否存在
-            if main_key not in self.df_main.columns or clear_key not in self.df_clear.columns:
-                QMessageBox.warning(self, "錯誤", "請選擇正確的比對欄位！")
-                return
-
-            # 複製資料框架以避免修改原始資料
-            df_main = self.df_main.copy()
-            df_clear = self.df_clear.copy()
+        # 獲取選擇的比對欄位
+        main_key = self.selected_keys(self.list_main, self.probe_main)
+        clear_key = self.selected_keys(self.list_clear, self.probe_clear)
 
-            # 為兩個資料框架添加清理後的比對鍵值欄位
-            df_main['__clean_key__'] = df_main[main_key].apply(self.clean_text)
-            df_clear['__clean_key__'] = df_clear[clear_key].apply(self.clean_text)
+        # 驗證兩邊的欄位數量是否一致
+        if not main_key or len(main_key) != len(clear_key):
+            QMessageBox.warning(self, "錯誤", "請選擇正確的比對欄位！兩邊選擇的欄位數量需相同")
+            return
 
-            # 獲取比對設定
-            use_fuzzy = self.fuzzy_checkbox.isChecked()  # 是否啟用模糊比對
-            threshold = self.threshold_spinner.value()    # 相似度門檻
+        # 獲取比對設定
+        use_fuzzy = self.fuzzy_checkbox.isChecked()  # 是否啟用模糊比對
+        threshold = self.threshold_spinner.value()    # 相似度門檻
+        # 候選篩選門檻，0 表示不篩選
+        min_shared = self.min_shared_spinner.value() if self.blocking_checkbox.isChecked() else 0
+        output_format = self.format_combo.currentText()  # 結果檔案格式
+        cache = default_cache() if self.cache_checkbox.isChecked() else None  # 讀取快取
+        incremental = self.incremental_checkbox.isChecked()  # 是否增量比對
+        compact = self.compact_checkbox.isChecked()  # 是否精簡記憶體
+
+        # 背景工作只使用這裡取出的設定，不讀取介面元件
+        file_main, file_clear = self.file_main, self.file_clear
+        df_main, df_clear = self.df_main, self.df_clear
+
+        def job(progress):
+            # 第一次比對時才完整讀取檔案，之後重新比對沿用已讀取的資料
+            frames = [df_main, df_clear]
+            for i, path in enumerate((file_main, file_clear)):
+                if frames[i] is None:
+                    frames[i] = read_table(path, cache=cache, progress=progress)
+                if compact and "compact" not in frames[i].attrs:
+                    # 已讀取的資料也一併精簡，精簡過的資料框架不再重複轉換
+                    progress("精簡記憶體", 0, len(frames[i]))
+                    frames[i] = compact_frame(frames[i])
+                    progress("精簡記憶體", len(frames[i]), len(frames[i]))
+
+            # 交由比對引擎一次完成精確比對與模糊比對；增量比對只重新比對變動的主檔列
+            if incremental:
+                df_result, df_unmatched = match_incremental(
+                    frames[0], frames[1], main_key, clear_key,
+                    incremental_state_path(file_main, file_clear),
+                    use_fuzzy=use_fuzzy, threshold=threshold, block_min_shared=min_shared,
+                    progress=progress
+                )
+            else:
+                df_result, df_unmatched = match_dataframes(
+                    frames[0], frames[1], main_key, clear_key,
+                    use_fuzzy=use_fuzzy, threshold=threshold, block_min_shared=min_shared,
+                    progress=progress
+                )
 
-            # 初始化結果儲存變數
-            matched_rows = []  # 儲存比對成功的行
-            fuzzy_flags = []   # 儲存是否為模糊比對的標記
+            # === 儲存結果檔案 ===
+            output_dir = write_match_results(df_result, df_unmatched, file_main, file_clear, output_format,
+                                             progress=progress)
+            return frames, df_result, df_unmatched, output_dir
 
-            # 獲取清理檔的比對鍵值列表和集合（用於加速查詢）
-            clear_keys = df_clear['__clean_key__'].tolist()
-            clear_key_set = set(clear_keys)
+        self.job_progress.start(job, self.matching_finished, self.matching_failed, stage="讀取檔案")
 
-            # === 主要的比對迴圈 ===
-            for idx, row in df_main.iterrows():
-                val = row['__clean_key__']
-                
-                # 處理複雜的資料類型（如 Series、list、tuple）
-                if isinstance(val, (pd.Series, list, tuple)):
-                    v = val[0] if len(val) > 0 else ""
-                    is_na = pd.isna(v)
-                    if not isinstance(is_na, (bool, np.bool_)):
-                        is_na = np.all(is_na)
-                    key_main = str(v) if not is_na else ""
-                else:
-                    is_na = pd.isna(val)
-                    if not isinstance(is_na, (bool, np.bool_)):
-                        is_na = np.all(is_na)
-                    key_main = str(val) if not is_na else ""
-
-                # === 比對邏輯 ===
-                # 1. 精確比對：使用 pandas 的 mask 進行快速比對
-                mask = df_clear['__clean_key__'] == key_main
-                is_match = mask.sum() > 0
-                
-                if is_match:
-                    # 找到精確匹配，取第一筆結果
-                    exact_match = df_clear[mask]
-                    matched_rows.append(exact_match.iloc[0].to_dict())
-                    fuzzy_flags.append(False)  # 標記為精確比對
-                    
-                elif key_main in clear_key_set:
-                    # 在集合中找到匹配（備用檢查）
-                    matched_rows.append({col: None for col in df_clear.columns})
-                    fuzzy_flags.append(False)
-                    
-                elif use_fuzzy and len(clear_keys) > 0:
-                    # 2. 模糊比對：使用 rapidfuzz 進行相似度計算
-                    # process.extractOne 需要傳入 list[str] 格式
-                    match_result = process.extractOne(key_main, list(map(str, clear_keys)), scorer=fuzz.ratio)
-                    
-                    if match_result is not None:
-                        match, score, match_idx = match_result
-                        
-                        if score >= threshold:
-                            # 相似度達到門檻，記錄匹配結果
-                            matched_rows.append(df_clear.iloc[match_idx].to_dict())
-                            fuzzy_flags.append(True)  # 標記為模糊比對
-                        else:
-                            # 相似度未達門檻，記錄為無匹配
-                            matched_rows.append({col: None for col in df_clear.columns})
-                            fuzzy_flags.append(False)
-                    else:
-                        # 模糊比對失敗，記錄為無匹配
-                        matched_rows.append({col: None for col in df_clear.columns})
-                        fuzzy_flags.append(False)
-                else:
-                    # 無匹配且未啟用模糊比對，記錄為無匹配
-                    matched_rows.append({col: None for col in df_clear.columns})
-                    fuzzy_flags.append(False)
-
-            # === 建立結果資料框架 ===
-            # 確保 main_key 是單一欄位名稱，並重新命名為 "KEY"
-            main_col = df_main[[main_key]].copy()
-            main_col.columns = ["KEY"]
-            
-            # 將主檔的比對欄位和清理檔的匹配結果合併
-            df_result = pd.concat([
-                main_col.reset_index(drop=True),
-                pd.DataFrame(matched_rows).reset_index(drop=True)
-            ], axis=1)
-            
-            # 添加模糊比對標記欄位
-            df_result["是否模糊比對"] = fuzzy_flags
-
-            # === 建立結果儲存資料夾 ===
-            output_dir = os.path.join(os.path.dirname(self.file_clear), "比對結果")
-            os.makedirs(output_dir, exist_ok=True)
-
-            # === 設定檔案名稱 ===
-            base_name = os.path.splitext(os.path.basename(self.file_main))[0]
-            result_file = os.path.join(output_dir, f"{base_name}_比對結果.xlsx")
-            unmatched_file = os.path.join(output_dir, f"{base_name}_未匹配.xlsx")
-
-            # === 儲存結果檔案 ===
-            # 儲存完整的比對結果
-            df_result.to_excel(result_file, index=False)
-
-            # 找出未匹配的記錄（在清理檔中但不在主檔中的記錄）
-            unmatched_mask = ~df_clear['__clean_key__'].isin(df_main['__clean_key__'])
-            df_unmatched = df_clear[unmatched_mask].drop(columns=['__clean_key__'])
-            df_unmatched.to_excel(unmatched_file, index=False)
-
-            # === 顯示預覽和結果 ===
-            # 在表格中預覽前 10 筆結果
-            self.preview_result(df_result)
-
-            # 顯示成功訊息和統計資訊
-            QMessageBox.information(
-                self,
-                "成功",
-                f"比對完成！\n結果已儲存於：\n{output_dir}\n\n未匹配筆數: {df_unmatched.shape[0]}"
+    def matching_finished(self, result):
+        """
+        比對完成後在主執行緒更新介面
+        """
+        frames, df_result, df_unmatched, output_dir = result
+        # 保留讀取的資料供下次比對使用（比對期間檔案選擇按鈕已停用，檔案不會被更換）
+        self.df_main, self.df_clear = frames
+
+        # === 顯示預覽和結果 ===
+        # 在表格中預覽比對結果
+        self.preview_result(df_result)
+
+        # 顯示成功訊息和統計資訊
+        message = f"比對完成！\n結果已儲存於：\n{output_dir}\n\n未匹配筆數: {df_unmatched.shape[0]}"
+        counts = df_result.attrs.get("counts")
+        if counts:
+            message += (
+                f"\n完全匹配 {counts['完全匹配筆數']} 筆，模糊匹配 {counts['模糊匹配筆數']} 筆"
+                f"，主檔未匹配 {counts['僅左筆數']} 筆"
+            )
+        delta = df_result.attrs.get("incremental")
+        if delta:
+            if delta["沿用上次結果"]:
+                message += (
+                    f"\n\n增量比對：沿用 {delta['沿用筆數']} 筆，重新比對 {delta['重新比對筆數']} 筆"
+                    f"，上次的鍵值有 {delta['舊鍵值消失筆數']} 筆已不存在（刪除或鍵值已修改）"
+                )
+            else:
+                message += "\n\n增量比對：清理檔或比對設定已改變（或第一次比對），已完整比對並保存狀態"
+        savings = [frame.attrs["compact"] for frame in frames if "compact" in frame.attrs]
+        if savings:
+            before = sum(saving["原始 MB"] for saving in savings)
+            after = sum(saving["精簡後 MB"] for saving in savings)
+            message += f"\n\n精簡記憶體：{before:,.1f} MB → {after:,.1f} MB"
+            if before > 0:
+                message += f"（節省 {1 - after / before:.1%}）"
+        blocking = df_result.attrs.get("blocking")
+        if blocking and blocking["改用完整比對"]:
+            message += "\n\n候選篩選：估計篩除不了多少配對，已改用完整比對"
+        elif blocking:
+            message += (
+                f"\n\n候選篩選：計算 {blocking['候選配對數']} / {blocking['完整配對數']} 組配對"
+                f"（篩除 {blocking['篩除比例']:.1%}）"
             )
+            if blocking["抽樣召回率"] is not None:
+                message += f"\n抽樣召回率: {blocking['抽樣召回率']:.1%}"
+        QMessageBox.information(self, "成功", message)
 
-        except Exception as e:
-            # 錯誤處理：顯示詳細的錯誤訊息和堆疊追蹤
-            import traceback
-            QMessageBox.critical(self, "錯誤", f"執行過程發生錯誤:\n{str(e)}\n{traceback.format_exc()}")
+    def matching_failed(self, error, details):
+        """
+        錯誤處理：顯示詳細的錯誤訊息和堆疊追蹤
+        """
+        QMessageBox.critical(self, "錯誤", f"執行過程發生錯誤:\n{str(error)}\n{details}")
 
     def preview_result(self, df):
         """
         結果預覽方法
-        在表格中顯示比對結果的前 10 筆，並用顏色標示模糊比對的結果
+        在表格中顯示比對結果，並用顏色標示模糊比對的結果
+        表格只繪製畫面上看得到的列，結果再多也不會拖慢介面
         
         參數：
             df: 要預覽的結果資料框架
         """
-        # 取前 10 筆資料進行預覽
-        preview_df = df.head(10)
-        
-        # 設定表格的行數和列數
-        self.table_preview.setRowCount(len(preview_df))
-        self.table_preview.setColumnCount(len(preview_df.columns))
-        # 設定表格標題
-        self.table_preview.setHorizontalHeaderLabels([str(col) for col in preview_df.columns])
-
-        # 填充表格資料
-        for row in range(len(preview_df)):
-            # 檢查該行是否為模糊比對
-            is_fuzzy = preview_df.at[row, "是否模糊比對"]
-            
-            for col in range(len(preview_df.columns)):
-                # 建立表格項目
-                item = QTableWidgetItem(str(preview_df.iat[row, col]))
-                
-                # 如果是模糊比對且不是標記欄位，用黃色背景標示
-                if is_fuzzy and preview_df.columns[col] != "是否模糊比對":
-                    item.setBackground(QColor("yellow"))  # 用底色標示模糊比對
-                
-                # 將項目加入到表格中
-                self.table_preview.setItem(row, col, item)
+        self.preview_model.set_dataframe(df)
         
-        # 自動調整欄寬以適應內容
+        # 自動調整欄寬以適應內容（只參考畫面上的列）
         self.table_preview.resizeColumnsToContents()
@@ -2,11 +2,21 @@
 # 功能：提供 Excel 和 CSV 檔案的讀取、清理和轉換功能
 # 支援多種檔案格式和編碼，可自定義欄位選擇和跳過行數
 
-import pandas as pd  # 用於資料處理和分析
-import chardet  # 用於自動偵測檔案編碼
 # 導入 PyQt5 的 GUI 元件
-from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QMessageBox
+from PyQt5.QtWidgets import QTableView, QMessageBox
 from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QComboBox, QSpinBox, QLineEdit, QPushButton, QFileDialog, QLabel, QWidget
+import os
+import pandas as pd
+# 導入不依賴 GUI 的核心功能
+from dptools.batch import run_batch
+from dptools.cleaning import parse_columns
+from dptools.presets import VENDOR_PRESETS
+from dptools.readers import read_table
+from dptools.writers import dialog_filter, filter_format, write_table
+# 只繪製看得到的儲存格的預覽表格模型
+from dataframe_model import DataFrameModel
+# 背景執行讀取與儲存工作的進度列
+from background_worker import JobProgress
 
 class ExcelProcessor(QWidget):
     """
@@ -36,6 +46,12 @@ class ExcelProcessor(QWidget):
         self.file_path_edit.setReadOnly(True)  # 設為唯讀，防止手動編輯
         self.file_path_edit.setPlaceholderText("請選擇要讀取的檔案")
         file_select_layout.addWidget(self.file_path_edit)
+
+        # 批次處理按鈕：整個資料夾的廠商檔案依檔名自動套用預設設定
+        self.batch_button = QPushButton('批次處理資料夾', self)
+        self.batch_button.setToolTip('依檔名中的廠商名稱套用預設設定，平行處理資料夾中的所有檔案')
+        self.batch_button.clicked.connect(self.process_batch)
+        file_select_layout.addWidget(self.batch_button)
         layout.addLayout(file_select_layout)
 
         # === 檔案類型選擇區域 ===
@@ -86,7 +102,9 @@ class ExcelProcessor(QWidget):
         layout.addWidget(self.process_button)
 
         # === 預覽表格 ===
-        self.preview_table = QTableWidget()
+        self.preview_model = DataFrameModel()
+        self.preview_table = QTableView()
+        self.preview_table.setModel(self.preview_model)
         layout.addWidget(self.preview_table)
 
         # === 儲存按鈕 ===
@@ -96,6 +114,12 @@ class ExcelProcessor(QWidget):
         self.save_button.setEnabled(False)  # 初始狀態為禁用，需要先處理資料
         layout.addWidget(self.save_button)
 
+        # === 背景工作進度 ===
+        # 讀取或儲存期間停用操作按鈕，其他分頁仍可正常使用
+        self.job_progress = JobProgress([self.select_button, self.batch_button,
+                                         self.process_button, self.save_button])
+        layout.addWidget(self.job_progress)
+
         # 設定佈局
         self.setLayout(layout)
 
@@ -106,16 +130,7 @@ class ExcelProcessor(QWidget):
 
         # === 預設檔案處理設定 ===
         # 針對不同類型的檔案，預先設定好跳過行數和要保留的欄位
-        self.file_settings = {
-            "香連": {"skiprows": 17, "columns": [0, 1, 3]},      # 香連檔案：跳過 17 行，保留第 0、1、3 欄
-            "甘妹": {"skiprows": 7, "columns": [2, 3]},          # 甘妹檔案：跳過 7 行，保留第 2、3 欄
-            "周照子": {"skiprows": 7, "columns": [2, 3]},        # 周照子檔案：跳過 7 行，保留第 2、3 欄
-            "炎弟": {"skiprows": 7, "columns": [2, 3]},          # 炎弟檔案：跳過 7 行，保留第 2、3 欄
-            "威宇": {"skiprows": 7, "columns": [2, 3]},          # 威宇檔案：跳過 7 行，保留第 2、3 欄
-            "麻煮": {"skiprows": 7, "columns": [2, 3]},          # 麻煮檔案：跳過 7 行，保留第 2、3 欄
-            "小旺號": {"skiprows": 8, "columns": [2, 3, 6]},     # 小旺號檔案：跳過 8 行，保留第 2、3、6 欄
-            "扶旺號": {"skiprows": 10, "columns": [1, 5]}        # 扶旺號檔案：跳過 10 行，保留第 1、5 欄
-        }
+        self.file_settings = VENDOR_PRESETS
 
     def select_file(self):
         """
@@ -169,7 +184,7 @@ class ExcelProcessor(QWidget):
         
         # 解析欄位選擇設定
         try:
-            columns = list(map(int, self.columns_input.text().split(',')))
+            columns = parse_columns(self.columns_input.text())
         except ValueError:
             QMessageBox.warning(self, "錯誤", "欄位輸入錯誤，請輸入數字並用逗號分隔！")
             return
@@ -178,31 +193,57 @@ class ExcelProcessor(QWidget):
         selected_encoding = self.encoding_combo.currentText()
         encoding = None if selected_encoding == "自動偵測" else selected_encoding
 
-        try:
-            # 根據檔案類型選擇不同的讀取方法
-            if self.input_file.endswith(".csv"):
-                # CSV 檔案處理
-                if encoding is None:
-                    # 如果選擇自動偵測編碼，使用 chardet 來偵測
-                    with open(self.input_file, 'rb') as f:
-                        encoding = chardet.detect(f.read())['encoding']
-                # 讀取 CSV 檔案
-                df = pd.read_csv(self.input_file, encoding=encoding, skiprows=skiprows)
-            else:
-                # Excel 檔案處理
-                df = pd.read_excel(self.input_file, skiprows=skiprows)
-            
-            # 根據使用者選擇的欄位來篩選資料
-            self.df_processed = df.iloc[:, columns]
-            
+        input_file = self.input_file
+
+        def job(progress):
+            # 讀取檔案並根據使用者選擇的欄位來篩選資料（CSV 自動偵測編碼）
+            return read_table(input_file, skiprows=skiprows, columns=columns, encoding=encoding,
+                              progress=progress)
+
+        def finished(df):
+            self.df_processed = df
             # 顯示處理結果預覽
             self.preview_result()
             # 啟用儲存按鈕
             self.save_button.setEnabled(True)
-            
-        except Exception as e:
+
+        def failed(error, details):
             # 錯誤處理：顯示詳細的錯誤訊息
-            QMessageBox.critical(self, "錯誤", f"處理檔案時發生錯誤：{e}")
+            QMessageBox.critical(self, "錯誤", f"處理檔案時發生錯誤：{error}")
+
+        self.job_progress.start(job, finished, failed, stage="讀取檔案")
+
+    def process_batch(self):
+        """
+        批次處理方法
+        選擇資料夾後，依檔名中的廠商名稱套用預設設定，以多個行程平行處理所有檔案，
+        結果寫到該資料夾的「批次處理」子資料夾，完成後在表格中顯示每個檔案的狀態與耗時
+        """
+        directory = QFileDialog.getExistingDirectory(self, "選擇要批次處理的資料夾")
+        if not directory:
+            return
+        output_dir = os.path.join(directory, "批次處理")
+        presets = self.file_settings
+
+        def job(progress):
+            return run_batch(directory, output_dir, presets=presets, progress=progress)
+
+        def finished(statuses):
+            # 表格改為顯示批次處理狀態，結果已寫出，不需要再儲存
+            self.df_processed = None
+            self.save_button.setEnabled(False)
+            self.preview_model.set_dataframe(pd.DataFrame(statuses))
+            self.preview_table.resizeColumnsToContents()
+            counts = {}
+            for status in statuses:
+                counts[status["狀態"]] = counts.get(status["狀態"], 0) + 1
+            summary = "、".join(f"{state} {count} 個" for state, count in counts.items()) or "沒有檔案"
+            QMessageBox.information(self, "批次處理完成", f"{summary}\n結果已儲存於: {output_dir}")
+
+        def failed(error, details):
+            QMessageBox.critical(self, "錯誤", f"批次處理時發生錯誤：{error}")
+
+        self.job_progress.start(job, finished, failed, stage="批次處理")
 
     def preview_result(self):
         """
@@ -214,32 +255,24 @@ class ExcelProcessor(QWidget):
             QMessageBox.warning(self, "錯誤", "尚未有可預覽的資料！")
             return
         
-        # 設定表格的行數和列數
-        self.preview_table.setRowCount(len(df))
-        self.preview_table.setColumnCount(len(df.columns))
-        # 設定表格標題
-        self.preview_table.setHorizontalHeaderLabels([str(col) for col in df.columns])
-
-        # 填充表格資料
-        for i in range(len(df)):
-            for j in range(len(df.columns)):
-                self.preview_table.setItem(i, j, QTableWidgetItem(str(df.iat[i, j])))
+        # 交給表格模型顯示，捲動時才讀取看得到的儲存格
+        self.preview_model.set_dataframe(df)
         
-        # 自動調整欄寬以適應內容
+        # 自動調整欄寬以適應內容（只參考畫面上的列）
         self.preview_table.resizeColumnsToContents()
 
     def save_file(self):
         """
         檔案儲存方法
-        將處理後的資料儲存為新的 Excel 檔案
+        將處理後的資料儲存為新的 Excel、CSV 或 Parquet 檔案
         """
         options = QFileDialog.Options()
         # 開啟儲存檔案對話框
-        self.output_file, _ = QFileDialog.getSaveFileName(
+        self.output_file, selected_filter = QFileDialog.getSaveFileName(
             self, 
             "儲存檔案", 
             "processed.xlsx", 
-            "Excel Files (*.xlsx)", 
+            dialog_filter(),  # Excel、CSV 與 Parquet（已安裝 pyarrow 時）
             options=options
         )
 
@@ -249,14 +282,19 @@ class ExcelProcessor(QWidget):
                 QMessageBox.warning(self, "錯誤", "沒有可儲存的資料！")
                 return
             
-            # 確保檔案副檔名為 .xlsx
-            if not self.output_file.endswith(".xlsx"):
-                self.output_file += ".xlsx"
-            
-            try:
-                # 將資料儲存為 Excel 檔案
-                self.df_processed.to_excel(self.output_file, index=False)
+            df, output_file = self.df_processed, self.output_file
+            fmt = filter_format(selected_filter)
+
+            def job(progress):
+                # 依副檔名或選取的檔案類型分批寫出（沒有副檔名時自動補上）
+                return write_table(df, output_file, fmt, progress=progress)
+
+            def finished(path):
+                self.output_file = path
                 QMessageBox.information(self, "成功", f"資料已儲存到: {self.output_file}")
-            except Exception as e:
+
+            def failed(error, details):
                 # 錯誤處理：顯示儲存失敗的詳細訊息
-                QMessageBox.critical(self, "錯誤", f"儲存檔案時發生錯誤：{e}")
+                QMessageBox.critical(self, "錯誤", f"儲存檔案時發生錯誤：{error}")
+
+            self.job_progress.start(job, finished, failed, stage="儲存檔案")
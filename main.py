@@ -12,6 +12,8 @@ from excel_processor import ExcelProcessor
 from excel_matcher import ExcelMatcherApp
 # 導入新的通用報表處理器
 from universal_processor import UniversalProcessor
+# 背景工作進度列（關閉視窗時需要等待背景執行緒結束）
+from background_worker import JobProgress
 
 class MainWindow(QMainWindow):
     """
@@ -49,6 +51,14 @@ class MainWindow(QMainWindow):
         # 設定為中央元件
         self.setCentralWidget(container)
 
+    def closeEvent(self, event):
+        """
+        關閉視窗時取消所有分頁的背景工作，等待執行緒結束後再離開
+        """
+        for job_progress in self.findChildren(JobProgress):
+            job_progress.shutdown()
+        super().closeEvent(event)
+
 # 程式進入點
 if __name__ == '__main__':
     # 建立 PyQt5 應用程式實例
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+批次處理時主檔名相同的輸入檔案不可寫到同一個輸出檔案
+"""
+
+import pandas as pd
+
+from dptools.batch import BATCH_OUTPUT_SUFFIX, batch_output_names, run_batch
+
+
+def test_batch_output_names_keep_extension_for_clashing_stems():
+    names = batch_output_names(["in/a.xlsx", "in/A.csv", "in/a_xlsx.csv", "in/b.csv"])
+
+    assert names == {
+        "in/a.xlsx": "a_xlsx" + BATCH_OUTPUT_SUFFIX,
+        "in/A.csv": "A_csv" + BATCH_OUTPUT_SUFFIX,
+        # 加上副檔名後與 a.xlsx 相同，依序編號
+        "in/a_xlsx.csv": "a_xlsx_2" + BATCH_OUTPUT_SUFFIX,
+        "in/b.csv": "b" + BATCH_OUTPUT_SUFFIX,
+    }
+    assert len({name.lower() for name in names.values()}) == len(names)
+
+
+def test_run_batch_writes_one_output_per_input(tmp_path):
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    pd.DataFrame({"品名": ["蘋果", "香蕉"]}).to_excel(source / "a.xlsx", index=False)
+    pd.DataFrame({"品名": ["芒果"]}).to_csv(source / "a.csv", index=False)
+
+    statuses = run_batch(str(source), str(output), mapping={"*": {"skiprows": 0, "columns": None}},
+                         workers=1, fmt="csv")
+
+    assert [status["狀態"] for status in statuses] == ["完成", "完成"]
+    outputs = {status["檔案"]: pd.read_csv(status["輸出"]) for status in statuses}
+    assert outputs["a.xlsx"]["品名"].tolist() == ["蘋果", "香蕉"]
+    assert outputs["a.csv"]["品名"].tolist() == ["芒果"]
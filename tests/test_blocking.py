@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+n-gram 候選篩選不可漏掉達到門檻的配對：結果必須與完整比對（fuzzy_match）相同
+"""
+
+import random
+
+import numpy as np
+import pytest
+from rapidfuzz import fuzz
+
+from dptools import blocking
+from dptools.blocking import blocked_fuzzy_match, gram_table, required_shared
+from dptools.matching import fuzzy_match
+
+# 字母少、長度短，讓隨機字串之間經常有共用 gram 與達到門檻的配對
+ALPHABET = "abcde王李張"
+THRESHOLDS = [0, 40, 60, 75, 85, 92, 100]
+
+
+def _random_keys(rng, count, max_len=9):
+    return ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_len))) for _ in range(count)]
+
+
+def _gram_sets(keys, n):
+    owners, grams = gram_table(keys, n)
+    sets = [set() for _ in keys]
+    for owner, gram in zip(owners, grams):
+        sets[owner].add(gram)
+    return sets
+
+
+@pytest.mark.parametrize("n", [1, 2, 3])
+def test_required_shared_is_a_lower_bound(n):
+    rng = random.Random(n)
+    queries, choices = _random_keys(rng, 150), _random_keys(rng, 150)
+    query_grams, choice_grams = _gram_sets(queries, n), _gram_sets(choices, n)
+    lengths = np.array([len(c) for c in choices])
+    for threshold in THRESHOLDS:
+        need = required_shared(np.array([len(q) for q in queries]),
+                               np.array([len(g) for g in query_grams]), lengths, n, threshold)
+        for i, query in enumerate(queries):
+            for j, choice in enumerate(choices):
+                if fuzz.ratio(query, choice) >= threshold:
+                    assert len(query_grams[i] & choice_grams[j]) >= need[i, j], (query, choice, threshold)
+
+
+@pytest.mark.parametrize("stop_grams", [False, True])
+def test_blocked_matches_full_scan(monkeypatch, stop_grams):
+    # 強制走候選篩選：不改用完整比對，每批只展開少量配對以涵蓋分批的邊界
+    monkeypatch.setattr(blocking, "FALLBACK_RATIO", float("inf"))
+    monkeypatch.setattr(blocking, "PAIR_BATCH", 50)
+    monkeypatch.setattr(blocking, "NEED_BATCH", 7)
+    if stop_grams:
+        monkeypatch.setattr(blocking, "STOP_GRAM_MIN_POSTINGS", 2)
+        monkeypatch.setattr(blocking, "STOP_GRAM_RATIO", 0.0)
+
+    rng = random.Random(int(stop_grams))
+    for _ in range(150):
+        main = _random_keys(rng, rng.randint(1, 40))
+        clear = _random_keys(rng, rng.randint(1, 40))
+        threshold = rng.choice(THRESHOLDS)
+        # 部分列已精確比對到，不參與模糊比對
+        positions = np.where([rng.random() < 0.2 for _ in main], 0, -1)
+
+        blocked = blocked_fuzzy_match(main, clear, threshold, positions,
+                                      ngram_size=rng.choice([0, 1, 2, 3]), recall_sample=0)
+        full = fuzzy_match(main, clear, threshold, positions)
+
+        assert not blocked[2]["改用完整比對"]
+        np.testing.assert_array_equal(blocked[0], full[0])
+        np.testing.assert_array_equal(blocked[1], full[1])
+
+
+def test_blocked_falls_back_when_pruning_is_ineffective():
+    rng = random.Random(0)
+    main, clear = _random_keys(rng, 200, 4), _random_keys(rng, 200, 4)
+    positions = np.full(len(main), -1)
+
+    blocked = blocked_fuzzy_match(main, clear, 40, positions, recall_sample=0)
+    full = fuzzy_match(main, clear, 40, positions)
+
+    assert blocked[2]["改用完整比對"]
+    np.testing.assert_array_equal(blocked[0], full[0])
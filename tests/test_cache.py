@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+讀取快取只以 Parquet 儲存與載入，快取鍵值包含 Excel 讀取引擎
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from dptools.cache import ReadCache, file_digest
+from dptools.excel_engines import available_engines
+from dptools.readers import read_table
+
+pytest.importorskip("pyarrow")
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+
+
+def _source(tmp_path):
+    path = tmp_path / "source.csv"
+    path.write_text("a,b\n1,x\n2,y\n", encoding="utf-8")
+    return str(path)
+
+
+def test_cache_round_trips_through_parquet(tmp_path):
+    cache = ReadCache(str(tmp_path / "cache"))
+    source = _source(tmp_path)
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+
+    cache.put(source, {}, df)
+
+    assert [name.endswith(".parquet") for name in os.listdir(cache.directory)] == [True]
+    pd.testing.assert_frame_equal(cache.get(source, {}), df)
+
+
+def test_frames_parquet_cannot_store_are_not_cached(tmp_path):
+    cache = ReadCache(str(tmp_path / "cache"))
+    source = _source(tmp_path)
+    # 混雜數字與文字的欄位無法以 Parquet 還原為相同型別
+    mixed = pd.DataFrame({"a": [1, "x"]})
+
+    cache.put(source, {}, mixed)
+
+    assert os.listdir(cache.directory) == []
+    assert cache.get(source, {}) is None
+
+
+def test_pickle_entries_are_never_loaded(tmp_path):
+    cache = ReadCache(str(tmp_path / "cache"))
+    source = _source(tmp_path)
+    os.makedirs(cache.directory)
+    # 其他人放在共用快取資料夾、名稱符合的 pickle 檔案不可被載入
+    planted = os.path.join(cache.directory, f"{cache._prefix(source, {})}-{file_digest(source)}.pkl")
+    pd.DataFrame({"a": [1]}).to_pickle(planted)
+
+    assert cache.get(source, {}) is None
+    cache.clear()
+    assert os.listdir(cache.directory) == []
+
+
+def test_cache_key_includes_excel_engine(tmp_path):
+    engines = available_engines(os.path.join(SAMPLES, "master.xlsx"))
+    if len(engines) < 2:
+        pytest.skip("需要兩種以上的 Excel 讀取引擎")
+    cache = ReadCache(str(tmp_path / "cache"))
+    path = os.path.join(SAMPLES, "master.xlsx")
+
+    for engine in engines[:2]:
+        read_table(path, engine=engine, cache=cache)
+
+    assert len(os.listdir(cache.directory)) == 2
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+整欄清理 clean_series 的結果必須與逐格呼叫 clean_text 相同
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+
+from dptools.cleaning import clean_series, clean_text
+
+# 容易出錯的字元：全形英數與空格、各種空白、希臘字尾 Σ、小寫後變成兩個字元的 İ、NUL 與 BMP 以外字元
+ALPHABET = list("aZ王李 \t\n　  ") + [
+    "ＡＢＣ", "１２３", "！", "ΟΔΟΣ", "Σ", "İ", "ß", "\x00", "😀", "ǅ",
+]
+
+
+def _random_text(rng):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+
+
+def test_clean_series_matches_clean_text_on_fuzzed_corpus():
+    rng = random.Random(0)
+    values = [_random_text(rng) for _ in range(3000)]
+    # 重複值、空值與非字串的值
+    values += values[:500] + [None, np.nan, 12, 3.5, pd.Timestamp("2024-01-02")]
+    series = pd.Series(values, dtype=object)
+
+    expected = [clean_text(v) for v in values]
+    assert clean_series(series).tolist() == expected
+    # 類別欄位逐一清理每個類別，再依代碼展開
+    categorical = series.astype(str).astype("category")
+    assert clean_series(categorical).tolist() == [clean_text(v) for v in categorical]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+向量化的 detect_header 選出的表頭列必須與逐列呼叫 calculate_header_score 相同
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dptools.detection import calculate_header_score, detect_header, header_keywords
+from dptools.presets import FIELD_KEYWORDS
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+
+
+def _reference_row(df_raw, keywords):
+    scores = [calculate_header_score(df_raw.iloc[i], keywords) for i in range(len(df_raw))]
+    return int(np.argmax(scores)), scores
+
+
+def _preamble_frame():
+    """前面有標題與說明列，資料含數字字串、空字串、數值與空值"""
+    return pd.DataFrame([
+        ["香連食品 出貨明細", None, None, None],
+        ["列印時間：2024/01/02", "", "", None],
+        ["12.5", "", "007", 3],
+        ["品名", "數量", "單價", "備註"],
+        ["蘋果", 3, 12.5, ""],
+        ["香蕉", "4", "20", None],
+    ], dtype=object)
+
+
+@pytest.mark.parametrize("name", ["master.xlsx", "new.xlsx"])
+def test_detect_header_matches_reference_on_samples(name):
+    df_raw = pd.read_excel(os.path.join(SAMPLES, name), header=None)
+    # 只用 HEADER_KEYWORDS 時與原本的 calculate_header_score 相同
+    assert detect_header(df_raw, {})[0] == _reference_row(df_raw, None)[0]
+    assert detect_header(df_raw)[0] == _reference_row(df_raw, header_keywords(FIELD_KEYWORDS))[0]
+
+
+@pytest.mark.parametrize("field_keywords", [{}, FIELD_KEYWORDS])
+def test_detect_header_skips_preamble(field_keywords):
+    df_raw = _preamble_frame()
+    expected, _ = _reference_row(df_raw, header_keywords(field_keywords))
+    assert detect_header(df_raw, field_keywords)[0] == expected == 3
+
+
+def test_detect_header_matches_reference_on_random_cells():
+    # 數字字串、空字串、數值、空值與日期：這些儲存格的計分規則必須與 calculate_header_score 相同
+    cells = [None, np.nan, "", " ", "12.5", "007", "3", 3, 1.5, "品名", "Name", "abc", "單價x",
+             pd.Timestamp("2024-01-02")]
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        shape = (int(rng.integers(1, 12)), int(rng.integers(1, 6)))
+        df_raw = pd.DataFrame(rng.choice(np.array(cells, dtype=object), size=shape), dtype=object)
+        for field_keywords in ({}, FIELD_KEYWORDS):
+            expected, _ = _reference_row(df_raw, header_keywords(field_keywords))
+            assert detect_header(df_raw, field_keywords)[0] == expected
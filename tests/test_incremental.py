@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+增量比對的結果必須與完整比對（match_dataframes）相同，清理檔或設定改變時不可沿用舊狀態
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dptools.incremental import load_state, match_incremental
+from dptools.matching import match_dataframes
+
+KEYS = ["姓名", "編號"]
+NAMES = np.array([a + b + c for a in "王李陳林張" for b in "小大美志雅" for c in "明華傑婷偉"])
+
+
+def _frame(rng, rows):
+    return pd.DataFrame({
+        "姓名": rng.choice(NAMES, rows),
+        "編號": rng.integers(0, rows // 2, rows).astype(str),
+        "金額": rng.random(rows),
+    })
+
+
+def _assert_same_as_full(df_main, df_clear, state_path, **settings):
+    result, unmatched = match_incremental(df_main, df_clear, KEYS, KEYS, state_path, **settings)
+    expected, expected_unmatched = match_dataframes(df_main, df_clear, KEYS, KEYS, **settings)
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(unmatched, expected_unmatched)
+    assert result.attrs["counts"] == expected.attrs["counts"]
+    return result.attrs["incremental"]
+
+
+@pytest.mark.parametrize("settings", [{}, {"use_fuzzy": True, "threshold": 80}])
+def test_incremental_matches_full_after_inserts_edits_and_deletions(tmp_path, settings):
+    rng = np.random.default_rng(0)
+    df_main, df_clear = _frame(rng, 400), _frame(rng, 200).drop(columns="金額")
+    state_path = str(tmp_path / "state.npz")
+
+    first = _assert_same_as_full(df_main, df_clear, state_path, **settings)
+    assert not first["沿用上次結果"] and first["重新比對筆數"] == len(df_main)
+
+    # 沒有改變時全部沿用
+    unchanged = _assert_same_as_full(df_main, df_clear, state_path, **settings)
+    assert unchanged["沿用上次結果"] and unchanged["重新比對筆數"] == 0
+
+    # 修改鍵值、刪除與新增列，另外修改非鍵值欄位（不需要重新比對）
+    edited = df_main.copy()
+    edited.loc[5:20, "編號"] = "999999"
+    edited.loc[30:40, "姓名"] = edited.loc[30:40, "姓名"] + "x"
+    edited.loc[:, "金額"] = 0.0
+    edited = pd.concat([edited.drop(index=range(100, 150)), _frame(rng, 60)], ignore_index=True)
+
+    delta = _assert_same_as_full(edited, df_clear, state_path, **settings)
+    assert delta["沿用上次結果"]
+    assert delta["沿用筆數"] + delta["重新比對筆數"] == len(edited)
+    assert 0 < delta["重新比對筆數"] <= 16 + 11 + 60
+    assert delta["舊鍵值消失筆數"] > 0
+
+
+def test_incremental_state_is_ignored_when_clear_file_or_settings_change(tmp_path):
+    rng = np.random.default_rng(1)
+    df_main, df_clear = _frame(rng, 300), _frame(rng, 150).drop(columns="金額")
+    state_path = str(tmp_path / "state.npz")
+    _assert_same_as_full(df_main, df_clear, state_path)
+
+    # 清理檔內容改變：舊的列位置不適用，需完整比對
+    changed_clear = df_clear.copy()
+    changed_clear.loc[0, "編號"] = "changed"
+    delta = _assert_same_as_full(df_main, changed_clear, state_path)
+    assert not delta["沿用上次結果"] and delta["重新比對筆數"] == len(df_main)
+
+    # 比對設定改變
+    delta = _assert_same_as_full(df_main, changed_clear, state_path, use_fuzzy=True, threshold=80)
+    assert not delta["沿用上次結果"]
+    delta = _assert_same_as_full(df_main, changed_clear, state_path, use_fuzzy=True, threshold=90)
+    assert not delta["沿用上次結果"]
+    delta = _assert_same_as_full(df_main, changed_clear, state_path, use_fuzzy=True, threshold=90)
+    assert delta["沿用上次結果"]
+
+
+def test_load_state_ignores_missing_or_corrupt_file(tmp_path):
+    path = tmp_path / "state.npz"
+    assert load_state(str(path)) is None
+    path.write_bytes(b"not an npz file")
+    assert load_state(str(path)) is None
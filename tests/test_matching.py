@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+比對結果的四種分類（完全匹配、模糊匹配、僅左、僅右）與未匹配資料
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dptools import matching
+from dptools.matching import (
+    STATUS_FUZZY, STATUS_INNER, STATUS_LEFT_ONLY, STATUS_RIGHT_ONLY, classify_matches, clean_key_frame,
+    hash_keys, match_dataframes, match_key_frames
+)
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+
+
+@pytest.fixture(scope="module")
+def samples():
+    return (pd.read_excel(os.path.join(SAMPLES, "master.xlsx")),
+            pd.read_excel(os.path.join(SAMPLES, "new.xlsx")))
+
+
+def test_exact_match_statuses_on_samples(samples):
+    df_main, df_new = samples
+    df_result, df_unmatched = match_dataframes(df_main, df_new, "身分證字號", "身分證字號")
+
+    assert df_result.attrs["counts"] == {"完全匹配筆數": 3, "模糊匹配筆數": 0, "僅左筆數": 2, "僅右筆數": 2}
+    assert df_result["比對分類"].tolist() == [STATUS_INNER] * 3 + [STATUS_LEFT_ONLY] * 2
+    assert df_unmatched["姓名"].tolist() == ["鄭小虎", "馮小鳥"]
+
+
+def test_fuzzy_matched_right_rows_are_not_unmatched(samples):
+    df_main, df_new = samples
+    # 李小華與李大華只有模糊比對命中：清理檔的這一列算模糊匹配，不在未匹配資料中
+    df_result, df_unmatched = match_dataframes(df_main, df_new, "姓名", "姓名", use_fuzzy=True, threshold=60)
+
+    assert df_result.attrs["counts"] == {"完全匹配筆數": 2, "模糊匹配筆數": 1, "僅左筆數": 2, "僅右筆數": 2}
+    assert df_result["比對分類"].tolist() == [STATUS_INNER] * 2 + [STATUS_FUZZY] + [STATUS_LEFT_ONLY] * 2
+    assert "李大華" not in df_unmatched["姓名"].tolist()
+    assert df_unmatched["姓名"].tolist() == ["鄭小虎", "馮小鳥"]
+
+
+def test_classify_matches_right_side():
+    # 左 0 精確對到右 0；左 1 模糊對到右 0（右 0 已精確命中，仍算完全匹配）；左 2 模糊對到右 1；右 2 沒有配對
+    positions = np.array([0, 0, 1, -1])
+    fuzzy_flags = np.array([False, True, True, False])
+    partners = np.array([0, -1, -1])
+
+    outer = classify_matches(positions, fuzzy_flags, partners)
+
+    assert outer.left_status.tolist() == [STATUS_INNER, STATUS_FUZZY, STATUS_FUZZY, STATUS_LEFT_ONLY]
+    assert outer.right_status.tolist() == [STATUS_INNER, STATUS_FUZZY, STATUS_RIGHT_ONLY]
+    assert outer.counts() == {"完全匹配筆數": 1, "模糊匹配筆數": 2, "僅左筆數": 1, "僅右筆數": 1}
+
+
+def _key_frames(rng, rows):
+    return pd.DataFrame({
+        "姓名": rng.choice(["王小美", "李小華", "張小明", "陳大文"], rows),
+        "編號": rng.integers(0, 6, rows).astype(str),
+    })
+
+
+def test_hash_collisions_fall_back_to_full_keys(monkeypatch):
+    rng = np.random.default_rng(0)
+    df_main, df_clear = _key_frames(rng, 60), _key_frames(rng, 30)
+    expected, expected_unmatched = match_dataframes(df_main, df_clear, ["姓名", "編號"], ["姓名", "編號"])
+
+    # 雜湊只剩兩種值：幾乎每個命中的配對都是碰撞，必須改以完整鍵值比對
+    monkeypatch.setattr(matching, "hash_keys", lambda frame: hash_keys(frame) % np.uint64(2))
+    result, unmatched = match_dataframes(df_main, df_clear, ["姓名", "編號"], ["姓名", "編號"])
+
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(unmatched, expected_unmatched)
+    assert result.attrs["counts"] == expected.attrs["counts"]
+
+
+def test_match_key_frames_pairs_rows_despite_collisions():
+    main_frame = clean_key_frame(pd.DataFrame({"a": ["x", "y", "z"], "b": ["1", "2", "3"]}), ["a", "b"])
+    clear_frame = clean_key_frame(pd.DataFrame({"a": ["z", "y", "q"], "b": ["3", "2", "9"]}), ["a", "b"])
+    # 所有列的雜湊都相同
+    same = np.zeros(3, dtype=np.uint64)
+
+    positions = match_key_frames(main_frame, same, clear_frame, same)
+
+    assert positions.tolist() == [-1, 1, 0]
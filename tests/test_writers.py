@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+分批寫出 Parquet 時，後續批次的欄位型別改變不應中斷寫出
+"""
+
+import pandas as pd
+import pytest
+
+from dptools.streaming import process_file_streaming
+from dptools.writers import ChunkedWriter
+
+pytest.importorskip("pyarrow")
+
+
+def _drifting_csv(path):
+    """前 10 列是整數，之後「代碼」出現文字、「數量」出現小數與空值、「備註」由空白變為文字"""
+    lines = ["代碼,數量,備註,編號"]
+    for i in range(30):
+        code = i if i < 10 else f"t{i}"
+        amount = i if i < 10 else (1.5 if i < 20 else "")
+        note = "" if i < 10 else "x"
+        lines.append(f"{code},{amount},{note},{2 ** 60 + i}")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_streaming_parquet_with_drifting_types(tmp_path):
+    source = tmp_path / "drift.csv"
+    _drifting_csv(source)
+
+    result = process_file_streaming(str(source), str(tmp_path / "out.parquet"), chunksize=7)
+    process_file_streaming(str(source), str(tmp_path / "out.csv"), chunksize=7)
+
+    assert result["rows"] == 30
+    written = pd.read_parquet(result["output"])
+    expected = pd.read_csv(tmp_path / "out.csv", dtype=str, keep_default_na=False)
+    assert list(written.columns) == list(expected.columns)
+    # 整數欄位改為文字時不加上 ".0"，與 CSV 的內容相同
+    assert written["代碼"].tolist() == expected["代碼"].tolist()
+    assert written["數量"].tolist()[:20] == [float(i) for i in range(10)] + [1.5] * 10
+    assert written["數量"].isna().sum() == 10
+    assert written["備註"].tolist() == [None] * 10 + ["x"] * 20
+    assert written["編號"].tolist() == [2 ** 60 + i for i in range(30)]
+    # 暫存檔已更名為輸出檔案
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["drift.csv", "out.csv", "out.parquet"]
+
+
+def test_chunked_parquet_widens_categories_and_large_integers(tmp_path):
+    path = str(tmp_path / "out.parquet")
+    with ChunkedWriter(path) as writer:
+        writer.write(pd.DataFrame({"編號": [2 ** 60, 2 ** 60 + 1], "類別": pd.Categorical(["a", "b"])}))
+        writer.write(pd.DataFrame({"編號": ["x", None], "類別": pd.Categorical(["c", "c"])}))
+        writer.write(pd.DataFrame({"編號": [5, 6], "類別": pd.Categorical([1, 2])}))
+
+    written = pd.read_parquet(path)
+    assert written["編號"].tolist() == [str(2 ** 60), str(2 ** 60 + 1), "x", None, "5", "6"]
+    assert written["類別"].tolist() == ["a", "b", "c", "c", "1", "2"]
+
+
+def test_chunked_parquet_keeps_integer_type(tmp_path):
+    path = str(tmp_path / "out.parquet")
+    with ChunkedWriter(path) as writer:
+        writer.write(pd.DataFrame({"id": [1, 2]}))
+        writer.write(pd.DataFrame({"id": [3, 4]}))
+
+    written = pd.read_parquet(path)
+    assert written["id"].dtype == "int64"
+    assert written["id"].tolist() == [1, 2, 3, 4]
+
+
+def test_chunked_parquet_large_integers_meeting_floats_become_text(tmp_path):
+    path = str(tmp_path / "out.parquet")
+    with ChunkedWriter(path) as writer:
+        writer.write(pd.DataFrame({"編號": [2 ** 60 + 1, 7], "數量": [1, 2]}))
+        writer.write(pd.DataFrame({"編號": [1.5, None], "數量": [2.5, None]}))
+
+    written = pd.read_parquet(path)
+    # 超過 float64 精確範圍的整數不可轉為浮點數，改為字串保留原值
+    assert written["編號"].tolist() == [str(2 ** 60 + 1), "7", "1.5", None]
+    # 小整數可精確轉為 float64
+    assert written["數量"].dtype == "float64"
+    assert written["數量"].tolist()[:3] == [1.0, 2.0, 2.5]
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".csv", ".xlsx"])
+def test_chunked_writer_removes_partial_output_on_error(tmp_path, suffix):
+    path = str(tmp_path / f"out{suffix}")
+    with pytest.raises(RuntimeError):
+        with ChunkedWriter(path) as writer:
+            writer.write(pd.DataFrame({"id": [1, 2]}))
+            raise RuntimeError("取消")
+
+    assert list(tmp_path.iterdir()) == []
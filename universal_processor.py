@@ -3,18 +3,29 @@
 # 支援多種報表格式，可自動偵測表頭位置和欄位類型
 
 import pandas as pd
-import chardet
-import json
 import os
-import re
-from typing import Dict, List, Tuple, Optional
+from dataclasses import replace
+from typing import Dict, Optional
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QComboBox, 
     QSpinBox, QLineEdit, QPushButton, QFileDialog, QTextEdit, QMessageBox,
-    QTableWidget, QTableWidgetItem, QCheckBox, QGroupBox, QGridLayout
+    QTableView, QCheckBox, QGroupBox, QGridLayout
 )
 from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
+# 導入不依賴 GUI 的核心功能
+from dptools import detection
+from dptools.cache import CACHE_DIR, default_cache
+from dptools.cleaning import clean_frame, parse_columns
+from dptools.presets import field_keywords, load_config
+from dptools.progress import report
+from dptools.readers import build_read_plan, probe_file
+from dptools.streaming import process_file_streaming
+from dptools.writers import available_formats, dialog_filter, filter_format, write_table
+# 只繪製看得到的儲存格的預覽表格模型
+from dataframe_model import DataFrameModel
+# 背景執行處理與儲存工作的進度列
+from background_worker import JobProgress
 
 class UniversalProcessor(QWidget):
     """
@@ -31,6 +42,8 @@ class UniversalProcessor(QWidget):
         # 初始化變數
         self.input_file = None
         self.df_raw = None
+        self.read_plan = None  # 智慧偵測產生的讀取計畫，處理時直接沿用
+        self.column_specs = []  # 智慧偵測推斷的欄位類型，依原始欄位順序
         self.df_processed = None
         self.config = self.load_config()
         
@@ -42,22 +55,7 @@ class UniversalProcessor(QWidget):
         載入設定檔案
         如果設定檔案不存在，則使用預設設定
         """
-        config_file = "config_template.json"
-        if os.path.exists(config_file):
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"載入設定檔案失敗: {e}")
-        
-        # 返回預設設定
-        return {
-            "預設設定": {
-                "通用報表": {"skiprows": 0, "columns": "all", "encoding": "auto"},
-                "有表頭的報表": {"skiprows": 1, "columns": "all", "encoding": "auto"},
-                "複雜報表": {"skiprows": 5, "columns": "2,3,4", "encoding": "auto"}
-            }
-        }
+        return load_config()
     
     def initUI(self):
         """初始化使用者介面"""
@@ -112,7 +110,7 @@ class UniversalProcessor(QWidget):
         # 跳過行數設定
         settings_layout.addWidget(QLabel("跳過行數:"), 0, 0)
         self.skiprows_input = QSpinBox()
-        self.skiprows_input.setRange(0, 100)
+        self.skiprows_input.setRange(0, 1000)
         self.skiprows_input.setValue(0)
         settings_layout.addWidget(self.skiprows_input, 0, 1)
         
@@ -136,6 +134,26 @@ class UniversalProcessor(QWidget):
         self.preset_combo.currentTextChanged.connect(self.apply_preset)
         settings_layout.addWidget(self.preset_combo, 3, 1)
         
+        # 文字清理設定
+        self.clean_checkbox = QCheckBox("清理文字（去空白、全形轉半形、移除空白列）")
+        settings_layout.addWidget(self.clean_checkbox, 4, 0, 1, 2)
+        
+        # 串流模式設定：大檔案分批讀取並直接寫出，不整份載入記憶體
+        self.stream_checkbox = QCheckBox("串流模式（大型檔案分批處理並直接寫出結果）")
+        self.stream_checkbox.setToolTip("適用於超過記憶體大小的檔案；處理時會先詢問輸出位置，預覽只顯示前 20 行")
+        settings_layout.addWidget(self.stream_checkbox, 5, 0, 1, 2)
+        
+        # 欄位類型設定：依智慧偵測的結果將數值、日期（含民國年）、布林值欄位轉為對應類型
+        self.types_checkbox = QCheckBox("套用偵測到的欄位類型（數值、日期、布林值）")
+        self.types_checkbox.setToolTip("需先執行智慧偵測；欄位中有任何無法轉換的值時保留原始內容")
+        settings_layout.addWidget(self.types_checkbox, 6, 0, 1, 2)
+        
+        # 讀取快取設定：相同檔案以相同設定重複處理時直接載入上次解析的結果
+        self.cache_checkbox = QCheckBox("使用讀取快取（相同檔案與設定不重新解析）")
+        self.cache_checkbox.setChecked(True)
+        self.cache_checkbox.setToolTip(f"快取位於 {CACHE_DIR}，檔案內容改變時自動失效；串流模式不使用快取")
+        settings_layout.addWidget(self.cache_checkbox, 7, 0, 1, 2)
+        
         settings_group.setLayout(settings_layout)
         layout.addWidget(settings_group)
         
@@ -154,11 +172,18 @@ class UniversalProcessor(QWidget):
         
         layout.addLayout(button_layout)
         
+        # 背景工作進度：處理或儲存期間停用操作按鈕，其他分頁仍可正常使用
+        self.job_progress = JobProgress([self.select_button, self.detect_button,
+                                         self.process_button, self.save_button])
+        layout.addWidget(self.job_progress)
+        
         # === 預覽區域 ===
         preview_group = QGroupBox("資料預覽")
         preview_layout = QVBoxLayout()
         
-        self.preview_table = QTableWidget()
+        self.preview_model = DataFrameModel()
+        self.preview_table = QTableView()
+        self.preview_table.setModel(self.preview_model)
         preview_layout.addWidget(self.preview_table)
         
         preview_group.setLayout(preview_layout)
@@ -180,7 +205,15 @@ class UniversalProcessor(QWidget):
         if file_name:
             self.input_file = file_name
             self.file_path_edit.setText(file_name)
-            self.file_info_label.setText(f"已選擇: {os.path.basename(file_name)}")
+            info = f"已選擇: {os.path.basename(file_name)}"
+            try:
+                # 只讀取檔案開頭估計資料筆數
+                probe = probe_file(file_name)
+                if probe.row_count is not None:
+                    info += f"（{'' if probe.row_count_exact else '約 '}{probe.row_count:,} 筆資料）"
+            except Exception:
+                pass
+            self.file_info_label.setText(info)
             self.detect_button.setEnabled(True)
             self.process_button.setEnabled(True)
         else:
@@ -200,6 +233,7 @@ class UniversalProcessor(QWidget):
             
             # 分析檔案結構
             analysis = self.analyze_file_structure()
+            self.column_specs = analysis['欄位規格']
             
             # 顯示偵測結果
             self.display_detection_results(analysis)
@@ -213,31 +247,10 @@ class UniversalProcessor(QWidget):
     def read_file_smart(self) -> Optional[pd.DataFrame]:
         """智慧讀取檔案"""
         try:
-            # 自動偵測編碼
-            if self.encoding_combo.currentText() == "自動偵測":
-                with open(self.input_file, 'rb') as f:
-                    result = chardet.detect(f.read())
-                    encoding = result['encoding']
-            else:
-                encoding = self.encoding_combo.currentText()
-            
-            # 根據檔案類型讀取
-            if self.input_file.endswith('.csv'):
-                # 嘗試不同的分隔符號
-                for sep in [',', '\t', ';', '|']:
-                    try:
-                        df = pd.read_csv(self.input_file, encoding=encoding, sep=sep, nrows=20)
-                        if len(df.columns) > 1:  # 成功分割
-                            break
-                    except:
-                        continue
-                else:
-                    # 如果都失敗，使用預設逗號
-                    df = pd.read_csv(self.input_file, encoding=encoding, nrows=20)
-            else:
-                df = pd.read_excel(self.input_file, nrows=20)
-            
-            return df
+            # 由一段取樣偵測編碼、分隔符號與表頭，預覽前 20 列
+            self.read_plan = build_read_plan(self.input_file, encoding=self.encoding_combo.currentText(),
+                                             field_keywords=field_keywords(self.config))
+            return self.read_plan.preview(nrows=20)
             
         except Exception as e:
             QMessageBox.critical(self, "錯誤", f"讀取檔案失敗: {str(e)}")
@@ -245,82 +258,17 @@ class UniversalProcessor(QWidget):
     
     def analyze_file_structure(self) -> Dict:
         """分析檔案結構"""
-        analysis = {
-            "總行數": len(self.df_raw),
-            "總欄數": len(self.df_raw.columns),
-            "建議跳過行數": 0,
-            "建議欄位": [],
-            "欄位類型": {},
-            "資料品質": {}
-        }
-        
-        # 分析每一行，找出可能的表頭位置
-        header_scores = []
-        for i in range(min(10, len(self.df_raw))):
-            score = self.calculate_header_score(self.df_raw.iloc[i])
-            header_scores.append((i, score))
-        
-        # 找出最佳表頭位置
-        best_header_row = max(header_scores, key=lambda x: x[1])[0]
-        analysis["建議跳過行數"] = best_header_row
-        
-        # 分析欄位類型
-        for col in self.df_raw.columns:
-            col_data = self.df_raw.iloc[best_header_row:][col]
-            col_type = self.infer_column_type(col_data)
-            analysis["欄位類型"][col] = col_type
-        
-        # 建議要保留的欄位
-        analysis["建議欄位"] = list(range(len(self.df_raw.columns)))
-        
-        return analysis
+        # 以未指定表頭的前 200 列偵測表頭位置與欄位對應
+        return detection.analyze_file_structure(self.read_plan.raw_rows(),
+                                                field_keywords(self.config))
     
     def calculate_header_score(self, row) -> float:
         """計算某一行作為表頭的可能性分數"""
-        score = 0
-        
-        for val in row:
-            val_str = str(val).lower()
-            
-            # 檢查是否包含常見的表頭關鍵字
-            header_keywords = ['名稱', '編號', '數量', '價格', '日期', '時間', 'name', 'id', 'qty', 'price', 'date']
-            if any(keyword in val_str for keyword in header_keywords):
-                score += 2
-            
-            # 檢查是否為文字（表頭通常是文字）
-            if isinstance(val, str) and not val.isdigit():
-                score += 1
-            
-            # 檢查是否為空值（表頭通常不為空）
-            if pd.notna(val):
-                score += 1
-        
-        return score
+        return detection.calculate_header_score(row)
     
     def infer_column_type(self, data) -> str:
         """推斷欄位類型"""
-        # 移除空值
-        clean_data = data.dropna()
-        
-        if len(clean_data) == 0:
-            return "未知"
-        
-        # 檢查是否為數字
-        numeric_count = sum(pd.to_numeric(clean_data, errors='coerce').notna())
-        if numeric_count / len(clean_data) > 0.8:
-            return "數值"
-        
-        # 檢查是否為日期
-        date_count = sum(pd.to_datetime(clean_data, errors='coerce').notna())
-        if date_count / len(clean_data) > 0.8:
-            return "日期"
-        
-        # 檢查是否為布林值
-        bool_count = sum(clean_data.astype(str).str.lower().isin(['true', 'false', '是', '否', '1', '0']))
-        if bool_count / len(clean_data) > 0.8:
-            return "布林值"
-        
-        return "文字"
+        return detection.infer_column_type(data)
     
     def display_detection_results(self, analysis: Dict):
         """顯示偵測結果"""
@@ -339,7 +287,8 @@ class UniversalProcessor(QWidget):
 """
         
         for col, col_type in analysis['欄位類型'].items():
-            result_text += f"   - {col}: {col_type}\n"
+            mapped = analysis['欄位對應'].get(col)
+            result_text += f"   - {col}: {col_type}" + (f"（{mapped}）" if mapped else "") + "\n"
         
         result_text += "\n💡 建議: 系統已自動套用最佳設定，您也可以手動調整。"
         
@@ -369,59 +318,118 @@ class UniversalProcessor(QWidget):
             QMessageBox.warning(self, "錯誤", "請先選擇檔案並進行智慧偵測！")
             return
         
+        # 獲取設定
+        skiprows = self.skiprows_input.value()
+        columns_input = self.columns_input.text()
+        encoding = self.encoding_combo.currentText()
+        
+        # 處理欄位選擇
         try:
-            # 獲取設定
-            skiprows = self.skiprows_input.value()
-            columns_input = self.columns_input.text()
-            encoding = self.encoding_combo.currentText()
-            
+            columns = parse_columns(columns_input)
+        except ValueError:
+            QMessageBox.warning(self, "錯誤", "欄位格式錯誤，請使用數字並用逗號分隔！")
+            return
+        
+        try:
+            # 沿用智慧偵測的讀取計畫；手動指定的編碼優先
+            if self.read_plan is None or self.read_plan.path != self.input_file:
+                self.read_plan = build_read_plan(self.input_file, encoding=encoding,
+                                                 field_keywords=field_keywords(self.config))
+                self.column_specs = []
+        except Exception as e:
+            QMessageBox.critical(self, "錯誤", f"處理資料時發生錯誤: {str(e)}")
+            return
+        plan = self.read_plan
+        if encoding != "自動偵測" and plan.is_csv:
+            plan = replace(plan, encoding=encoding)
+        
+        if self.stream_checkbox.isChecked():
+            self.process_streaming(plan, skiprows, columns)
+            return
+        
+        # 背景工作只使用這裡取出的設定，不讀取介面元件
+        clean = self.clean_checkbox.isChecked()
+        specs = self.column_specs if self.types_checkbox.isChecked() else None
+        cache = default_cache() if self.cache_checkbox.isChecked() else None
+        
+        def job(progress):
             # 讀取完整檔案
-            if self.input_file.endswith('.csv'):
-                if encoding == "自動偵測":
-                    with open(self.input_file, 'rb') as f:
-                        result = chardet.detect(f.read())
-                        encoding = result['encoding']
-                df = pd.read_csv(self.input_file, encoding=encoding, skiprows=skiprows)
-            else:
-                df = pd.read_excel(self.input_file, skiprows=skiprows)
-            
-            # 處理欄位選擇
-            if columns_input.lower() == "all":
-                self.df_processed = df
-            else:
-                try:
-                    columns = [int(x.strip()) for x in columns_input.split(',')]
-                    self.df_processed = df.iloc[:, columns]
-                except ValueError:
-                    QMessageBox.warning(self, "錯誤", "欄位格式錯誤，請使用數字並用逗號分隔！")
-                    return
-            
+            df = plan.read(skiprows=skiprows, columns=columns, cache=cache, progress=progress)
+            if clean:
+                report(progress, "清理文字")
+                df = clean_frame(df)
+            if specs is not None:
+                report(progress, "轉換欄位類型")
+                df = detection.apply_column_types(df, specs, columns)
+            return df
+        
+        def finished(df):
+            self.df_processed = df
             # 顯示預覽
             self.preview_result()
             self.save_button.setEnabled(True)
             
             QMessageBox.information(self, "成功", "資料處理完成！")
+        
+        self.job_progress.start(job, finished, self.job_failed("處理資料時發生錯誤"), stage="讀取檔案")
+    
+    def job_failed(self, title: str):
+        """產生背景工作失敗時顯示錯誤訊息的回呼"""
+        def failed(error, details):
+            QMessageBox.critical(self, "錯誤", f"{title}: {str(error)}")
+        return failed
+    
+    def process_streaming(self, plan, skiprows: int, columns):
+        """串流處理：分批讀取並直接寫出到使用者選擇的檔案"""
+        options = QFileDialog.Options()
+        file_name, selected_filter = QFileDialog.getSaveFileName(
+            self, 
+            "儲存處理結果", 
+            "processed_report.csv", 
+            # 串流模式預設輸出 CSV
+            dialog_filter(sorted(available_formats(), key=lambda fmt: fmt != "csv")), 
+            options=options
+        )
+        if not file_name:
+            return
+        fmt = filter_format(selected_filter)
+        
+        clean = self.clean_checkbox.isChecked()
+        # CSV 的總行數（可能是估計值）作為進度條的總數，Excel 只顯示已處理行數
+        total = max((plan.line_count or 0) - skiprows - 1, 0)
+        
+        def job(progress):
+            # 每寫出一批回報一次進度；按下取消時在下一批之前中止
+            return process_file_streaming(
+                plan.path, file_name, skiprows=skiprows, columns=columns,
+                encoding=plan.encoding, clean=clean, output_format=fmt,
+                progress=lambda rows: progress("串流處理", rows, max(total, rows) if total else 0),
+                sep=plan.sep, quotechar=plan.quotechar
+            )
+        
+        def finished(result):
+            # 預覽只顯示前幾行，結果已寫出，不需要再儲存
+            self.df_processed = result["preview"]
+            self.preview_result()
+            self.save_button.setEnabled(False)
             
-        except Exception as e:
-            QMessageBox.critical(self, "錯誤", f"處理資料時發生錯誤: {str(e)}")
+            QMessageBox.information(
+                self, "成功", f"串流處理完成！共 {result['rows']:,} 行\n檔案已儲存至: {result['output']}"
+            )
+        
+        def cancelled():
+            QMessageBox.information(self, "已取消", f"串流處理已取消，{file_name} 只包含取消前已寫出的資料")
+        
+        self.job_progress.start(job, finished, self.job_failed("處理資料時發生錯誤"), cancelled,
+                                stage="串流處理")
     
     def preview_result(self):
         """預覽結果"""
         if self.df_processed is None:
             return
         
-        # 設定表格
-        preview_df = self.df_processed.head(20)  # 顯示前20行
-        self.preview_table.setRowCount(len(preview_df))
-        self.preview_table.setColumnCount(len(preview_df.columns))
-        self.preview_table.setHorizontalHeaderLabels([str(col) for col in preview_df.columns])
-        
-        # 填充資料
-        for i in range(len(preview_df)):
-            for j in range(len(preview_df.columns)):
-                item = QTableWidgetItem(str(preview_df.iat[i, j]))
-                self.preview_table.setItem(i, j, item)
-        
+        # 表格模型只繪製畫面上看得到的列，可直接顯示完整資料
+        self.preview_model.set_dataframe(self.df_processed)
         self.preview_table.resizeColumnsToContents()
     
     def save_file(self):
@@ -431,24 +439,22 @@ class UniversalProcessor(QWidget):
             return
         
         options = QFileDialog.Options()
-        file_name, _ = QFileDialog.getSaveFileName(
+        file_name, selected_filter = QFileDialog.getSaveFileName(
             self, 
             "儲存處理結果", 
             "processed_report.xlsx", 
-            "Excel 檔案 (*.xlsx);;CSV 檔案 (*.csv)", 
+            dialog_filter(), 
             options=options
         )
         
         if file_name:
-            try:
-                if file_name.endswith('.csv'):
-                    self.df_processed.to_csv(file_name, index=False, encoding='utf-8-sig')
-                else:
-                    if not file_name.endswith('.xlsx'):
-                        file_name += '.xlsx'
-                    self.df_processed.to_excel(file_name, index=False)
-                
-                QMessageBox.information(self, "成功", f"檔案已儲存至: {file_name}")
-                
-            except Exception as e:
-                QMessageBox.critical(self, "錯誤", f"儲存檔案時發生錯誤: {str(e)}")
+            df = self.df_processed
+            fmt = filter_format(selected_filter)
+            
+            def job(progress):
+                return write_table(df, file_name, fmt, progress=progress)
+            
+            def finished(path):
+                QMessageBox.information(self, "成功", f"檔案已儲存至: {path}")
+            
+            self.job_progress.start(job, finished, self.job_failed("儲存檔案時發生錯誤"), stage="儲存檔案")